@@ -0,0 +1,144 @@
+import pygame
+from settings import *
+import os
+
+# --- Gestor de Assets ---
+# Este archivo se encarga de cargar las imágenes del juego UNA sola vez.
+# Antes, cada sprite leía su PNG del disco al crearse; ahora todos los sprites
+# del mismo tipo comparten la misma superficie guardada en un caché.
+
+# --- Directorio de Assets ---
+directorio_juego = os.path.dirname(__file__)
+directorio_assets = os.path.join(directorio_juego, CARPETA_ASSETS)
+
+# --- Caché de Imágenes ---
+# La clave es (ruta, tamaño, alpha) y el valor la superficie ya convertida (y escalada).
+_cache_imagenes = {}
+
+# --- Contadores del Caché ---
+# 'aciertos' cuenta las veces que la imagen ya estaba en el caché.
+# 'fallos' cuenta las veces que hubo que leerla del disco (o escalarla).
+estadisticas = {'aciertos': 0, 'fallos': 0}
+
+
+# --- Imágenes y Archivos Precargados ---
+# El precargador (precarga.py) lee y decodifica imágenes en otro hilo. Pero .convert() solo
+# se puede hacer en el hilo principal, así que aquí se guardan sin convertir hasta que
+# cargar_imagen las pida. También guardamos en memoria archivos leídos de antemano (la música).
+_decodificadas = {}
+_archivos = {}
+
+
+def hay_pantalla():
+    """
+    Indica si ya existe una ventana. Sin ventana (modo sin pantalla, por ejemplo en la
+    simulación) no se puede usar .convert(), así que las imágenes se quedan como se leyeron.
+    """
+    return pygame.display.get_init() and pygame.display.get_surface() is not None
+
+
+def cargar_imagen(ruta, tamaño=None, alpha=True):
+    """
+    Devuelve la imagen pedida, cargándola del disco solo la primera vez.
+    :param ruta: Ruta de la imagen relativa a la carpeta de assets.
+    :param tamaño: Tupla (ancho, alto) a la que escalar la imagen, o None para dejarla igual.
+    :param alpha: True para .convert_alpha() (con transparencias), False para .convert().
+    """
+    clave = (ruta, tamaño, alpha)
+    imagen = _cache_imagenes.get(clave)
+    if imagen is not None:
+        estadisticas['aciertos'] += 1
+        return imagen
+
+    estadisticas['fallos'] += 1
+    if tamaño is None:
+        # Cargamos la imagen original (o la que ya decodificó el precargador)
+        # y la optimizamos para el dibujado.
+        imagen = _decodificadas.pop(ruta, None)
+        if imagen is None:
+            imagen = pygame.image.load(os.path.join(directorio_assets, ruta))
+        if hay_pantalla():
+            imagen = imagen.convert_alpha() if alpha else imagen.convert()
+    else:
+        # Partimos de la imagen original (también cacheada) y solo escalamos si hace falta.
+        original = cargar_imagen(ruta, None, alpha)
+        if original.get_size() == tamaño:
+            imagen = original
+        else:
+            imagen = pygame.transform.scale(original, tamaño)
+
+    _cache_imagenes[clave] = imagen
+    return imagen
+
+
+def cargar_mosaico(ruta, tamaño, alpha=False):
+    """
+    Devuelve una superficie del tamaño pedido rellena repitiendo la imagen (como baldosas).
+    Se usa para dibujar de un solo blit un bloque de varias paredes fusionadas.
+    :param ruta: Ruta de la imagen relativa a la carpeta de assets.
+    :param tamaño: Tupla (ancho, alto) de la superficie final.
+    """
+    clave = (ruta, tamaño, alpha, 'mosaico')
+    mosaico = _cache_imagenes.get(clave)
+    if mosaico is not None:
+        estadisticas['aciertos'] += 1
+        return mosaico
+
+    estadisticas['fallos'] += 1
+    baldosa = cargar_imagen(ruta, None, alpha)
+    ancho_baldosa, alto_baldosa = baldosa.get_size()
+    mosaico = pygame.Surface(tamaño, pygame.SRCALPHA if alpha else 0)
+    if hay_pantalla():
+        mosaico = mosaico.convert_alpha() if alpha else mosaico.convert()
+    # Repetimos la baldosa hasta cubrir toda la superficie.
+    for y in range(0, tamaño[1], alto_baldosa):
+        for x in range(0, tamaño[0], ancho_baldosa):
+            mosaico.blit(baldosa, (x, y))
+
+    _cache_imagenes[clave] = mosaico
+    return mosaico
+
+
+def decodificar_imagen(ruta):
+    """
+    Lee y decodifica una imagen sin convertirla, para que cargar_imagen no tenga que tocar el disco.
+    Se puede llamar desde otro hilo.
+    :param ruta: Ruta de la imagen relativa a la carpeta de assets.
+    """
+    if ruta in _decodificadas or (ruta, None, True) in _cache_imagenes or (ruta, None, False) in _cache_imagenes:
+        return
+    _decodificadas[ruta] = pygame.image.load(os.path.join(directorio_assets, ruta))
+
+
+def leer_archivo(ruta):
+    """
+    Devuelve el contenido de un archivo de assets, leyéndolo del disco solo la primera vez,
+    o None si no existe. Se puede llamar desde otro hilo.
+    :param ruta: Ruta del archivo relativa a la carpeta de assets.
+    """
+    if ruta not in _archivos:
+        try:
+            with open(os.path.join(directorio_assets, ruta), 'rb') as f:
+                _archivos[ruta] = f.read()
+        except OSError:
+            _archivos[ruta] = None
+    return _archivos[ruta]
+
+
+def obtener_estadisticas():
+    """
+    Devuelve una copia de los contadores del caché junto con el número de imágenes guardadas.
+    """
+    datos = dict(estadisticas)
+    datos['imagenes'] = len(_cache_imagenes)
+    return datos
+
+
+def limpiar_cache():
+    """
+    Vacía el caché y reinicia los contadores (útil si se vuelve a crear la ventana).
+    """
+    _cache_imagenes.clear()
+    _decodificadas.clear()
+    estadisticas['aciertos'] = 0
+    estadisticas['fallos'] = 0
@@ -0,0 +1,150 @@
+import pygame
+from settings import *
+from assets import directorio_assets, leer_archivo
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+
+# --- Gestor de Audio ---
+# Antes, cada cambio de pantalla paraba la música, comprobaba si el archivo existía, lo volvía
+# a leer y a decodificar, y escribía un mensaje en la consola. Eso provocaba un parón cada vez.
+# Ahora:
+#   - Las pistas cortas (JINGLES) se decodifican una sola vez, en un hilo aparte, como
+#     pygame.mixer.Sound. Si hay que saltarse el principio, se recortan sus bytes al cargarlas.
+#   - La música de fondo sigue en streaming con pygame.mixer.music, pero se carga una vez
+#     (desde memoria si el precargador ya leyó el archivo) y después solo se vuelve a reproducir.
+#   - Los archivos que faltan se detectan una sola vez, al crear el gestor.
+#   - El mezclador no se inicia hasta que se pide el primer sonido.
+
+
+class GestorAudio:
+    def __init__(self):
+        """
+        Constructor del gestor de audio. Comprueba qué pistas existen, pero todavía no inicia
+        el mezclador ni carga nada.
+        """
+        # Pistas que existen en la carpeta de assets.
+        self.disponibles = set()
+        for pista in (MUSICA_FONDO, *JINGLES):
+            if os.path.exists(os.path.join(directorio_assets, pista)):
+                self.disponibles.add(pista)
+            else:
+                print(f"Archivo de música no encontrado: {pista} (se jugará sin ella)")
+
+        self.iniciado = False
+        # True si no se pudo iniciar el mezclador (por ejemplo, sin tarjeta de sonido).
+        self.sin_sonido = False
+        # Pista que está sonando (o la última que se pidió).
+        self.pista_actual = None
+        # Jingles en decodificación o ya decodificados: pista -> Future con el Sound.
+        self.jingles = {}
+        # Canal en el que suena el jingle actual.
+        self.canal_jingle = None
+        # True cuando la música de fondo ya está cargada en pygame.mixer.music.
+        self.fondo_cargado = False
+        self._archivo_fondo = None
+        self.ejecutor = None
+
+    def iniciar(self):
+        """
+        Inicia el mezclador y empieza a decodificar los jingles en segundo plano.
+        Se llama sola la primera vez que se reproduce algo.
+        """
+        self.iniciado = True
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            self.sin_sonido = True
+            return
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audio')
+        for pista, recorte in JINGLES.items():
+            if pista in self.disponibles:
+                self.jingles[pista] = self.ejecutor.submit(self.decodificar_jingle, pista, recorte)
+
+    def decodificar_jingle(self, pista, recorte):
+        """
+        Decodifica una pista corta como Sound, saltándose sus primeros 'recorte' segundos.
+        Se ejecuta en el hilo de audio.
+        """
+        sonido = pygame.mixer.Sound(os.path.join(directorio_assets, pista))
+        if recorte > 0:
+            frecuencia, formato, canales = pygame.mixer.get_init()
+            bytes_por_muestra = abs(formato) // 8 * canales
+            datos = sonido.get_raw()
+            sonido = pygame.mixer.Sound(buffer=datos[int(recorte * frecuencia) * bytes_por_muestra:])
+        return sonido
+
+    def reproducir(self, pista):
+        """
+        Reproduce una pista en bucle, parando la que estuviera sonando. No espera a ningún
+        archivo: si el jingle aún no está decodificado, se reproduce en streaming.
+        """
+        if not self.iniciado:
+            self.iniciar()
+        self.pista_actual = pista
+        if self.sin_sonido:
+            return
+
+        self.parar()
+        if pista not in self.disponibles:
+            return
+
+        futuro = self.jingles.get(pista)
+        if futuro is not None and futuro.done() and futuro.exception() is None:
+            self.canal_jingle = futuro.result().play(-1)
+        elif pista == MUSICA_FONDO:
+            if not self.fondo_cargado:
+                self.cargar_musica(pista)
+                self.fondo_cargado = True
+            pygame.mixer.music.play(-1)
+        else:
+            # El jingle aún se está decodificando: lo ponemos en streaming como antes.
+            self.cargar_musica(pista)
+            self.fondo_cargado = False
+            pygame.mixer.music.play(-1, start=JINGLES.get(pista, 0))
+
+    def cargar_musica(self, pista):
+        """
+        Carga una pista en pygame.mixer.music, desde memoria si el archivo ya se leyó.
+        """
+        datos = leer_archivo(pista)
+        if datos is None:
+            pygame.mixer.music.load(os.path.join(directorio_assets, pista))
+            return
+        # pygame lee el archivo mientras suena, así que hay que guardar una referencia.
+        self._archivo_fondo = io.BytesIO(datos)
+        pygame.mixer.music.load(self._archivo_fondo, os.path.splitext(pista)[1][1:])
+
+    def parar(self):
+        """
+        Para la música de fondo y el jingle que estuvieran sonando.
+        """
+        if not self.iniciado or self.sin_sonido:
+            return
+        pygame.mixer.music.stop()
+        if self.canal_jingle is not None:
+            self.canal_jingle.stop()
+            self.canal_jingle = None
+
+    def pausar(self):
+        """
+        Pausa todo el sonido (por ejemplo, al pausar el juego).
+        """
+        if self.iniciado and not self.sin_sonido:
+            pygame.mixer.music.pause()
+            pygame.mixer.pause()
+
+    def reanudar(self):
+        """
+        Reanuda el sonido pausado.
+        """
+        if self.iniciado and not self.sin_sonido:
+            pygame.mixer.music.unpause()
+            pygame.mixer.unpause()
+
+    def cerrar(self):
+        """
+        Termina el hilo de decodificación.
+        """
+        if self.ejecutor is not None:
+            self.ejecutor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,231 @@
+import os
+# Usamos los drivers "dummy" de SDL para que no se abra ninguna ventana ni suene nada.
+# Hay que configurarlos ANTES de importar pygame.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from settings import *
+from simulacion import cargar_mapa, entradas_aleatorias
+
+# --- Benchmarks del Juego ---
+# Genera mapas sintéticos de distintos tamaños, densidades de pared y número de enemigos,
+# y mide para cada uno:
+#   - el tiempo de construcción del nivel,
+#   - el tiempo por paso de la lógica (update de los sprites y colisiones),
+#   - el tiempo por fotograma dibujado,
+#   - el pico de memoria al construir y simular el nivel,
+#   - la memoria aproximada que ocupa el nivel construido (Simulacion.memoria_nivel).
+# Los resultados se guardan en JSON para comparar unos commits con otros.
+#
+# Uso:
+#   python benchmark.py --salida resultados.json
+#   python benchmark.py --salida nuevo.json --comparar resultados.json
+
+# --- Escenarios por Defecto ---
+# (nombre, ancho, alto, densidad de paredes, enemigos E, enemigos V, enemigos C)
+ESCENARIOS = [
+    ('pequeño', 24, 14, 0.15, 2, 1, 0),
+    ('mediano', 100, 100, 0.20, 40, 40, 5),
+    ('grande', 250, 250, 0.20, 250, 250, 20),
+    ('muchos_enemigos', 120, 120, 0.10, 600, 600, 0),
+]
+
+# Veces que se construye cada nivel para medir su tiempo de construcción.
+REPETICIONES_CONSTRUCCION = 5
+
+# Porcentaje a partir del cual una métrica más lenta se considera una regresión.
+UMBRAL_REGRESION = 0.10
+
+
+def generar_mapa(ancho, alto, densidad, enemigos_e=0, enemigos_v=0, enemigos_c=0, semilla=0):
+    """
+    Genera un mapa en el formato de los niveles (#, P, E, V, C, G) con paredes al azar.
+    El borde siempre es pared, el jugador empieza arriba a la izquierda y el objetivo
+    está en la esquina contraria.
+    :param densidad: Probabilidad (0 a 1) de que una casilla interior sea pared.
+    """
+    generador = random.Random(semilla)
+    filas = []
+    for y in range(alto):
+        fila = []
+        for x in range(ancho):
+            borde = x in (0, ancho - 1) or y in (0, alto - 1)
+            fila.append('#' if borde or generador.random() < densidad else ' ')
+        filas.append(fila)
+
+    # Dejamos libres las casillas del jugador y del objetivo.
+    filas[1][1] = 'P'
+    filas[alto - 2][ancho - 2] = 'G'
+
+    # Repartimos los enemigos en casillas libres, lejos del jugador.
+    libres = [(x, y) for y in range(1, alto - 1) for x in range(1, ancho - 1)
+              if filas[y][x] == ' ' and (x > 4 or y > 4)]
+    generador.shuffle(libres)
+    for caracter, cantidad in (('E', enemigos_e), ('V', enemigos_v), ('C', enemigos_c)):
+        for _ in range(min(cantidad, len(libres))):
+            x, y = libres.pop()
+            filas[y][x] = caracter
+
+    return [''.join(fila) for fila in filas]
+
+
+def cronometrar(funcion, *argumentos):
+    """
+    Devuelve cuántos segundos tarda en ejecutarse funcion(*argumentos).
+    """
+    inicio = time.perf_counter()
+    funcion(*argumentos)
+    return time.perf_counter() - inicio
+
+
+def medir_escenario(juego, nombre, mapa, pasos, fotogramas):
+    """
+    Mide un mapa y devuelve un diccionario con los resultados (tiempos en milisegundos).
+    """
+    # --- Construcción del Nivel ---
+    # La primera construcción calienta los cachés (imágenes, mosaicos de paredes).
+    # Nos quedamos con la más rápida de varias repeticiones para reducir el ruido.
+    juego.preparar_nivel(mapa)
+    construccion = min(cronometrar(juego.preparar_nivel, mapa) for _ in range(REPETICIONES_CONSTRUCCION))
+
+    # --- Pasos de Lógica ---
+    # Usamos la mediana de los pasos, que es más estable que la media.
+    entradas = entradas_aleatorias(0)
+    simulacion = juego.simulacion
+    # Ignoramos el resultado: queremos medir siempre el mismo nivel, aunque el jugador muera.
+    paso = statistics.median(cronometrar(simulacion.paso, next(entradas)) for _ in range(pasos))
+
+    # --- Fotogramas Dibujados ---
+    # Entre fotograma y fotograma damos un paso de lógica, pero solo medimos el dibujado.
+    juego.redibujar_todo = True
+    tiempos_dibujo = []
+    for _ in range(fotogramas):
+        simulacion.paso(next(entradas))
+        inicio = time.perf_counter()
+        juego.presentar(juego.componer_fotograma())
+        tiempos_dibujo.append(time.perf_counter() - inicio)
+    dibujo = statistics.median(tiempos_dibujo)
+
+    # --- Memoria ---
+    # tracemalloc ralentiza mucho, así que medimos la memoria en una pasada aparte.
+    tracemalloc.start()
+    juego.preparar_nivel(mapa)
+    for _ in range(min(pasos, 100)):
+        simulacion.paso(next(entradas))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'nombre': nombre,
+        'ancho': max(len(linea) for linea in mapa),
+        'alto': len(mapa),
+        'paredes': len(juego.paredes),
+        'enemigos': sum(linea.count('E') + linea.count('V') + linea.count('C') for linea in mapa),
+        'construccion_ms': construccion * 1000,
+        'paso_ms': paso * 1000,
+        'dibujo_ms': dibujo * 1000,
+        'memoria_pico_kb': pico / 1024,
+        'memoria_nivel_kb': juego.simulacion.memoria_nivel()['bytes'] / 1024,
+    }
+
+
+def commit_actual():
+    """
+    Devuelve el hash del commit actual de git, o None si no se puede averiguar.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(resultados, ruta_base, umbral=UMBRAL_REGRESION):
+    """
+    Compara los resultados con los de un archivo anterior y muestra las diferencias.
+    Devuelve True si alguna métrica ha empeorado más que el umbral.
+    """
+    with open(ruta_base) as f:
+        base = {escenario['nombre']: escenario for escenario in json.load(f)['escenarios']}
+
+    hay_regresion = False
+    for escenario in resultados['escenarios']:
+        anterior = base.get(escenario['nombre'])
+        if anterior is None:
+            continue
+        for metrica in ('construccion_ms', 'paso_ms', 'dibujo_ms', 'memoria_pico_kb', 'memoria_nivel_kb'):
+            # Los archivos antiguos pueden no tener todas las métricas.
+            if not anterior.get(metrica):
+                continue
+            cambio = escenario[metrica] / anterior[metrica] - 1
+            marca = ''
+            if cambio > umbral:
+                marca = '  <-- REGRESIÓN'
+                hay_regresion = True
+            print(f"{escenario['nombre']:>16} {metrica:>16}: {anterior[metrica]:10.3f} -> "
+                  f"{escenario[metrica]:10.3f} ({cambio:+.1%}){marca}")
+    return hay_regresion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del juego sin ventana.")
+    parser.add_argument('--salida', default='benchmark.json', help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument('--comparar', help="Archivo JSON de una ejecución anterior con el que comparar.")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help="Empeoramiento relativo que cuenta como regresión (0.10 = 10%%).")
+    parser.add_argument('--pasos', type=int, default=300, help="Pasos de lógica a medir por escenario.")
+    parser.add_argument('--fotogramas', type=int, default=120, help="Fotogramas a dibujar por escenario.")
+    parser.add_argument('--rapido', action='store_true', help="Solo los escenarios pequeños (para CI).")
+    argumentos = parser.parse_args()
+
+    # Creamos el juego con la ventana "dummy" para medir también el dibujado.
+    from main import Juego
+    juego = Juego()
+
+    escenarios = []
+    # Primero los niveles reales del juego.
+    for indice, ruta in enumerate(LEVEL_MAPS):
+        escenarios.append((os.path.splitext(ruta)[0], cargar_mapa(indice)))
+    # Después los mapas sintéticos.
+    for nombre, ancho, alto, densidad, e, v, c in ESCENARIOS:
+        if argumentos.rapido and ancho * alto > 100 * 100:
+            continue
+        escenarios.append((nombre, generar_mapa(ancho, alto, densidad, e, v, c)))
+
+    resultados = {
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'escenarios': [],
+    }
+    for nombre, mapa in escenarios:
+        resultado = medir_escenario(juego, nombre, mapa, argumentos.pasos, argumentos.fotogramas)
+        resultados['escenarios'].append(resultado)
+        print(f"{nombre:>16}: construcción {resultado['construccion_ms']:8.2f} ms | "
+              f"paso {resultado['paso_ms']:7.3f} ms | dibujo {resultado['dibujo_ms']:7.3f} ms | "
+              f"memoria {resultado['memoria_pico_kb']:9.0f} KB (nivel {resultado['memoria_nivel_kb']:7.0f} KB)")
+
+    with open(argumentos.salida, 'w') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"Resultados guardados en {argumentos.salida}")
+
+    if argumentos.comparar:
+        if comparar(resultados, argumentos.comparar, argumentos.umbral):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
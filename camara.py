@@ -0,0 +1,55 @@
+import pygame
+from settings import *
+
+# --- Cámara ---
+# Cuando el nivel es más grande que la ventana, la cámara sigue al jugador y decide
+# qué parte del nivel se ve. Todo se dibuja desplazado según la posición de la cámara,
+# y solo se dibuja lo que cae dentro de ella, así que el coste de dibujar depende
+# del tamaño de la ventana y no del tamaño del nivel.
+
+class Camara:
+    def __init__(self, ancho_nivel, alto_nivel, ancho=ANCHO_PANTALLA, alto=ALTO_PANTALLA):
+        """
+        Constructor de la cámara.
+        :param ancho_nivel: Ancho del nivel en píxeles.
+        :param alto_nivel: Alto del nivel en píxeles.
+        :param ancho: Ancho de la zona visible (la ventana).
+        :param alto: Alto de la zona visible.
+        """
+        self.ancho_nivel = ancho_nivel
+        self.alto_nivel = alto_nivel
+        # Rectángulo de la zona visible, en coordenadas del nivel.
+        self.rect = pygame.Rect(0, 0, ancho, alto)
+        # Si el nivel cabe entero en la ventana, la cámara nunca se mueve.
+        self.fija = ancho_nivel <= ancho and alto_nivel <= alto
+
+    def seguir(self, objetivo):
+        """
+        Centra la cámara en el rectángulo dado sin salirse de los bordes del nivel.
+        """
+        if self.fija:
+            return
+        self.rect.center = objetivo.center
+        # clamp_ip no funciona si el nivel es más pequeño que la ventana en un eje,
+        # así que limitamos cada eje por separado.
+        self.rect.x = max(0, min(self.rect.x, self.ancho_nivel - self.rect.width))
+        self.rect.y = max(0, min(self.rect.y, self.alto_nivel - self.rect.height))
+
+    def aplicar(self, rect):
+        """
+        Devuelve el rectángulo pasado a coordenadas de la pantalla.
+        """
+        return rect.move(-self.rect.x, -self.rect.y)
+
+    def visible(self, rect):
+        """
+        Indica si el rectángulo (en coordenadas del nivel) se ve en pantalla.
+        """
+        return self.rect.colliderect(rect)
+
+    def zona_activa(self, margen=MARGEN_ZONA_ACTIVA):
+        """
+        Devuelve la zona visible ampliada con un margen (en píxeles). Los enemigos que estén
+        fuera de ella se pueden actualizar con menos frecuencia.
+        """
+        return self.rect.inflate(margen * 2, margen * 2)
@@ -0,0 +1,158 @@
+from collections import deque
+from settings import *
+
+# --- Campo de Flujo ---
+# En lugar de que cada enemigo perseguidor busque su propio camino (por ejemplo con A*),
+# calculamos UNA sola vez, desde la casilla del jugador, la distancia de cada casilla
+# libre del mapa (búsqueda en anchura, BFS). Para cada casilla guardamos cuál es la
+# siguiente casilla en dirección al jugador, así que cualquier perseguidor solo tiene
+# que mirar su casilla para saber hacia dónde ir.
+#
+# El campo solo se recalcula cuando el jugador entra en una casilla nueva, y el cálculo
+# se reparte entre varios pasos (como mucho NODOS_FLUJO_POR_PASO casillas por paso)
+# para no provocar tirones en mapas grandes. Mientras se calcula el campo nuevo,
+# los perseguidores siguen usando el anterior (que lleva al jugador hasta su casilla
+# antigua, y desde ahí lo persiguen en línea recta).
+
+class CampoFlujo:
+    def __init__(self, mapa, presupuesto=NODOS_FLUJO_POR_PASO):
+        """
+        Constructor del campo de flujo.
+        :param mapa: Lista de líneas de texto del nivel ('#' son paredes).
+        :param presupuesto: Máximo de casillas que se procesan en cada paso.
+        """
+        self.alto = len(mapa)
+        self.ancho = max((len(linea) for linea in mapa), default=0)
+        self.presupuesto = presupuesto
+
+        # Casillas por las que se puede pasar (1) o no (0), guardadas fila a fila.
+        self.libre = bytearray(self.ancho * self.alto)
+        for fila, linea in enumerate(mapa):
+            for columna, caracter in enumerate(linea):
+                if caracter != '#':
+                    self.libre[fila * self.ancho + columna] = 1
+
+        # --- Campo Terminado ---
+        # Casilla del jugador para la que se calculó el campo que se está usando.
+        self.objetivo = None
+        # Para cada casilla, el índice de la siguiente casilla hacia el objetivo (-1 si no hay camino).
+        self.siguiente = [-1] * (self.ancho * self.alto)
+        # Para cada casilla, su distancia en casillas hasta el objetivo (-1 si no hay camino).
+        self.distancia = [-1] * (self.ancho * self.alto)
+
+        # --- Campo en Construcción ---
+        self._objetivo_nuevo = None
+        self._siguiente_nuevo = None
+        self._distancia_nueva = None
+        self._cola = deque()
+
+    def actualizar(self, x, y):
+        """
+        Avisa al campo de la posición actual del jugador (en píxeles) y avanza el cálculo.
+        Se llama una vez por paso.
+        """
+        casilla = self.indice(int(x) // TILE_SIZE, int(y) // TILE_SIZE)
+        if casilla is None or not self.libre[casilla]:
+            return
+
+        # Si el jugador ha entrado en una casilla nueva y no hay ningún cálculo en curso,
+        # empezamos un campo nuevo. Si ya hay uno en curso lo dejamos terminar; si el jugador
+        # se ha movido mientras tanto, el siguiente empezará desde su casilla nueva.
+        if self._objetivo_nuevo is None and casilla != self.objetivo:
+            self._empezar(casilla)
+
+        if self._objetivo_nuevo is not None:
+            self._avanzar()
+
+    def _empezar(self, casilla):
+        """
+        Prepara una nueva búsqueda en anchura desde la casilla del jugador.
+        """
+        self._objetivo_nuevo = casilla
+        self._siguiente_nuevo = [-1] * (self.ancho * self.alto)
+        # La casilla del objetivo apunta a sí misma para marcarla como visitada.
+        self._siguiente_nuevo[casilla] = casilla
+        self._distancia_nueva = [-1] * (self.ancho * self.alto)
+        self._distancia_nueva[casilla] = 0
+        self._cola = deque([casilla])
+
+    def _avanzar(self):
+        """
+        Procesa como mucho 'presupuesto' casillas de la búsqueda en curso.
+        Cuando termina, el campo nuevo sustituye al anterior.
+        """
+        ancho = self.ancho
+        libre = self.libre
+        siguiente = self._siguiente_nuevo
+        distancia = self._distancia_nueva
+        cola = self._cola
+        procesadas = 0
+
+        while cola and procesadas < self.presupuesto:
+            actual = cola.popleft()
+            procesadas += 1
+            columna = actual % ancho
+
+            # Vecinas arriba, abajo, izquierda y derecha (sin salirnos de la fila).
+            vecinas = [actual - ancho, actual + ancho]
+            if columna > 0:
+                vecinas.append(actual - 1)
+            if columna < ancho - 1:
+                vecinas.append(actual + 1)
+
+            for vecina in vecinas:
+                if 0 <= vecina < len(libre) and libre[vecina] and siguiente[vecina] == -1:
+                    # Desde la vecina, el camino más corto pasa por la casilla actual.
+                    siguiente[vecina] = actual
+                    distancia[vecina] = distancia[actual] + 1
+                    cola.append(vecina)
+
+        if not cola:
+            # Búsqueda terminada: el campo nuevo pasa a ser el que se usa.
+            self.objetivo = self._objetivo_nuevo
+            self.siguiente = siguiente
+            self.distancia = distancia
+            self._objetivo_nuevo = None
+            self._siguiente_nuevo = None
+            self._distancia_nueva = None
+
+    def estado(self):
+        """
+        Devuelve el campo terminado que se está usando, para poder volver a él con restaurar().
+        Las listas no se copian: una búsqueda nueva siempre crea listas nuevas y nunca
+        modifica las del campo terminado.
+        """
+        return self.objetivo, self.siguiente, self.distancia
+
+    def restaurar(self, estado):
+        """
+        Vuelve al campo devuelto por estado(). Si había una búsqueda en curso se abandona;
+        el siguiente paso empezará otra si el jugador no está en la casilla del campo.
+        """
+        self.objetivo, self.siguiente, self.distancia = estado
+        self._objetivo_nuevo = None
+        self._siguiente_nuevo = None
+        self._distancia_nueva = None
+        self._cola = deque()
+
+    def indice(self, columna, fila):
+        """
+        Convierte una casilla (columna, fila) en su índice, o None si está fuera del mapa.
+        """
+        if 0 <= columna < self.ancho and 0 <= fila < self.alto:
+            return fila * self.ancho + columna
+        return None
+
+    def siguiente_casilla(self, x, y):
+        """
+        Devuelve la casilla (columna, fila) a la que hay que ir desde la posición (x, y)
+        en píxeles para acercarse al jugador, o None si no hay camino conocido
+        o si ya estamos en la casilla del jugador.
+        """
+        casilla = self.indice(int(x) // TILE_SIZE, int(y) // TILE_SIZE)
+        if casilla is None or casilla == self.objetivo:
+            return None
+        destino = self.siguiente[casilla]
+        if destino == -1:
+            return None
+        return destino % self.ancho, destino // self.ancho
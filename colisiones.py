@@ -0,0 +1,308 @@
+from settings import *
+
+# --- Índice Espacial de Paredes ---
+# pygame.sprite.spritecollide comprueba TODAS las paredes del nivel cada vez que se llama.
+# Como las paredes nunca se mueven y están alineadas a la rejilla de tiles del mapa,
+# las guardamos en una rejilla: cada celda sabe qué paredes la ocupan.
+# Así, para un rectángulo solo miramos las pocas celdas que toca.
+
+class RejillaParedes:
+    def __init__(self, tamaño_celda=TILE_SIZE):
+        """
+        Constructor de la rejilla.
+        :param tamaño_celda: Lado de cada celda en píxeles (por defecto, un tile).
+        """
+        self.tamaño_celda = tamaño_celda
+        # Diccionario (columna, fila) -> lista de paredes que ocupan esa celda.
+        self.celdas = {}
+        # Orden en que se añadió cada pared. Lo usamos para devolver las colisiones
+        # en el mismo orden que spritecollide (que sigue el orden del grupo).
+        self.orden = {}
+        self.agregadas = 0
+        # Aumenta cada vez que se añade o se quita una pared. Quien guarde algo calculado a partir
+        # de las paredes (como los tramos de patrulla) sabe así si sigue siendo válido.
+        self.version = 0
+        # Número total de consultas hechas (lo usa el perfilador).
+        self.consultas = 0
+
+    def rango_celdas(self, rect):
+        """
+        Devuelve las columnas y filas que toca un rectángulo.
+        """
+        t = self.tamaño_celda
+        columnas = range(rect.left // t, (rect.right - 1) // t + 1)
+        filas = range(rect.top // t, (rect.bottom - 1) // t + 1)
+        return columnas, filas
+
+    def agregar(self, pared):
+        """
+        Añade una pared a todas las celdas que ocupa.
+        """
+        self.orden[pared] = self.agregadas
+        self.agregadas += 1
+        self.version += 1
+        columnas, filas = self.rango_celdas(pared.rect)
+        for fila in filas:
+            for columna in columnas:
+                self.celdas.setdefault((columna, fila), []).append(pared)
+
+    def quitar(self, pared):
+        """
+        Quita una pared de todas las celdas que ocupa (por ejemplo, al descargar un trozo del nivel).
+        """
+        del self.orden[pared]
+        self.version += 1
+        columnas, filas = self.rango_celdas(pared.rect)
+        for fila in filas:
+            for columna in columnas:
+                celda = self.celdas[(columna, fila)]
+                celda.remove(pared)
+                if not celda:
+                    del self.celdas[(columna, fila)]
+
+    def colisiones(self, rect):
+        """
+        Devuelve la lista de paredes que chocan con el rectángulo dado.
+        Es equivalente a pygame.sprite.spritecollide(sprite, paredes, False).
+        """
+        self.consultas += 1
+        encontradas = []
+        columnas, filas = self.rango_celdas(rect)
+        for fila in filas:
+            for columna in columnas:
+                for pared in self.celdas.get((columna, fila), ()):
+                    if pared not in encontradas and rect.colliderect(pared.rect):
+                        encontradas.append(pared)
+
+        # Si hay varias, las ordenamos como lo haría el grupo de paredes.
+        if len(encontradas) > 1:
+            encontradas.sort(key=self.orden.__getitem__)
+        return encontradas
+
+    def en_zona(self, rect):
+        """
+        Devuelve las paredes que tocan el rectángulo dado, sin ningún orden concreto.
+        Es para dibujar (por ejemplo, las paredes que ve la cámara), así que no cuenta como
+        consulta de colisiones. Tampoco ordena las paredes, porque nunca se solapan.
+        """
+        # Un diccionario para no repetir las paredes que ocupan varias celdas.
+        encontradas = {}
+        columnas, filas = self.rango_celdas(rect)
+        celdas = self.celdas
+        for fila in filas:
+            for columna in columnas:
+                for pared in celdas.get((columna, fila), ()):
+                    if pared not in encontradas and rect.colliderect(pared.rect):
+                        encontradas[pared] = None
+        return list(encontradas)
+
+
+# --- Índice Espacial de Enemigos e Items ---
+# Para saber si el jugador toca a un enemigo o un item, spritecollide recorre el grupo entero
+# en cada paso. Esta rejilla guarda cada sprite en la celda de su esquina superior izquierda,
+# así que una consulta solo mira las celdas que hay alrededor del rectángulo, aunque el nivel
+# tenga miles de enemigos.
+# Mover cada sprite a su celda en cada paso costaría tanto como el propio spritecollide, así que
+# la rejilla se pone al día cada pocos pasos. Entre tanto, la "holgura" dice cuánto se pueden
+# haber alejado los sprites de su celda, y las consultas miran esa distancia más lejos.
+
+class RejillaEntidades:
+    def __init__(self, tamaño_celda=TAMAÑO_CELDA_ENTIDADES):
+        """
+        Constructor de la rejilla.
+        :param tamaño_celda: Lado de cada celda en píxeles.
+        """
+        self.tamaño_celda = tamaño_celda
+        # Diccionario (columna, fila) -> sprites de esa celda (un dict usado como conjunto ordenado).
+        self.celdas = {}
+        # Celda en la que está cada sprite.
+        self.celda_de = {}
+        # Orden en que se añadió cada sprite, para devolver las colisiones en el orden de los grupos.
+        self.orden = {}
+        self.agregados = 0
+        # Lado del sprite más grande: hasta esa distancia, un sprite de una celda vecina puede tocar el rectángulo.
+        self.tamaño_maximo = 0
+        # Píxeles que se pueden haber movido los sprites desde la última vez que se pusieron al día.
+        self.holgura = 0
+        self.consultas = 0
+
+    def celda(self, rect):
+        """
+        Devuelve la celda que contiene la esquina superior izquierda de un rectángulo.
+        """
+        return rect.x // self.tamaño_celda, rect.y // self.tamaño_celda
+
+    def agregar(self, sprite):
+        """
+        Añade un sprite a la celda en la que está.
+        """
+        self.orden[sprite] = self.agregados
+        self.agregados += 1
+        self.tamaño_maximo = max(self.tamaño_maximo, sprite.rect.width, sprite.rect.height)
+        celda = self.celda(sprite.rect)
+        self.celda_de[sprite] = celda
+        self.celdas.setdefault(celda, {})[sprite] = None
+
+    def quitar(self, sprite):
+        """
+        Quita un sprite de la rejilla (no pasa nada si no estaba).
+        """
+        celda = self.celda_de.pop(sprite, None)
+        if celda is None:
+            return
+        del self.orden[sprite]
+        sprites = self.celdas[celda]
+        del sprites[sprite]
+        if not sprites:
+            del self.celdas[celda]
+
+    def mover(self, sprite):
+        """
+        Cambia un sprite de celda si se ha movido a otra. Se llama después de moverlo.
+        """
+        anterior = self.celda_de.get(sprite)
+        nueva = self.celda(sprite.rect)
+        if anterior == nueva or anterior is None:
+            return
+        sprites = self.celdas[anterior]
+        del sprites[sprite]
+        if not sprites:
+            del self.celdas[anterior]
+        self.celda_de[sprite] = nueva
+        self.celdas.setdefault(nueva, {})[sprite] = None
+
+    def actualizar(self, sprites):
+        """
+        Pasa a su celda actual a todos los sprites indicados (normalmente, todos los enemigos)
+        y pone la holgura a cero.
+        """
+        # Es lo mismo que llamar a mover() con cada sprite, pero sin una llamada por sprite.
+        t = self.tamaño_celda
+        celdas = self.celdas
+        celda_de = self.celda_de
+        for sprite in sprites:
+            rect = sprite.rect
+            nueva = (rect.x // t, rect.y // t)
+            anterior = celda_de.get(sprite, nueva)
+            if anterior != nueva:
+                vecinos = celdas[anterior]
+                del vecinos[sprite]
+                if not vecinos:
+                    del celdas[anterior]
+                celda_de[sprite] = nueva
+                celdas.setdefault(nueva, {})[sprite] = None
+        self.holgura = 0
+
+    def colisiones(self, rect, grupo):
+        """
+        Devuelve los sprites del grupo que chocan con el rectángulo.
+        Es equivalente a pygame.sprite.spritecollide con un sprite de ese rectángulo.
+        Los sprites de la rejilla que ya no están en el grupo (por ejemplo, un item recogido) se ignoran.
+        """
+        self.consultas += 1
+        t = self.tamaño_celda
+        # Un sprite cuya esquina esté a más de tamaño_maximo a la izquierda (o arriba) no puede tocarlo.
+        # Además, la celda guardada puede estar hasta holgura píxeles lejos de donde está ahora.
+        holgura = self.holgura
+        columnas = range((rect.left - self.tamaño_maximo - holgura) // t, (rect.right - 1 + holgura) // t + 1)
+        filas = range((rect.top - self.tamaño_maximo - holgura) // t, (rect.bottom - 1 + holgura) // t + 1)
+        encontrados = []
+        for fila in filas:
+            for columna in columnas:
+                for sprite in self.celdas.get((columna, fila), ()):
+                    if sprite in grupo and rect.colliderect(sprite.rect):
+                        encontrados.append(sprite)
+
+        if len(encontrados) > 1:
+            encontrados.sort(key=self.orden.__getitem__)
+        return encontrados
+
+
+# --- Fusión de Paredes ---
+def fusionar_paredes(mapa, caracter='#'):
+    """
+    Agrupa los tiles de pared adyacentes en rectángulos lo más grandes posible.
+    Primero alargamos cada tramo hacia la derecha y luego lo extendemos hacia abajo
+    mientras la fila siguiente tenga paredes en todas esas columnas.
+    :param mapa: Lista de líneas de texto del nivel.
+    :return: Lista de tuplas (columna, fila, ancho, alto) medidas en tiles.
+    """
+    usadas = set()
+    rectangulos = []
+
+    def es_pared(columna, fila):
+        return (fila < len(mapa) and columna < len(mapa[fila])
+                and mapa[fila][columna] == caracter and (columna, fila) not in usadas)
+
+    for fila, linea in enumerate(mapa):
+        for columna in range(len(linea)):
+            if not es_pared(columna, fila):
+                continue
+
+            # Alargamos el tramo hacia la derecha.
+            ancho = 1
+            while es_pared(columna + ancho, fila):
+                ancho += 1
+
+            # Extendemos el tramo hacia abajo mientras la fila completa sea pared.
+            alto = 1
+            while all(es_pared(columna + i, fila + alto) for i in range(ancho)):
+                alto += 1
+
+            for f in range(fila, fila + alto):
+                for c in range(columna, columna + ancho):
+                    usadas.add((c, f))
+            rectangulos.append((columna, fila, ancho, alto))
+
+    return rectangulos
+
+
+# --- Tramos de Patrulla ---
+def tramo_patrulla(ocupacion, ancho, alto, rect, horizontal, tamaño=TILE_SIZE):
+    """
+    Calcula entre qué dos paredes se mueve un patrullero, mirando la rejilla de tiles del mapa.
+    Un patrullero horizontal nunca cambia de fila (ni uno vertical de columna), así que las
+    únicas paredes con las que puede chocar son la primera que encuentre a cada lado
+    en las filas (o columnas) que ocupa su rectángulo.
+    :param ocupacion: bytearray (o bytes) de ancho x alto, fila a fila, con 1 en las paredes.
+    :param ancho: Ancho del mapa en tiles.
+    :param alto: Alto del mapa en tiles.
+    :param rect: Rectángulo inicial del patrullero.
+    :param horizontal: True si patrulla en el eje X, False si en el eje Y.
+    :return: Tupla (minimo, maximo) en píxeles: el borde de la pared contra la que rebota
+             por cada lado, o None si por ese lado no hay pared. Devuelve None si el
+             rectángulo ya empieza tocando una pared (entonces hay que comprobar las colisiones).
+    """
+    if horizontal:
+        # Recorremos columnas; las filas que ocupa el rectángulo son la "banda".
+        inicio, fin, banda0, banda1 = rect.left, rect.right, rect.top, rect.bottom
+        largo, total = ancho, alto
+        def ocupada(posicion, banda):
+            return ocupacion[banda * ancho + posicion]
+    else:
+        inicio, fin, banda0, banda1 = rect.top, rect.bottom, rect.left, rect.right
+        largo, total = alto, ancho
+        def ocupada(posicion, banda):
+            return ocupacion[posicion * ancho + banda]
+
+    banda = range(max(0, banda0 // tamaño), min(total, (banda1 - 1) // tamaño + 1))
+    def hay_pared(posicion):
+        return 0 <= posicion < largo and any(ocupada(posicion, b) for b in banda)
+
+    primera = inicio // tamaño
+    ultima = (fin - 1) // tamaño
+    if any(hay_pared(posicion) for posicion in range(primera, ultima + 1)):
+        return None
+
+    # Fuera del mapa no hay paredes, así que solo buscamos dentro.
+    maximo = None
+    for posicion in range(max(ultima + 1, 0), largo):
+        if hay_pared(posicion):
+            maximo = posicion * tamaño
+            break
+    minimo = None
+    for posicion in range(min(primera - 1, largo - 1), -1, -1):
+        if hay_pared(posicion):
+            minimo = (posicion + 1) * tamaño
+            break
+    return minimo, maximo
@@ -0,0 +1,358 @@
+import pygame
+from settings import *
+from simulacion import Simulacion, obtener_nivel, RESULTADO_ITEM, RESULTADO_MUERTE, RESULTADO_TIEMPO
+from entrada import NINGUNA
+from multiprocessing import shared_memory
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# NumPy es opcional: sin él, el entorno vectorizado devuelve memoryviews en lugar de arrays.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- Entorno para Jugadores Automáticos ---
+# Un entorno al estilo de Gym construido sobre la Simulacion (sin ventana):
+#   obs = entorno.reset(nivel)
+#   obs, recompensa, terminado = entorno.step(accion)
+# La acción son los bits de entrada de entrada.py (de 0 a 15).
+# La observación es una ventana de tiles centrada en el jugador, un byte por tile
+# (ver los códigos de abajo), fila a fila. Lo que queda fuera de la zona por la que puede
+# moverse el jugador cuenta como pared.
+#
+# EntornoVectorizado reparte N entornos entre varios procesos. Las observaciones, las acciones,
+# las recompensas y los finales se escriben en memoria compartida, así que por cada paso
+# solo viaja por las tuberías una orden corta por proceso.
+#
+# Prueba de velocidad:
+#   python entorno.py [entornos] [procesos] [pasos]
+
+# --- Códigos de la Observación ---
+VACIO = 0
+PARED = 1
+ENEMIGO = 2
+ITEM = 3
+
+LADO_OBSERVACION = 2 * RADIO_OBSERVACION + 1
+TAMAÑO_OBSERVACION = LADO_OBSERVACION * LADO_OBSERVACION
+
+# Recompensa según el resultado de Simulacion.paso.
+RECOMPENSAS = {
+    None: RECOMPENSA_PASO,
+    RESULTADO_ITEM: RECOMPENSA_ITEM,
+    RESULTADO_MUERTE: RECOMPENSA_MUERTE,
+    RESULTADO_TIEMPO: RECOMPENSA_TIEMPO,
+}
+
+
+class Entorno:
+    def __init__(self, tiempo_nivel=90, observacion=None):
+        """
+        Constructor del entorno.
+        :param tiempo_nivel: Segundos por nivel.
+        :param observacion: Búfer escribible de TAMAÑO_OBSERVACION bytes donde se escribe la
+                            observación (por ejemplo, un trozo de memoria compartida).
+                            Si no se indica, se crea un bytearray.
+        """
+        self.simulacion = Simulacion(tiempo_nivel)
+        self.observacion = observacion if observacion is not None else bytearray(TAMAÑO_OBSERVACION)
+        # Nivel actual e instantánea tomada al construirlo: reiniciar el mismo nivel solo la restaura.
+        self.nivel = None
+        self.instantanea = None
+        # Resultado del último paso (RESULTADO_ITEM, RESULTADO_MUERTE, RESULTADO_TIEMPO o None).
+        self.resultado = None
+        # Paredes del nivel con un borde de RADIO_OBSERVACION tiles de pared alrededor,
+        # para copiar cada fila de la observación de una vez (ver preparar_capa_paredes).
+        self.capa_paredes = None
+        self.anchura_capa = 0
+        self.rejilla_capa = None
+        self.version_capa = None
+
+    def reset(self, nivel=0):
+        """
+        Empieza un episodio.
+        :param nivel: Índice del nivel en LEVEL_MAPS, o un mapa (lista de líneas o NivelCompilado).
+        :return: La primera observación.
+        """
+        mismo_nivel = nivel is self.nivel or (isinstance(nivel, int) and nivel == self.nivel)
+        if mismo_nivel and self.instantanea is not None:
+            self.simulacion.restaurar(self.instantanea)
+        else:
+            self.simulacion.construir(obtener_nivel(nivel) if isinstance(nivel, int) else nivel)
+            self.nivel = nivel
+            self.instantanea = self.simulacion.tomar_instantanea()
+        self.resultado = None
+        return self.observar()
+
+    def step(self, accion=NINGUNA):
+        """
+        Avanza un paso con la acción dada.
+        :param accion: Bits de entrada (ver entrada.py).
+        :return: Tupla (observación, recompensa, terminado).
+        """
+        self.resultado = self.simulacion.paso(accion)
+        return self.observar(), RECOMPENSAS[self.resultado], self.resultado is not None
+
+    # --- Observación ---
+    def preparar_capa_paredes(self):
+        """
+        Construye la capa de paredes a partir de la rejilla de paredes. Se vuelve a construir
+        si cambia la rejilla (otro nivel) o sus paredes (niveles por trozos).
+        """
+        simulacion = self.simulacion
+        r = RADIO_OBSERVACION
+        # El jugador puede moverse por el nivel o, si es más pequeño, por la pantalla.
+        ancho = -(-max(ANCHO_PANTALLA, simulacion.ancho_nivel) // TILE_SIZE)
+        alto = -(-max(ALTO_PANTALLA, simulacion.alto_nivel) // TILE_SIZE)
+        anchura = ancho + 2 * r
+        capa = bytearray([PARED]) * (anchura * (alto + 2 * r))
+        libre = bytes([VACIO]) * ancho
+        for fila in range(alto):
+            inicio = (fila + r) * anchura + r
+            capa[inicio:inicio + ancho] = libre
+        for columna, fila in simulacion.rejilla_paredes.celdas:
+            if 0 <= columna < ancho and 0 <= fila < alto:
+                capa[(fila + r) * anchura + columna + r] = PARED
+        self.capa_paredes = capa
+        self.anchura_capa = anchura
+        self.rejilla_capa = simulacion.rejilla_paredes
+        self.version_capa = simulacion.rejilla_paredes.version
+
+    def observar(self):
+        """
+        Escribe la observación actual en el búfer de observación y lo devuelve.
+        """
+        simulacion = self.simulacion
+        rejilla = simulacion.rejilla_paredes
+        if rejilla is not self.rejilla_capa or rejilla.version != self.version_capa:
+            self.preparar_capa_paredes()
+
+        lado = LADO_OBSERVACION
+        observacion = self.observacion
+        columna = simulacion.jugador.rect.centerx // TILE_SIZE
+        fila = simulacion.jugador.rect.centery // TILE_SIZE
+
+        # --- Paredes ---
+        # En la capa con borde, la ventana empieza justo en la casilla del jugador.
+        capa, anchura = self.capa_paredes, self.anchura_capa
+        for f in range(lado):
+            inicio = (fila + f) * anchura + columna
+            observacion[f * lado:(f + 1) * lado] = capa[inicio:inicio + lado]
+
+        # --- Enemigos e Items ---
+        # Los buscamos en la rejilla de entidades; cada uno ocupa la casilla de su centro.
+        columna0 = columna - RADIO_OBSERVACION
+        fila0 = fila - RADIO_OBSERVACION
+        zona = pygame.Rect(columna0 * TILE_SIZE, fila0 * TILE_SIZE, lado * TILE_SIZE, lado * TILE_SIZE)
+        for codigo, grupo in ((ITEM, simulacion.items), (ENEMIGO, simulacion.enemigos)):
+            for sprite in simulacion.rejilla_entidades.colisiones(zona, grupo):
+                c = sprite.rect.centerx // TILE_SIZE - columna0
+                f = sprite.rect.centery // TILE_SIZE - fila0
+                if 0 <= c < lado and 0 <= f < lado:
+                    observacion[f * lado + c] = codigo
+
+        motor = simulacion.motor_enemigos
+        if motor is not None and motor.total:
+            c = (motor.x + motor.ancho // 2) // TILE_SIZE - columna0
+            f = (motor.y + motor.alto // 2) // TILE_SIZE - fila0
+            dentro = (c >= 0) & (c < lado) & (f >= 0) & (f < lado)
+            for indice in (f * lado + c)[dentro].tolist():
+                observacion[indice] = ENEMIGO
+        return observacion
+
+
+# --- Entorno Vectorizado ---
+def _trabajador(conexion, nombre_memoria, total, primero, cantidad, tiempo_nivel):
+    """
+    Bucle de cada proceso del entorno vectorizado. Se ocupa de los entornos
+    primero .. primero + cantidad - 1 y espera órdenes por la conexión.
+    """
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    observaciones, acciones, terminados, recompensas = _vistas(memoria.buf, total)
+    entornos = [
+        Entorno(tiempo_nivel, observaciones[i * TAMAÑO_OBSERVACION:(i + 1) * TAMAÑO_OBSERVACION])
+        for i in range(primero, primero + cantidad)
+    ]
+    niveles = [0] * cantidad
+    try:
+        while True:
+            orden, datos = conexion.recv()
+            if orden == 'reset':
+                niveles = datos
+                for entorno, nivel in zip(entornos, niveles):
+                    entorno.reset(nivel)
+            elif orden == 'step':
+                for i, entorno in enumerate(entornos):
+                    _, recompensa, terminado = entorno.step(acciones[primero + i])
+                    recompensas[primero + i] = recompensa
+                    terminados[primero + i] = terminado
+                    # Al terminar, el entorno empieza otro episodio y devuelve su primera observación.
+                    if terminado:
+                        entorno.reset(niveles[i])
+            else:
+                break
+            conexion.send(None)
+    finally:
+        # Hay que soltar las vistas antes de cerrar la memoria compartida.
+        for entorno in entornos:
+            entorno.observacion.release()
+        for vista in (observaciones, acciones, terminados, recompensas):
+            vista.release()
+        memoria.close()
+
+
+def _vistas(buffer, total):
+    """
+    Divide la memoria compartida en observaciones, acciones, finales y recompensas.
+    """
+    vista = memoryview(buffer)
+    inicio_acciones = total * TAMAÑO_OBSERVACION
+    inicio_terminados = inicio_acciones + total
+    # Las recompensas (double) tienen que empezar en un múltiplo de 8 bytes.
+    inicio_recompensas = -(-(inicio_terminados + total) // 8) * 8
+    return (
+        vista[:inicio_acciones],
+        vista[inicio_acciones:inicio_terminados],
+        vista[inicio_terminados:inicio_terminados + total],
+        vista[inicio_recompensas:inicio_recompensas + total * 8].cast('d'),
+    )
+
+
+class EntornoVectorizado:
+    def __init__(self, entornos, procesos=None, tiempo_nivel=90):
+        """
+        Constructor del entorno vectorizado.
+        :param entornos: Número total de entornos.
+        :param procesos: Procesos entre los que se reparten (por defecto, uno por núcleo).
+        :param tiempo_nivel: Segundos por nivel.
+        """
+        self.total = entornos
+        procesos = max(1, min(entornos, procesos or os.cpu_count() or 1))
+        tamaño = -(-(entornos * (TAMAÑO_OBSERVACION + 2)) // 8) * 8 + entornos * 8
+        self.memoria = shared_memory.SharedMemory(create=True, size=tamaño)
+        self.observaciones, self.acciones, self.terminados, self.recompensas = _vistas(self.memoria.buf, entornos)
+        # Con NumPy, los resultados son arrays sobre la misma memoria (se crean una sola vez).
+        self.arrays = None
+        if np is not None:
+            self.arrays = (
+                np.frombuffer(self.observaciones, dtype=np.uint8).reshape(entornos, LADO_OBSERVACION, LADO_OBSERVACION),
+                np.frombuffer(self.recompensas, dtype=np.float64),
+                np.frombuffer(self.terminados, dtype=np.bool_),
+            )
+
+        # Repartimos los entornos entre los procesos lo más igualado posible.
+        self.conexiones = []
+        self.procesos = []
+        # Número de entornos de cada proceso.
+        self.cantidades = []
+        primero = 0
+        for p in range(procesos):
+            cantidad = entornos // procesos + (1 if p < entornos % procesos else 0)
+            nuestra, suya = multiprocessing.Pipe()
+            proceso = multiprocessing.Process(
+                target=_trabajador,
+                args=(suya, self.memoria.name, entornos, primero, cantidad, tiempo_nivel),
+                daemon=True,
+            )
+            proceso.start()
+            self.conexiones.append(nuestra)
+            self.procesos.append(proceso)
+            self.cantidades.append(cantidad)
+            primero += cantidad
+
+    def ordenar(self, orden, datos=None):
+        """
+        Envía una orden a todos los procesos y espera a que terminen.
+        Cada proceso recibe su parte de datos si es una lista con un elemento por entorno.
+        """
+        primero = 0
+        for conexion, cantidad in zip(self.conexiones, self.cantidades):
+            conexion.send((orden, datos[primero:primero + cantidad] if isinstance(datos, list) else datos))
+            primero += cantidad
+        for conexion in self.conexiones:
+            conexion.recv()
+
+    def reset(self, niveles=0):
+        """
+        Empieza un episodio en todos los entornos.
+        :param niveles: Un nivel para todos o una lista con el nivel de cada entorno.
+        :return: Las observaciones (ver resultados).
+        """
+        if not isinstance(niveles, list):
+            niveles = [niveles] * self.total
+        self.ordenar('reset', niveles)
+        return self.resultados()[0]
+
+    def step(self, acciones):
+        """
+        Avanza un paso en todos los entornos. Los entornos que terminan empiezan otro episodio
+        en el mismo nivel, y su observación ya es la del episodio nuevo.
+        :param acciones: Una acción (bits de entrada) por entorno.
+        :return: Tupla (observaciones, recompensas, terminados) (ver resultados).
+        """
+        self.acciones[:] = bytes(acciones)
+        self.ordenar('step')
+        return self.resultados()
+
+    def resultados(self):
+        """
+        Devuelve (observaciones, recompensas, terminados). Con NumPy son arrays de forma
+        (entornos, lado, lado), (entornos,) y (entornos,); sin él, memoryviews planas.
+        Apuntan a la memoria compartida: el siguiente paso los sobrescribe, así que hay que
+        copiarlos si se quieren guardar.
+        """
+        if self.arrays is None:
+            return self.observaciones, self.recompensas, self.terminados
+        return self.arrays
+
+    def cerrar(self):
+        """
+        Termina los procesos y libera la memoria compartida. Antes hay que soltar los arrays
+        devueltos por reset y step (apuntan a esa memoria).
+        """
+        for conexion in self.conexiones:
+            conexion.send(('cerrar', None))
+        for proceso in self.procesos:
+            proceso.join()
+        # Hay que soltar las vistas antes de cerrar la memoria compartida
+        # (y no puede quedar ningún array de resultados en uso).
+        self.arrays = None
+        self.observaciones.release()
+        self.acciones.release()
+        self.terminados.release()
+        self.recompensas.release()
+        self.memoria.unlink()
+        self.memoria.close()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    procesos = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    pasos = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    generador = random.Random(0)
+
+    # --- Un Solo Entorno ---
+    entorno = Entorno()
+    entorno.reset(0)
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        _, _, terminado = entorno.step(generador.getrandbits(4))
+        if terminado:
+            entorno.reset(0)
+    por_segundo = pasos / (time.perf_counter() - inicio)
+    print(f"1 entorno: {por_segundo:.0f} pasos/s")
+
+    # --- Entorno Vectorizado ---
+    vectorizado = EntornoVectorizado(total, procesos)
+    vectorizado.reset(0)
+    inicio = time.perf_counter()
+    for _ in range(pasos):
+        vectorizado.step([generador.getrandbits(4) for _ in range(total)])
+    duracion = time.perf_counter() - inicio
+    print(f"{total} entornos en {len(vectorizado.procesos)} procesos: {pasos * total / duracion:.0f} pasos/s "
+          f"({pasos * total / duracion / por_segundo:.1f}x un entorno)")
+    vectorizado.cerrar()
@@ -0,0 +1,31 @@
+import pygame
+
+# --- Entrada del Jugador ---
+# La entrada de movimiento se representa como un número entero con un bit por dirección.
+# Así la lógica del juego no depende del teclado: puede venir del teclado real,
+# de una lista grabada o de un programa que juega solo.
+
+ARRIBA = 1
+ABAJO = 2
+IZQUIERDA = 4
+DERECHA = 8
+
+# Sin ninguna tecla pulsada.
+NINGUNA = 0
+
+
+def leer_teclado():
+    """
+    Lee el estado actual del teclado y lo convierte en bits de entrada.
+    """
+    teclas = pygame.key.get_pressed()
+    entrada = NINGUNA
+    if teclas[pygame.K_UP] or teclas[pygame.K_w]:
+        entrada |= ARRIBA
+    if teclas[pygame.K_DOWN] or teclas[pygame.K_s]:
+        entrada |= ABAJO
+    if teclas[pygame.K_LEFT] or teclas[pygame.K_a]:
+        entrada |= IZQUIERDA
+    if teclas[pygame.K_RIGHT] or teclas[pygame.K_d]:
+        entrada |= DERECHA
+    return entrada
@@ -0,0 +1,370 @@
+import pygame
+from settings import *
+from campo_flujo import CampoFlujo
+from colisiones import tramo_patrulla
+from nivel_compilado import compilar_mapa
+from collections import Counter
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+# --- Generador de Niveles ---
+# Genera niveles al azar en el formato de los .txt del juego (#, P, E, V, C, G) y los valida:
+#   1. Con una búsqueda en anchura (BFS) desde el objetivo se mira si el jugador puede llegar
+#      y cuántos tiles tiene que recorrer como mínimo. Si el camino es demasiado corto
+#      o no cabe en el tiempo del nivel a VELOCIDAD_JUGADOR, el nivel se descarta.
+#   2. Se simula el patrullaje de los enemigos E y V paso a paso y se busca el camino más
+#      rápido que los esquiva, tile a tile: en cada "turno" (lo que tarda el jugador en
+#      avanzar un tile) puede moverse a un tile vecino o esperar, y solo puede estar en
+#      tiles por los que no pase ningún patrullero durante ese turno. Si no llega al
+#      objetivo con MARGEN_TIEMPO_GENERADO del tiempo del nivel, se descarta.
+#   3. Con ese camino se estima la dificultad (de 0 a 1): el tiempo que usa, cuánto hay que
+#      esperar a los patrulleros, cuántos tiles del camino cruzan sus recorridos y en cuántos
+#      podría alcanzarle un perseguidor.
+# La validación es a nivel de tile y algo conservadora (el jugador real puede pasar pegado
+# a un patrullero), así que algún nivel superable se descarta, pero los aceptados se pueden
+# terminar. Los perseguidores no se simulan: solo cuentan para la dificultad.
+#
+# Cada candidato se genera a partir de su semilla, así que el resultado no depende de cómo se
+# repartan entre procesos. Los candidatos se validan en paralelo con un Pool de procesos.
+#
+# Uso:
+#   python generador.py --candidatos 5000 --cantidad 50 --salida niveles_generados
+#   python generador.py --validar level1.txt level2.txt level3.txt
+# Los niveles guardados se ordenan de más fácil a más difícil; para jugarlos basta con
+# añadirlos a LEVEL_MAPS.
+
+# Pasos de lógica que tarda el jugador en avanzar un tile.
+PASOS_POR_TILE = -(-TILE_SIZE // VELOCIDAD_JUGADOR)
+# Velocidad de los perseguidores (ver EnemigoPerseguidor).
+VELOCIDAD_PERSEGUIDOR = VELOCIDAD_ENEMIGO * 0.8
+
+# Motivos por los que se descarta un nivel.
+SIN_JUGADOR = 'sin_jugador'
+SIN_OBJETIVO = 'sin_objetivo'
+INALCANZABLE = 'inalcanzable'
+DEMASIADO_CERCA = 'demasiado_cerca'
+DEMASIADO_LEJOS = 'demasiado_lejos'
+BLOQUEADO = 'bloqueado'
+
+
+def generar_candidato(semilla, ancho=ANCHO_GENERADO, alto=ALTO_GENERADO):
+    """
+    Genera un nivel al azar: borde de pared, barras de pared sueltas (como en los niveles
+    hechos a mano), el jugador, el objetivo y los enemigos en tiles libres.
+    :param semilla: Semilla del generador aleatorio; la misma semilla da el mismo nivel.
+    :return: Lista de líneas del mapa.
+    """
+    generador = random.Random(semilla)
+    filas = [['#' if x in (0, ancho - 1) or y in (0, alto - 1) else ' ' for x in range(ancho)]
+             for y in range(alto)]
+
+    for _ in range(generador.randint(*BARRAS_GENERADAS)):
+        largo = generador.randint(*LARGO_BARRAS_GENERADAS)
+        if generador.random() < 0.5:
+            x = generador.randint(1, max(1, ancho - 1 - largo))
+            y = generador.randint(1, alto - 2)
+            for columna in range(x, min(x + largo, ancho - 1)):
+                filas[y][columna] = '#'
+        else:
+            x = generador.randint(1, ancho - 2)
+            y = generador.randint(1, max(1, alto - 1 - largo))
+            for fila in range(y, min(y + largo, alto - 1)):
+                filas[fila][x] = '#'
+
+    libres = [(x, y) for y in range(1, alto - 1) for x in range(1, ancho - 1) if filas[y][x] == ' ']
+    generador.shuffle(libres)
+    if len(libres) < 2:
+        return [''.join(fila) for fila in filas]
+
+    # El jugador en cualquier tile libre y el objetivo en el más lejano (en línea recta)
+    # de unos cuantos al azar, para que no salgan demasiados niveles triviales.
+    jugador_x, jugador_y = libres.pop()
+    filas[jugador_y][jugador_x] = 'P'
+    def lejania(casilla):
+        return abs(casilla[0] - jugador_x) + abs(casilla[1] - jugador_y)
+    objetivo = max(libres[-8:], key=lejania)
+    libres.remove(objetivo)
+    filas[objetivo[1]][objetivo[0]] = 'G'
+
+    for caracter, (minimo, maximo) in ENEMIGOS_GENERADOS.items():
+        cercania = DISTANCIA_MINIMA_PERSEGUIDOR if caracter == 'C' else 3
+        posibles = [casilla for casilla in libres if lejania(casilla) >= cercania]
+        for casilla in posibles[:generador.randint(minimo, maximo)]:
+            libres.remove(casilla)
+            filas[casilla[1]][casilla[0]] = caracter
+
+    return [''.join(fila) for fila in filas]
+
+
+class Patrullero:
+    __slots__ = ('horizontal', 'posicion', 'velocidad', 'minimo', 'maximo', 'fija')
+
+    def __init__(self, nivel, caracter, columna, fila):
+        """
+        Un enemigo E o V del nivel, reducido a su coordenada en el eje en el que patrulla.
+        Se mueve exactamente igual que Enemigo y EnemigoVertical (ver su método update).
+        :param nivel: NivelCompilado del mapa.
+        """
+        self.horizontal = caracter == 'E'
+        rect = pygame.Rect(columna * TILE_SIZE, fila * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        self.posicion = rect.x if self.horizontal else rect.y
+        self.velocidad = VELOCIDAD_ENEMIGO
+        # Fila (o columna) de tiles en la que patrulla.
+        self.fija = fila if self.horizontal else columna
+        tramo = tramo_patrulla(nivel.ocupacion, nivel.ancho, nivel.alto, rect, self.horizontal)
+        # Si empieza dentro de una pared, no llega a moverse.
+        self.minimo, self.maximo = tramo if tramo is not None else (self.posicion, self.posicion + TILE_SIZE)
+
+    def avanzar(self):
+        """
+        Avanza un paso de lógica rebotando en los bordes de su tramo.
+        """
+        self.posicion += self.velocidad
+        if self.velocidad > 0 and self.maximo is not None and self.posicion + TILE_SIZE > self.maximo:
+            self.posicion = self.maximo - TILE_SIZE
+            self.velocidad *= -1
+        elif self.velocidad < 0 and self.minimo is not None and self.posicion < self.minimo:
+            self.posicion = self.minimo
+            self.velocidad *= -1
+
+    def tiles(self, desde, hasta):
+        """
+        Devuelve los tiles (columna, fila) que toca entre las posiciones 'desde' y 'hasta' en píxeles.
+        """
+        tiles = range(desde // TILE_SIZE, (hasta + TILE_SIZE - 1) // TILE_SIZE + 1)
+        if self.horizontal:
+            return [(columna, self.fija) for columna in tiles]
+        return [(self.fija, fila) for fila in tiles]
+
+    def recorrido(self, nivel):
+        """
+        Devuelve los tiles por los que pasa en algún momento.
+        """
+        largo = nivel.ancho if self.horizontal else nivel.alto
+        desde = self.minimo if self.minimo is not None else 0
+        hasta = self.maximo - TILE_SIZE if self.maximo is not None else (largo - 1) * TILE_SIZE
+        return self.tiles(desde, hasta)
+
+
+def validar(mapa, tiempo_nivel=90):
+    """
+    Comprueba si un nivel se puede terminar y estima su dificultad.
+    :param mapa: Lista de líneas del nivel.
+    :param tiempo_nivel: Segundos que tiene el jugador para terminar el nivel.
+    :return: Diccionario con 'valido', 'motivo' (None o por qué se descarta), 'distancia'
+             (tiles del camino más corto sin enemigos), 'turnos' (tiles avanzados o esperados
+             por el camino que esquiva a los patrulleros), 'segundos' (lo que tarda ese camino),
+             'cruces', 'emboscadas' y 'dificultad'. Si el nivel se descarta antes de
+             buscar el camino, solo están las claves que se llegaron a calcular.
+    """
+    nivel = compilar_mapa(mapa)
+    resultado = {'valido': False, 'motivo': None}
+    if nivel.inicio_jugador is None:
+        resultado['motivo'] = SIN_JUGADOR
+        return resultado
+    objetivos = {(columna, fila) for caracter, columna, fila in nivel.entidades if caracter == 'G'}
+    if not objetivos:
+        resultado['motivo'] = SIN_OBJETIVO
+        return resultado
+
+    # --- Distancia sin Enemigos ---
+    # El campo de flujo calculado desde el objetivo tiene la distancia de cada tile hasta él.
+    ancho = nivel.ancho
+    campo = CampoFlujo(mapa, presupuesto=ancho * nivel.alto)
+    distancia = -1
+    for columna, fila in objetivos:
+        campo.actualizar(columna * TILE_SIZE, fila * TILE_SIZE)
+        hasta_objetivo = campo.distancia[nivel.inicio_jugador[1] * ancho + nivel.inicio_jugador[0]]
+        if hasta_objetivo != -1 and (distancia == -1 or hasta_objetivo < distancia):
+            distancia = hasta_objetivo
+    resultado['distancia'] = distancia
+    limite_pasos = int(tiempo_nivel * FPS * MARGEN_TIEMPO_GENERADO)
+    if distancia == -1:
+        resultado['motivo'] = INALCANZABLE
+        return resultado
+    if distancia < DISTANCIA_MINIMA_OBJETIVO:
+        resultado['motivo'] = DEMASIADO_CERCA
+        return resultado
+    if distancia * PASOS_POR_TILE > limite_pasos:
+        resultado['motivo'] = DEMASIADO_LEJOS
+        return resultado
+
+    # --- Camino Esquivando a los Patrulleros ---
+    patrulleros = [Patrullero(nivel, caracter, columna, fila)
+                   for caracter, columna, fila in nivel.entidades if caracter in 'EV']
+    libre = campo.libre
+    alto = nivel.alto
+    # Para cada turno, de qué tile se llegó a cada tile alcanzable.
+    anteriores = []
+    alcanzables = {nivel.inicio_jugador: None}
+    llegada = None
+    for turno in range(limite_pasos // PASOS_POR_TILE):
+        # Tiles que algún patrullero toca durante el turno.
+        peligro = set()
+        for patrullero in patrulleros:
+            desde = hasta = patrullero.posicion
+            for _ in range(PASOS_POR_TILE):
+                patrullero.avanzar()
+                desde = min(desde, patrullero.posicion)
+                hasta = max(hasta, patrullero.posicion)
+            peligro.update(patrullero.tiles(desde, hasta))
+
+        nuevas = {}
+        for casilla in alcanzables:
+            if casilla in peligro:
+                continue
+            columna, fila = casilla
+            for destino in (casilla, (columna + 1, fila), (columna - 1, fila), (columna, fila + 1), (columna, fila - 1)):
+                if (destino not in nuevas and destino not in peligro and 0 <= destino[0] < ancho
+                        and 0 <= destino[1] < alto and libre[destino[1] * ancho + destino[0]]):
+                    nuevas[destino] = casilla
+        anteriores.append(nuevas)
+        llegada = next((objetivo for objetivo in objetivos if objetivo in nuevas), None)
+        if llegada is not None or not nuevas:
+            break
+        alcanzables = nuevas
+
+    if llegada is None:
+        resultado['motivo'] = BLOQUEADO
+        return resultado
+
+    # Reconstruimos el camino (un tile por turno) desde el objetivo hacia atrás.
+    camino = [llegada]
+    for nuevas in reversed(anteriores[1:]):
+        camino.append(nuevas[camino[-1]])
+    camino.reverse()
+    turnos = len(camino)
+    segundos = turnos * PASOS_POR_TILE / FPS
+
+    # --- Dificultad ---
+    # Cruces: tiles del camino por los que pasa algún patrullero.
+    recorridos = set()
+    for patrullero in patrulleros:
+        recorridos.update(patrullero.recorrido(nivel))
+    cruces = len(set(camino) & recorridos)
+    # Emboscadas: tiles del camino a los que algún perseguidor podría llegar antes que el jugador.
+    llegada_perseguidores = {}
+    for caracter, columna, fila in nivel.entidades:
+        if caracter != 'C':
+            continue
+        campo.actualizar(columna * TILE_SIZE, fila * TILE_SIZE)
+        for casilla in set(camino):
+            tiles = campo.distancia[casilla[1] * ancho + casilla[0]]
+            if tiles != -1:
+                pasos = tiles * TILE_SIZE / VELOCIDAD_PERSEGUIDOR
+                llegada_perseguidores[casilla] = min(pasos, llegada_perseguidores.get(casilla, pasos))
+    emboscadas = sum(1 for turno, casilla in enumerate(camino)
+                     if llegada_perseguidores.get(casilla, float('inf')) <= (turno + 1) * PASOS_POR_TILE)
+
+    esperas = turnos - distancia
+    dificultad = (0.4 * segundos / (tiempo_nivel * MARGEN_TIEMPO_GENERADO)
+                  + 0.2 * min(1.0, esperas / distancia)
+                  + 0.3 * min(1.0, cruces / 10)
+                  + 0.1 * min(1.0, emboscadas / 5))
+    resultado.update(valido=True, turnos=turnos, segundos=round(segundos, 2), cruces=cruces,
+                     emboscadas=emboscadas, dificultad=round(min(1.0, dificultad), 3))
+    return resultado
+
+
+def _evaluar(argumentos):
+    """
+    Genera y valida un candidato. Se ejecuta en los procesos del Pool.
+    :param argumentos: Tupla (semilla, ancho, alto, tiempo_nivel).
+    :return: Tupla (semilla, mapa o None si se descarta, resultado de validar).
+    """
+    semilla, ancho, alto, tiempo_nivel = argumentos
+    mapa = generar_candidato(semilla, ancho, alto)
+    resultado = validar(mapa, tiempo_nivel)
+    # Solo devolvemos el mapa de los aceptados, para no mandar de vuelta los descartados.
+    return semilla, mapa if resultado['valido'] else None, resultado
+
+
+def generar_paquete(candidatos, semilla=0, procesos=None, ancho=ANCHO_GENERADO, alto=ALTO_GENERADO,
+                    tiempo_nivel=90):
+    """
+    Genera y valida 'candidatos' niveles en paralelo.
+    :param semilla: Semilla del primer candidato; el resto usan las siguientes.
+    :param procesos: Número de procesos (por defecto, uno por núcleo). Con 1 no se crea el Pool.
+    :return: Tupla (aceptados, motivos): lista de (semilla, mapa, resultado) ordenada de más
+             fácil a más difícil, y un Counter con cuántos candidatos se descartaron por cada motivo.
+    """
+    argumentos = [(semilla + i, ancho, alto, tiempo_nivel) for i in range(candidatos)]
+    procesos = max(1, min(candidatos, procesos or os.cpu_count() or 1))
+    if procesos == 1:
+        resultados = map(_evaluar, argumentos)
+        return _clasificar(resultados)
+    # Lotes grandes para que cada mensaje entre procesos lleve muchos candidatos.
+    lote = max(1, candidatos // (procesos * 8))
+    with multiprocessing.Pool(procesos) as pool:
+        return _clasificar(pool.imap_unordered(_evaluar, argumentos, chunksize=lote))
+
+
+def _clasificar(resultados):
+    """
+    Separa los candidatos aceptados de los descartados (ver generar_paquete).
+    """
+    aceptados = []
+    motivos = Counter()
+    for semilla, mapa, resultado in resultados:
+        if resultado['valido']:
+            aceptados.append((semilla, mapa, resultado))
+        else:
+            motivos[resultado['motivo']] += 1
+    # Ordenamos también por semilla para que el orden no dependa del reparto entre procesos.
+    aceptados.sort(key=lambda aceptado: (aceptado[2]['dificultad'], aceptado[0]))
+    return aceptados, motivos
+
+
+def elegir(aceptados, cantidad):
+    """
+    Elige 'cantidad' niveles repartidos por igual entre el más fácil y el más difícil.
+    """
+    if cantidad >= len(aceptados):
+        return aceptados
+    if cantidad <= 1:
+        return aceptados[:cantidad]
+    return [aceptados[round(i * (len(aceptados) - 1) / (cantidad - 1))] for i in range(cantidad)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador y validador de niveles.")
+    parser.add_argument('--candidatos', type=int, default=2000, help="Niveles a generar y validar.")
+    parser.add_argument('--cantidad', type=int, default=20, help="Niveles a guardar.")
+    parser.add_argument('--semilla', type=int, default=0, help="Semilla del primer candidato.")
+    parser.add_argument('--procesos', type=int, help="Procesos en paralelo (por defecto, uno por núcleo).")
+    parser.add_argument('--tiempo', type=int, default=90, help="Segundos por nivel.")
+    parser.add_argument('--salida', default='niveles_generados', help="Carpeta donde guardar los niveles.")
+    parser.add_argument('--validar', nargs='+', metavar='NIVEL', help="Solo valida estos archivos de nivel.")
+    argumentos = parser.parse_args()
+
+    if argumentos.validar:
+        for ruta in argumentos.validar:
+            with open(ruta, 'rt') as f:
+                mapa = [linea.strip() for linea in f]
+            print(f"{ruta}: {validar(mapa, argumentos.tiempo)}")
+        return
+
+    inicio = time.perf_counter()
+    aceptados, motivos = generar_paquete(argumentos.candidatos, argumentos.semilla,
+                                         argumentos.procesos, tiempo_nivel=argumentos.tiempo)
+    duracion = time.perf_counter() - inicio
+    print(f"{argumentos.candidatos} candidatos en {duracion:.2f} s "
+          f"({argumentos.candidatos / max(duracion, 1e-9):.0f} por segundo), {len(aceptados)} aceptados")
+    for motivo, total in motivos.most_common():
+        print(f"  descartados por {motivo}: {total}")
+
+    elegidos = elegir(aceptados, argumentos.cantidad)
+    os.makedirs(argumentos.salida, exist_ok=True)
+    for numero, (semilla, mapa, resultado) in enumerate(elegidos, 1):
+        ruta = os.path.join(argumentos.salida, f"nivel_{numero:03d}.txt")
+        with open(ruta, 'wt') as f:
+            f.write('\n'.join(mapa))
+        print(f"{ruta}: semilla {semilla}, dificultad {resultado['dificultad']}, "
+              f"{resultado['distancia']} tiles, {resultado['segundos']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from settings import *
+from simulacion import Simulacion
+from array import array
+import random
+import struct
+import sys
+import time
+import zlib
+
+# --- Grabación y Repetición de Partidas ---
+# El grabador guarda, para cada paso de lógica, los bits de entrada que leyó el jugador
+# (ver entrada.py) y si se pulsó ESC para pausar o reanudar antes de ese paso. También guarda
+# un hash barato (CRC32) de las posiciones de todas las entidades después del paso.
+# La partida se divide en segmentos: uno cada vez que empieza un nivel o se reaparece.
+#
+# La repetición vuelve a construir cada nivel y le pasa las mismas entradas, sin ventana y sin
+# limitar los FPS, comparando el hash en cada paso. Sirve para:
+#   - reproducir fallos enviados por los jugadores,
+#   - comprobar que un cambio no altera el comportamiento (si altera algo, se ve el primer paso distinto),
+#   - usar partidas reales como benchmark repetible.
+#
+# Uso:
+#   python main.py --grabar partida.grab
+#   python grabacion.py partida.grab
+#
+# La repetición actualiza siempre a todos los enemigos, así que para grabar hay que dejar
+# ACTUALIZAR_FUERA_PANTALLA_CADA a 1.
+#
+# Formato del archivo (enteros en little-endian):
+#   cabecera: 'GRAB', versión, semilla, segundos por nivel, número de segmentos
+#   cada segmento: nivel, número de pasos, longitud de los datos comprimidos,
+#                  y con zlib: un byte por paso y después un CRC32 (4 bytes) por paso
+
+MAGICO = b'GRAB'
+VERSION = 1
+CABECERA = struct.Struct('<4sHIHI')
+CABECERA_SEGMENTO = struct.Struct('<HII')
+# Bit del byte de cada paso que indica que antes de él se pulsó ESC (para pausar o reanudar).
+BIT_PAUSA = 16
+# Bits de movimiento (ARRIBA, ABAJO, IZQUIERDA y DERECHA).
+MASCARA_MOVIMIENTO = 15
+
+
+def hash_estado(simulacion):
+    """
+    Devuelve un CRC32 de las posiciones del jugador, los enemigos (sprites y motor de NumPy)
+    y los items que quedan. Es barato de calcular y cambia si cualquier entidad se mueve distinto.
+    """
+    posiciones = array('i')
+    for sprite in simulacion.enemigos:
+        posiciones.extend(sprite.rect.topleft)
+    for item in simulacion.items:
+        posiciones.extend(item.rect.topleft)
+    posiciones.extend(simulacion.jugador.rect.topleft)
+    valor = zlib.crc32(posiciones.tobytes())
+    motor = simulacion.motor_enemigos
+    if motor is not None and motor.total:
+        valor = zlib.crc32(motor.x.tobytes(), valor)
+        valor = zlib.crc32(motor.y.tobytes(), valor)
+    return valor
+
+
+class Segmento:
+    def __init__(self, nivel):
+        """
+        Los pasos de un intento de un nivel.
+        :param nivel: Índice del nivel en LEVEL_MAPS.
+        """
+        self.nivel = nivel
+        # Un byte por paso: bits de movimiento y BIT_PAUSA.
+        self.entradas = bytearray()
+        # CRC32 del estado después de cada paso.
+        self.hashes = array('I')
+
+
+class Grabador:
+    def __init__(self, ruta, semilla=0, tiempo_nivel=90):
+        """
+        Constructor del grabador.
+        :param ruta: Archivo donde se guardará la partida.
+        :param semilla: Semilla del generador aleatorio de cada nivel.
+        :param tiempo_nivel: Segundos por nivel (la repetición tiene que usar los mismos).
+        """
+        self.ruta = ruta
+        self.semilla = semilla
+        self.tiempo_nivel = tiempo_nivel
+        self.segmentos = []
+        self.pausa_pendiente = False
+
+    def empezar_segmento(self, nivel):
+        """
+        Empieza un segmento nuevo. Se llama cada vez que empieza (o se reinicia) un nivel.
+        """
+        random.seed(self.semilla + nivel)
+        self.segmentos.append(Segmento(nivel))
+        self.pausa_pendiente = False
+
+    def marcar_pausa(self):
+        """
+        Anota que se ha pulsado ESC; se guardará en el siguiente paso.
+        """
+        self.pausa_pendiente = True
+
+    def registrar(self, entrada, simulacion):
+        """
+        Guarda la entrada de un paso y el hash del estado que ha dejado.
+        """
+        segmento = self.segmentos[-1]
+        if self.pausa_pendiente:
+            entrada |= BIT_PAUSA
+            self.pausa_pendiente = False
+        segmento.entradas.append(entrada)
+        segmento.hashes.append(hash_estado(simulacion))
+
+    def guardar(self):
+        """
+        Escribe la partida en el archivo. Los segmentos sin pasos no se guardan.
+        """
+        segmentos = [segmento for segmento in self.segmentos if segmento.entradas]
+        with open(self.ruta, 'wb') as f:
+            f.write(CABECERA.pack(MAGICO, VERSION, self.semilla, self.tiempo_nivel, len(segmentos)))
+            for segmento in segmentos:
+                datos = zlib.compress(bytes(segmento.entradas) + segmento.hashes.tobytes(), 9)
+                f.write(CABECERA_SEGMENTO.pack(segmento.nivel, len(segmento.entradas), len(datos)))
+                f.write(datos)
+
+
+def leer_grabacion(ruta):
+    """
+    Lee un archivo de partida.
+    :return: Tupla (semilla, tiempo_nivel, lista de Segmento).
+    """
+    with open(ruta, 'rb') as f:
+        magico, version, semilla, tiempo_nivel, total = CABECERA.unpack(f.read(CABECERA.size))
+        if magico != MAGICO or version != VERSION:
+            raise ValueError(f"{ruta} no es una partida grabada válida")
+        segmentos = []
+        for _ in range(total):
+            nivel, pasos, longitud = CABECERA_SEGMENTO.unpack(f.read(CABECERA_SEGMENTO.size))
+            datos = zlib.decompress(f.read(longitud))
+            segmento = Segmento(nivel)
+            segmento.entradas = bytearray(datos[:pasos])
+            segmento.hashes.frombytes(datos[pasos:])
+            segmentos.append(segmento)
+    return semilla, tiempo_nivel, segmentos
+
+
+def reproducir(ruta, comprobar=True):
+    """
+    Repite una partida grabada tan rápido como se pueda, sin ventana.
+    :param comprobar: Si es True, compara el hash del estado en cada paso.
+    :return: Diccionario con los pasos, el tiempo, las pausas y el primer paso distinto
+             (None si todo coincide), como (segmento, paso).
+    """
+    semilla, tiempo_nivel, segmentos = leer_grabacion(ruta)
+    simulacion = Simulacion(tiempo_nivel)
+    pasos = pausas = 0
+    primera_diferencia = None
+    duracion = 0.0
+
+    for numero, segmento in enumerate(segmentos):
+        random.seed(semilla + segmento.nivel)
+        simulacion.cargar_nivel(segmento.nivel)
+        # Solo medimos los pasos, no la construcción del nivel.
+        inicio = time.perf_counter()
+        for i, byte in enumerate(segmento.entradas):
+            if byte & BIT_PAUSA:
+                # La pausa no cambia la simulación; solo la contamos.
+                pausas += 1
+            simulacion.paso(byte & MASCARA_MOVIMIENTO)
+            if comprobar and primera_diferencia is None and hash_estado(simulacion) != segmento.hashes[i]:
+                primera_diferencia = (numero, i)
+        duracion += time.perf_counter() - inicio
+        pasos += len(segmento.entradas)
+
+    return {
+        'segmentos': len(segmentos),
+        'pasos': pasos,
+        'pausas': pausas,
+        'segundos': duracion,
+        'primera_diferencia': primera_diferencia,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python grabacion.py partida.grab [--sin-comprobar]")
+        sys.exit(1)
+    resultado = reproducir(sys.argv[1], comprobar='--sin-comprobar' not in sys.argv)
+    pasos, segundos = resultado['pasos'], resultado['segundos']
+    print(f"{resultado['segmentos']} segmentos, {pasos} pasos en {segundos:.2f} s "
+          f"({pasos / max(segundos, 1e-9):.0f} pasos/s, {pasos / max(segundos, 1e-9) / FPS:.0f}x tiempo real), "
+          f"{resultado['pausas']} pausas")
+    if resultado['primera_diferencia'] is None:
+        print("La repetición coincide paso a paso con la grabación.")
+    else:
+        segmento, paso = resultado['primera_diferencia']
+        print(f"DIFERENCIA: el estado deja de coincidir en el segmento {segmento}, paso {paso}.")
+        sys.exit(1)
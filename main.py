@@ -1,10 +1,27 @@
+import time
+# Momento en que arranca el programa, para medir cuánto se tarda en mostrar el primer fotograma.
+INICIO_PROGRAMA = time.perf_counter()
+
 import pygame
 import sys
 # Importamos todo desde nuestro archivo de settings.
 from settings import *
-# Importamos las clases Jugador, Pared y Enemigo desde el archivo sprites.
-from sprites import Jugador, Pared, Enemigo, EnemigoVertical, Item
-import os
+# Importamos la simulación, que contiene la lógica de los niveles sin depender de la ventana.
+from simulacion import Simulacion, RESULTADO_ITEM, RESULTADO_MUERTE, RESULTADO_TIEMPO
+# Importamos la lectura del teclado como bits de entrada.
+from entrada import leer_teclado
+# Importamos el caché de fuentes y textos renderizados.
+from textos import CacheTextos, buscar_fuente
+# Importamos el perfilador que mide cuánto tarda cada fase del fotograma.
+from perfilador import Perfilador
+# Importamos la cámara que sigue al jugador en los niveles más grandes que la ventana.
+from camara import Camara
+# Importamos el precargador, que prepara el siguiente nivel en segundo plano.
+from precarga import Precargador
+# Importamos el gestor de audio, que precarga los jingles y no bloquea al cambiar de pista.
+from audio import GestorAudio
+# Importamos el grabador de partidas (entradas de cada paso, para repetirlas después).
+from grabacion import Grabador
 
 # Las constantes como ANCHO_PANTALLA, FPS, NEGRO, etc., ahora se importan
 # desde el archivo settings.py
@@ -13,15 +30,22 @@ import os
 # Usaremos una clase para organizar todo el código de nuestro juego.
 # Esto nos permite agrupar las variables y funciones relacionadas en un solo lugar.
 class Juego:
-    def __init__(self):
+    def __init__(self, ruta_grabacion=None):
         """
         Constructor de la clase Juego.
         Aquí es donde inicializamos Pygame y configuramos la ventana del juego.
+        :param ruta_grabacion: Si se indica, la partida se graba en ese archivo (ver grabacion.py).
         """
-        # Inicializa todos los módulos de Pygame. Es necesario hacerlo siempre al principio.
-        pygame.init()
-        # Inicializamos el módulo de sonido para la música.
-        pygame.mixer.init()
+        # Iniciamos solo los módulos de Pygame que usamos (pygame.init() los inicia todos).
+        # El módulo de sonido lo inicia el gestor de audio la primera vez que suena algo.
+        pygame.display.init()
+        pygame.font.init()
+        self.audio = GestorAudio()
+
+        # Mientras se crea la ventana, otros hilos decodifican las imágenes y preparan el primer nivel.
+        self.precargador = Precargador()
+        self.precargador.decodificar_imagenes()
+        self.precargador.solicitar(0)
 
         # Creamos la pantalla del juego con las dimensiones que definimos en settings.py
         self.pantalla = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
@@ -33,8 +57,12 @@ class Juego:
         self.reloj = pygame.time.Clock()
 
         # --- Fuentes de Texto ---
-        # Guardamos el nombre de una fuente para usarla más tarde.
-        self.nombre_fuente = pygame.font.match_font('arial')
+        # Guardamos la ruta de una fuente para usarla más tarde (se busca en el sistema solo la primera vez).
+        self.nombre_fuente = buscar_fuente()
+        # Caché de fuentes y textos para no rasterizar el mismo texto en cada fotograma.
+        self.textos = CacheTextos(self.nombre_fuente)
+        # Pantallas de menú ya compuestas (inicio, game over, victoria).
+        self.pantallas_menu = {}
         # Estado actual del juego para manejar las diferentes pantallas.
         self.estado = 'inicio'
         # Índice del nivel actual.
@@ -42,38 +70,33 @@ class Juego:
         # Vidas restantes del jugador.
         self.vidas_jugador = VIDAS_JUGADOR
         self.tiempo_nivel = 90  # segundos
-        self.tiempo_restante = self.tiempo_nivel
+        # La simulación guarda los sprites del nivel y el tiempo restante.
+        self.simulacion = Simulacion(self.tiempo_nivel)
         self.mostrar_mensaje_nivel = False
         self.mensaje_nivel_timer = 0
-        self.musica_cargada = False
-        self.musica_actual = None
+        # True cuando el mensaje de nivel o el de pausa ya están en pantalla (no hace falta repetirlos).
+        self.pantalla_estatica_dibujada = False
         
         # --- Sistema de Pausa ---
         self.pausado = False
 
-    def reproducir_musica(self, tipo_musica=MUSICA_FONDO, tiempo_inicio=0):
+        # --- Perfilador ---
+        self.perfilador = Perfilador()
+        # Segundos que se tardó en mostrar el primer fotograma (None hasta que se muestra).
+        self.tiempo_primer_fotograma = None
+        # Número de blits del último fotograma dibujado.
+        self.blits_fotograma = 0
+
+        # --- Grabación de la Partida ---
+        self.grabador = None
+        if ruta_grabacion is not None:
+            self.grabador = Grabador(ruta_grabacion, tiempo_nivel=self.tiempo_nivel)
+
+    def reproducir_musica(self, tipo_musica=MUSICA_FONDO):
         """
-        Intenta cargar y reproducir la música especificada.
+        Reproduce la música especificada a través del gestor de audio.
         """
-        # Si ya hay música reproduciéndose, la paramos.
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
-        
-        # Construimos la ruta completa al archivo de música.
-        ruta_musica = os.path.join(os.path.dirname(__file__), CARPETA_ASSETS, tipo_musica)
-        
-        # Comprobamos si el archivo existe antes de intentar cargarlo.
-        if os.path.exists(ruta_musica):
-            try:
-                pygame.mixer.music.load(ruta_musica)
-                pygame.mixer.music.play(-1, start=tiempo_inicio)  # -1 significa que se repite infinitamente
-                self.musica_actual = tipo_musica
-                print(f"Música cargada exitosamente: {ruta_musica}")
-            except Exception as e:
-                print(f"Error al cargar la música {tipo_musica}: {e}")
-        else:
-            print(f"Archivo de música no encontrado: {ruta_musica}")
-            print(f"Asegúrate de tener un archivo '{tipo_musica}' en la carpeta 'assets'")
+        self.audio.reproducir(tipo_musica)
 
     def reproducir_musica_fondo(self):
         """
@@ -83,9 +106,9 @@ class Juego:
 
     def reproducir_musica_game_over(self):
         """
-        Reproduce la música de Game Over iniciando desde el segundo 1.
+        Reproduce la música de Game Over (el gestor de audio la recorta para que empiece en el segundo 0.5).
         """
-        self.reproducir_musica(MUSICA_GAME_OVER, tiempo_inicio=0.5)
+        self.reproducir_musica(MUSICA_GAME_OVER)
 
     def reproducir_musica_victoria(self):
         """
@@ -97,56 +120,54 @@ class Juego:
         """
         Función de ayuda para dibujar texto en la pantalla.
         """
-        # Creamos un objeto de fuente.
-        fuente = pygame.font.Font(self.nombre_fuente, tamaño)
-        # Creamos una superficie de texto (el texto real). El True es para el antialiasing.
-        superficie_texto = fuente.render(texto, True, color)
+        # Obtenemos la superficie del texto desde el caché.
+        # Solo se vuelve a rasterizar si el texto, el tamaño o el color cambian.
+        superficie_texto = self.textos.render(texto, tamaño, color)
         # Obtenemos el rectángulo de la superficie del texto.
         rect_texto = superficie_texto.get_rect()
         # Centramos el rectángulo en la posición dada.
         rect_texto.center = (x, y)
         # Dibujamos el texto en la pantalla principal.
         self.pantalla.blit(superficie_texto, rect_texto)
+        # Devolvemos la zona ocupada por si hay que repintarla después.
+        return rect_texto
 
     def dibujar_hud(self):
         """
         Dibuja el Head-Up Display (vidas, tiempo, etc.)
+        Devuelve la lista de rectángulos que ha ocupado.
         """
         # Muestra las vidas en la esquina superior izquierda.
-        self.dibujar_texto(f'Vidas: {self.vidas_jugador}', 22, BLANCO, 60, 15)
+        rect_vidas = self.dibujar_texto(f'Vidas: {self.vidas_jugador}', 22, BLANCO, 60, 15)
         
         # Muestra el tiempo restante en la esquina superior derecha.
         # Convertimos el tiempo a entero para evitar decimales.
-        tiempo_entero = int(self.tiempo_restante)
-        self.dibujar_texto(f'Tiempo: {tiempo_entero}', 22, BLANCO, ANCHO_PANTALLA - 100, 15)
+        tiempo_entero = int(self.simulacion.tiempo_restante)
+        rect_tiempo = self.dibujar_texto(f'Tiempo: {tiempo_entero}', 22, BLANCO, ANCHO_PANTALLA - 100, 15)
         
         # Mostramos instrucciones de pausa en la esquina inferior.
-        self.dibujar_texto('ESC = Pausa', 16, BLANCO, 100, ALTO_PANTALLA - 15)
+        rect_pausa = self.dibujar_texto('ESC = Pausa', 16, BLANCO, 100, ALTO_PANTALLA - 15)
+        return [rect_vidas, rect_tiempo, rect_pausa]
 
     def cargar_mapa(self):
         """
         Carga el mapa actual desde la lista de niveles.
+        El nivel ya compilado se guarda en memoria, así que al reiniciarlo no se vuelve a leer.
         """
-        directorio_juego = os.path.dirname(__file__)
-        mapa_actual_path = LEVEL_MAPS[self.nivel_actual_idx]
-        self.mapa = []
-        with open(os.path.join(directorio_juego, mapa_actual_path), 'rt') as f:
-            for linea in f:
-                self.mapa.append(linea.strip())
+        self.mapa = self.precargador.obtener(self.nivel_actual_idx)
 
     def run(self):
         """
         El bucle principal que gestiona los estados del juego.
         """
-        # Intentamos reproducir la música al inicio.
-        self.reproducir_musica()
-        
         self.jugando = True
         while self.jugando:
             if self.estado == 'inicio':
                 self.mostrar_pantalla_inicio()
             elif self.estado == 'jugando':
                 self.nuevo_juego()
+            elif self.estado == 'reaparecer':
+                self.reaparecer()
             elif self.estado == 'game_over':
                 self.mostrar_pantalla_game_over()
             elif self.estado == 'victoria':
@@ -161,109 +182,199 @@ class Juego:
         # --- Carga del Mapa ---
         self.cargar_mapa()
 
-        # --- Grupos de Sprites ---
-        # Creamos un grupo que contendrá todos los sprites del juego.
-        self.todos_los_sprites = pygame.sprite.Group()
-        # Creamos un grupo específico para las paredes para gestionar colisiones.
-        self.paredes = pygame.sprite.Group()
-        # Creamos un grupo específico para los enemigos.
-        self.enemigos = pygame.sprite.Group()
-        # Creamos un grupo específico para los items.
-        self.items = pygame.sprite.Group()
-
-        # --- Creación del Nivel desde el Mapa ---
-        for y, linea in enumerate(self.mapa):
-            for x, caracter in enumerate(linea):
-                if caracter == '#':
-                    # Creamos una pared en esta posición.
-                    pared = Pared(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-                    self.todos_los_sprites.add(pared)
-                    self.paredes.add(pared)
-                if caracter == 'E':
-                    # Creamos un enemigo horizontal en esta posición.
-                    enemigo = Enemigo(self, x * TILE_SIZE, y * TILE_SIZE)
-                    self.todos_los_sprites.add(enemigo)
-                    self.enemigos.add(enemigo)
-                if caracter == 'V':
-                    # Creamos un enemigo vertical en esta posición.
-                    enemigo_v = EnemigoVertical(self, x * TILE_SIZE, y * TILE_SIZE)
-                    self.todos_los_sprites.add(enemigo_v)
-                    self.enemigos.add(enemigo_v)
-                if caracter == 'C':
-                    from sprites import EnemigoPerseguidor
-                    enemigo_c = EnemigoPerseguidor(self, x * TILE_SIZE, y * TILE_SIZE)
-                    self.todos_los_sprites.add(enemigo_c)
-                    self.enemigos.add(enemigo_c)
-                if caracter == 'G':
-                    # Creamos el objetivo (item) en esta posición.
-                    item = Item(self, x * TILE_SIZE, y * TILE_SIZE)
-                    self.todos_los_sprites.add(item)
-                    self.items.add(item)
-                if caracter == 'P':
-                    # Creamos al jugador en la posición 'P'
-                    self.jugador = Jugador(self)
-                    self.jugador.rect.x = x * TILE_SIZE
-                    self.jugador.rect.y = y * TILE_SIZE
-
-        # Añadimos al jugador al grupo de todos los sprites.
-        self.todos_los_sprites.add(self.jugador)
-        
-        # --- Inicialización del Temporizador ---
-        # Reseteamos el tiempo para el nuevo nivel.
-        self.tiempo_restante = self.tiempo_nivel
-        
+        # --- Construcción del Nivel ---
+        self.preparar_nivel(self.mapa)
+        if self.perfilador.activo:
+            self.perfilador.anotar_memoria(self.nivel_actual_idx, self.simulacion.memoria_nivel())
+        # Mientras se muestra el mensaje y se juega este nivel, preparamos el siguiente.
+        self.precargador.solicitar(self.nivel_actual_idx + 1)
+        self.empezar_nivel()
+
+    def reaparecer(self):
+        """
+        Reinicia el nivel actual tras perder una vida, restaurando la instantánea tomada al
+        construirlo. Si el nivel no tiene instantánea (niveles por trozos), se reconstruye.
+        """
+        self.estado = 'jugando'
+        if self.instantanea_nivel is None:
+            self.nuevo_juego()
+            return
+        self.simulacion.restaurar(self.instantanea_nivel)
+        self.camara.seguir(self.jugador.rect)
+        # Todo ha cambiado de sitio, así que el primer fotograma se dibuja completo.
+        self.rects_anteriores = []
+        self.redibujar_todo = True
+        self.empezar_nivel()
+
+    def empezar_nivel(self):
+        """
+        Muestra el mensaje del nivel y ejecuta su bucle.
+        """
         # --- Configuración del Mensaje de Nivel ---
         # Activamos la muestra del mensaje de nivel.
         self.mostrar_mensaje_nivel = True
         # Guardamos el momento en que empezó el mensaje.
         self.mensaje_nivel_timer = pygame.time.get_ticks()
+        self.pantalla_estatica_dibujada = False
         
         # --- Reinicio del Estado de Pausa ---
         self.pausado = False
+
+        # Cada intento de un nivel es un segmento nuevo de la grabación.
+        if self.grabador is not None:
+            self.grabador.empezar_segmento(self.nivel_actual_idx)
         
         # Ejecutamos el bucle del nivel.
         self.ejecutar_nivel()
 
+    def preparar_nivel(self, mapa):
+        """
+        Construye el nivel a partir de las líneas de un mapa y lo deja listo para dibujar.
+        """
+        # La simulación crea los sprites, los grupos y la rejilla de paredes.
+        self.simulacion.construir(mapa)
+        # Guardamos atajos a los grupos para dibujarlos.
+        self.todos_los_sprites = self.simulacion.todos_los_sprites
+        self.paredes = self.simulacion.paredes
+        self.enemigos = self.simulacion.enemigos
+        self.items = self.simulacion.items
+        self.jugador = self.simulacion.jugador
+
+        # --- Cámara ---
+        # Si el nivel no cabe en la ventana, la cámara seguirá al jugador.
+        self.camara = Camara(self.simulacion.ancho_nivel, self.simulacion.alto_nivel)
+        # En los niveles por trozos las paredes y enemigos cambian al moverse el jugador,
+        # así que siempre se dibujan con la cámara.
+        if self.simulacion.mundo is not None:
+            self.camara.fija = False
+        self.camara.seguir(self.jugador.rect)
+
+        # --- Capa de Fondo Estática ---
+        # Preparamos el fondo con las paredes ya dibujadas para el modo de rectángulos sucios.
+        self.preparar_fondo()
+
+        # --- Instantánea Inicial ---
+        # Al morir, el nivel vuelve a este estado sin reconstruir sus sprites ni sus grupos.
+        self.instantanea_nivel = self.simulacion.tomar_instantanea()
+
     def ejecutar_nivel(self):
         """
         Bucle del juego mientras se está en un nivel.
+        Usa un paso de tiempo fijo: medimos el tiempo real que ha pasado y ejecutamos
+        tantos pasos de 1 / FPS segundos como quepan en él. Así la velocidad del juego
+        y el temporizador no dependen de lo rápido que se dibuje.
         """
         self.en_nivel = True
         # Dibujamos el nivel una vez al inicio para que se vea durante el mensaje.
         self.dibujar()
+
+        # Duración de un paso de lógica, en segundos.
+        paso_fijo = 1 / FPS
+        # Tiempo real acumulado que todavía no se ha simulado.
+        acumulado = 0
+        ultimo_instante = time.perf_counter()
+        
+        # Si el perfilador está desactivado, el bucle solo comprueba esta variable.
+        perfilador = self.perfilador if self.perfilador.activo else None
         
         while self.en_nivel:
-            # Forzamos el bucle a correr a la velocidad que definimos en FPS.
-            self.reloj.tick(FPS)
+            # Limitamos la velocidad a la que se dibuja, según FPS_RENDER.
+            self.reloj.tick(FPS_RENDER)
             
             # Procesamos los eventos (teclado, ratón, etc.).
+            if perfilador:
+                inicio = time.perf_counter()
             self.eventos()
+            if perfilador:
+                perfilador.medir('eventos', inicio)
             
             # --- Manejo del Mensaje de Nivel ---
             if self.mostrar_mensaje_nivel:
                 # Solo dibujamos el mensaje de nivel sin redibujar el fondo.
-                # Esto evita el parpadeo.
-                self.dibujar_texto(f"Nivel {self.nivel_actual_idx+1}", 48, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2)
-                pygame.display.flip()
+                # Esto evita el parpadeo. Como no cambia, basta con dibujarlo una vez.
+                if not self.pantalla_estatica_dibujada:
+                    self.dibujar_texto(f"Nivel {self.nivel_actual_idx+1}", 48, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2)
+                    pygame.display.flip()
+                    self.pantalla_estatica_dibujada = True
                 
-                # Comprobamos si han pasado 2 segundos (2000 milisegundos).
-                if pygame.time.get_ticks() - self.mensaje_nivel_timer > 2000:
+                # Comprobamos si ha pasado el tiempo del mensaje.
+                restante = DURACION_MENSAJE_NIVEL - (pygame.time.get_ticks() - self.mensaje_nivel_timer)
+                if restante < 0:
                     self.mostrar_mensaje_nivel = False
+                    # El mensaje ha quedado pintado encima, así que el siguiente fotograma se dibuja entero.
+                    self.redibujar_todo = True
+                elif ESPERA_INACTIVA:
+                    # Dormimos hasta que acabe el mensaje o llegue un evento.
+                    self.esperar_evento(restante + 1)
+                # El tiempo del mensaje no cuenta para la lógica.
+                ultimo_instante = time.perf_counter()
                 continue
             
             # --- Manejo de Pausa ---
             if self.pausado:
                 # Si está pausado, solo dibujamos el mensaje de pausa sin redibujar el fondo.
-                # Esto evita el parpadeo.
-                self.dibujar_texto("PAUSA", 48, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2)
-                self.dibujar_texto("Presiona ESC para continuar", 22, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2 + 50)
-                pygame.display.flip()
+                # Esto evita el parpadeo. Como no cambia, basta con dibujarlo una vez.
+                if not self.pantalla_estatica_dibujada:
+                    self.dibujar_texto("PAUSA", 48, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2)
+                    self.dibujar_texto("Presiona ESC para continuar", 22, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2 + 50)
+                    pygame.display.flip()
+                    self.pantalla_estatica_dibujada = True
+                # Dormimos hasta que llegue un evento (por ejemplo, ESC para continuar).
+                if ESPERA_INACTIVA:
+                    self.esperar_evento()
+                # El tiempo en pausa tampoco cuenta.
+                ultimo_instante = time.perf_counter()
                 continue
+
+            # --- Acumulador de Tiempo ---
+            ahora = time.perf_counter()
+            acumulado += ahora - ultimo_instante
+            ultimo_instante = ahora
+            # Si vamos muy atrasados, descartamos el tiempo que no podemos recuperar.
+            acumulado = min(acumulado, MAX_PASOS_POR_FOTOGRAMA * paso_fijo)
             
-            # Actualizamos el estado de los objetos del juego.
-            self.actualizar()
-            # Dibujamos todo en la pantalla.
-            self.dibujar()
+            # Actualizamos el estado de los objetos del juego tantas veces como haga falta.
+            # Si hay que dar varios pasos, nos saltamos el dibujado de los fotogramas intermedios.
+            pasos = 0
+            if perfilador:
+                inicio = time.perf_counter()
+                consultas_antes = self.simulacion.total_consultas()
+            while acumulado >= paso_fijo and self.en_nivel:
+                self.actualizar()
+                acumulado -= paso_fijo
+                pasos += 1
+            if perfilador:
+                perfilador.medir('actualizar', inicio)
+                perfilador.contar('pasos', pasos)
+                perfilador.contar('consultas_colision', self.simulacion.total_consultas() - consultas_antes)
+
+            # Dibujamos todo en la pantalla (solo si algo ha cambiado).
+            if pasos > 0:
+                if perfilador:
+                    inicio = time.perf_counter()
+                rects = self.componer_fotograma()
+                if perfilador:
+                    perfilador.medir('dibujar', inicio)
+                    perfilador.contar('blits', self.blits_fotograma)
+                    inicio = time.perf_counter()
+                self.presentar(rects)
+                if perfilador:
+                    perfilador.medir('flip', inicio)
+
+            if perfilador:
+                perfilador.cerrar_fotograma()
+
+    def esperar_evento(self, tiempo_maximo=None):
+        """
+        Duerme sin gastar CPU hasta que llegue un evento o pasen 'tiempo_maximo' milisegundos
+        (None para esperar sin límite). El evento se devuelve a la cola para que lo procese eventos().
+        """
+        if tiempo_maximo is None:
+            evento = pygame.event.wait()
+        else:
+            evento = pygame.event.wait(tiempo_maximo)
+        if evento.type != pygame.NOEVENT:
+            pygame.event.post(evento)
 
     def ejecutar(self):
         """Este método queda obsoleto por el nuevo sistema de estados. Lo mantenemos por si acaso."""
@@ -282,6 +393,11 @@ class Juego:
                 self.en_nivel = False
                 self.jugando = False
             
+            # Si la ventana se ha tapado y vuelve a verse, la redibujamos entera.
+            if evento.type == pygame.WINDOWEXPOSED:
+                self.pantalla_estatica_dibujada = False
+                self.redibujar_todo = True
+
             # --- Manejo de Teclas ---
             if evento.type == pygame.KEYDOWN:
                 # Tecla de pausa (ESC)
@@ -289,14 +405,26 @@ class Juego:
                     # Solo permitimos pausar si no estamos mostrando el mensaje de nivel.
                     if not self.mostrar_mensaje_nivel:
                         self.pausado = not self.pausado  # Alternamos entre pausado y no pausado
+                        if self.grabador is not None:
+                            self.grabador.marcar_pausa()
                         
+                        # El mensaje de pausa hay que dibujarlo de nuevo.
+                        self.pantalla_estatica_dibujada = False
                         # --- Control de Música ---
                         if self.pausado:
                             # Pausamos la música cuando el juego está pausado.
-                            pygame.mixer.music.pause()
+                            self.audio.pausar()
                         else:
                             # Reanudamos la música cuando el juego se reanuda.
-                            pygame.mixer.music.unpause()
+                            self.audio.reanudar()
+                            # Borramos el mensaje de pausa dibujando el siguiente fotograma entero.
+                            self.redibujar_todo = True
+
+                # Tecla del resumen del perfilador (F3), solo si el perfilador está activo.
+                if evento.key == pygame.K_F3 and self.perfilador.activo:
+                    self.perfilador.mostrar_resumen = not self.perfilador.mostrar_resumen
+                    # Redibujamos entero para borrar el resumen al ocultarlo.
+                    self.redibujar_todo = True
 
     def actualizar(self):
         """
@@ -305,34 +433,21 @@ class Juego:
         """
         # Solo actualizamos si no estamos mostrando el mensaje de nivel y no está pausado.
         if not self.mostrar_mensaje_nivel and not self.pausado:
-            # Pygame se encarga de llamar al método update() de cada sprite en el grupo.
-            self.todos_los_sprites.update()
-
-            # --- Sistema de Temporizador ---
-            # Decrementamos el tiempo restante.
-            if self.tiempo_restante > 0:
-                self.tiempo_restante -= 1 / FPS
-                # Nos aseguramos de que no baje de 0.
-                if self.tiempo_restante < 0:
-                    self.tiempo_restante = 0
-            
-            # --- Comprobación de Tiempo Agotado ---
-            # Si el tiempo se acaba, el jugador pierde una vida.
-            if self.tiempo_restante == 0:
-                self.vidas_jugador -= 1
-                self.en_nivel = False
-                if self.vidas_jugador <= 0:
-                    # Si no quedan vidas, es Game Over.
-                    self.estado = 'game_over'
-                else:
-                    # Si quedan vidas, se reinicia el mismo nivel.
-                    self.estado = 'jugando'
-                return
+            # Los enemigos lejos de lo que se ve en pantalla se pueden actualizar menos a menudo.
+            if not self.camara.fija and ACTUALIZAR_FUERA_PANTALLA_CADA > 1:
+                self.camara.seguir(self.jugador.rect)
+                self.simulacion.zona_activa = self.camara.zona_activa()
+            else:
+                self.simulacion.zona_activa = None
+            # La simulación mueve los sprites con las teclas pulsadas y comprueba
+            # el tiempo y las colisiones con el item y los enemigos.
+            entrada = leer_teclado()
+            resultado = self.simulacion.paso(entrada)
+            if self.grabador is not None:
+                self.grabador.registrar(entrada, self.simulacion)
 
             # --- Comprobación de Colisión Jugador-Item (Victoria de Nivel) ---
-            # El True hace que el item desaparezca al ser recogido.
-            colisiones_items = pygame.sprite.spritecollide(self.jugador, self.items, True)
-            if colisiones_items:
+            if resultado == RESULTADO_ITEM:
                 # Si recogemos el item, ganamos el nivel.
                 self.en_nivel = False
                 self.nivel_actual_idx += 1
@@ -341,13 +456,10 @@ class Juego:
                     self.estado = 'victoria'
                 else:
                     self.estado = 'jugando' # Prepara el siguiente nivel
-                return
 
-            # --- Comprobación de Colisión Jugador-Enemigo (Derrota) ---
-            # El False indica que el enemigo no debe desaparecer al chocar.
-            colisiones_enemigos = pygame.sprite.spritecollide(self.jugador, self.enemigos, False)
-            if colisiones_enemigos:
-                # Si hay colisión, el jugador pierde una vida.
+            # --- Comprobación de Tiempo Agotado o Colisión Jugador-Enemigo (Derrota) ---
+            elif resultado in (RESULTADO_TIEMPO, RESULTADO_MUERTE):
+                # El jugador pierde una vida.
                 self.vidas_jugador -= 1
                 self.en_nivel = False # Salimos del bucle del nivel para reiniciarlo.
 
@@ -355,26 +467,178 @@ class Juego:
                     # Si no quedan vidas, es Game Over.
                     self.estado = 'game_over'
                 else:
-                    # Si quedan vidas, se reinicia el mismo nivel.
-                    self.estado = 'jugando'
+                    # Si quedan vidas, se reinicia el mismo nivel desde su instantánea.
+                    self.estado = 'reaparecer'
+
+    def preparar_fondo(self):
+        """
+        Dibuja las paredes del nivel una sola vez en una superficie de fondo.
+        Las paredes nunca se mueven, así que no hace falta volver a dibujarlas en cada fotograma.
+        """
+        self.fondo = None
+        # Con la cámara en movimiento el fondo cambia en cada fotograma, así que no se guarda.
+        if self.camara.fija:
+            self.fondo = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA)).convert()
+            self.fondo.fill(NEGRO)
+            self.fondo.blits([(pared.image, pared.rect) for pared in self.paredes], doreturn=False)
+
+        # Grupo con lo que sí cambia de un fotograma a otro (jugador, enemigos e items).
+        # Las paredes no son sprites, así que son todos los sprites del nivel.
+        self.sprites_moviles = self.todos_los_sprites
+        # Zonas de la pantalla ocupadas en el fotograma anterior.
+        self.rects_anteriores = []
+        # El primer fotograma del nivel siempre se dibuja completo.
+        self.redibujar_todo = True
 
     def dibujar(self):
         """
-        Dibuja todos los elementos en la pantalla.
+        Dibuja todos los elementos en la pantalla y los muestra en la ventana.
+        """
+        self.presentar(self.componer_fotograma())
+
+    def componer_fotograma(self):
+        """
+        Dibuja todos los elementos en la superficie de la pantalla (sin mostrarlos aún).
         Es importante el orden: lo que se dibuja primero queda "debajo".
+        Devuelve la lista de rectángulos que hay que actualizar en la ventana,
+        o None si hay que actualizarla entera.
         """
+        if not self.camara.fija:
+            return self.componer_con_camara()
+        if RENDER_RECTANGULOS_SUCIOS:
+            return self.componer_rectangulos_sucios()
+
         # Rellenamos la pantalla de un color. Esto "limpia" la pantalla en cada fotograma.
         self.pantalla.fill(NEGRO)
 
+        # Primero las paredes y encima el resto de sprites.
+        self.pantalla.blits([(pared.image, pared.rect) for pared in self.paredes], doreturn=False)
         # Pygame se encarga de dibujar cada sprite en el grupo en su respectiva posición (rect).
         self.todos_los_sprites.draw(self.pantalla)
+        self.blits_fotograma = len(self.paredes) + len(self.todos_los_sprites)
+        # Los enemigos del motor de NumPy no son sprites, así que se dibujan aparte.
+        if self.simulacion.motor_enemigos is not None:
+            self.blits_fotograma += len(self.simulacion.motor_enemigos.dibujar(self.pantalla))
 
         # Dibujamos el HUD por encima de todo.
-        self.dibujar_hud()
+        rects_encima = self.dibujar_hud()
+        rects_encima += self.perfilador.dibujar(self)
+        self.blits_fotograma += len(rects_encima)
+        return None
+
+    def componer_rectangulos_sucios(self):
+        """
+        Dibuja el fotograma repintando solo las zonas que han cambiado.
+        1. Tapamos con el fondo lo que se dibujó en el fotograma anterior.
+        2. Dibujamos los sprites móviles y el HUD en su posición nueva.
+        3. Devolvemos solo esos rectángulos para enviarlos con pygame.display.update().
+        """
+        if self.redibujar_todo:
+            # Fotograma completo: copiamos el fondo entero.
+            self.pantalla.blit(self.fondo, (0, 0))
+            self.blits_fotograma = 1
+        else:
+            # Restauramos el fondo donde estaban los sprites y el HUD.
+            for rect in self.rects_anteriores:
+                self.pantalla.blit(self.fondo, rect, rect)
+            self.blits_fotograma = len(self.rects_anteriores)
+
+        # Dibujamos los sprites que se mueven y guardamos dónde quedaron.
+        rects_nuevos = [self.pantalla.blit(sprite.image, sprite.rect) for sprite in self.sprites_moviles]
+        # Los enemigos del motor de NumPy no son sprites, así que se dibujan aparte.
+        if self.simulacion.motor_enemigos is not None:
+            rects_nuevos.extend(self.simulacion.motor_enemigos.dibujar(self.pantalla))
+        # Dibujamos el HUD por encima de todo.
+        rects_nuevos.extend(self.dibujar_hud())
+        rects_nuevos.extend(self.perfilador.dibujar(self))
+        self.blits_fotograma += len(rects_nuevos)
+
+        if self.redibujar_todo:
+            rects = None
+            self.redibujar_todo = False
+        else:
+            # Hay que actualizar en la ventana las zonas antiguas (ya limpias) y las nuevas.
+            rects = self.rects_anteriores + rects_nuevos
+
+        self.rects_anteriores = rects_nuevos
+        return rects
+
+    def componer_con_camara(self):
+        """
+        Dibuja la parte del nivel que ve la cámara (para niveles más grandes que la ventana).
+        Solo se dibujan las paredes y los sprites que caen dentro de la cámara.
+        """
+        camara = self.camara
+        camara.seguir(self.jugador.rect)
+        desplazamiento_x, desplazamiento_y = -camara.rect.x, -camara.rect.y
 
-        # ¡Importante! Después de dibujar todo, actualizamos la pantalla para que se muestren los cambios.
+        self.pantalla.fill(NEGRO)
+        mundo = self.simulacion.mundo
+        if mundo is None:
+            # Las paredes visibles las sacamos de la rejilla, sin recorrer todas las del nivel.
+            paredes = self.simulacion.rejilla_paredes.en_zona(camara.rect)
+            self.pantalla.blits([(pared.image, pared.rect.move(desplazamiento_x, desplazamiento_y)) for pared in paredes],
+                                doreturn=False)
+            self.blits_fotograma = len(paredes)
+            moviles = self.sprites_moviles
+        else:
+            # En los niveles por trozos, cada trozo tiene sus paredes ya dibujadas.
+            self.blits_fotograma = mundo.dibujar(self.pantalla, camara)
+            # Los enemigos e items cargados cambian con los trozos, así que los pedimos a los grupos.
+            moviles = self.enemigos.sprites() + self.items.sprites() + [self.jugador]
+        # Sprites móviles visibles (jugador, enemigos e items).
+        visibles = [sprite for sprite in moviles if camara.visible(sprite.rect)]
+        self.pantalla.blits([(sprite.image, sprite.rect.move(desplazamiento_x, desplazamiento_y)) for sprite in visibles],
+                            doreturn=False)
+        self.blits_fotograma += len(visibles)
+        # Los enemigos del motor de NumPy no son sprites, así que se dibujan aparte.
+        if self.simulacion.motor_enemigos is not None:
+            self.blits_fotograma += len(self.simulacion.motor_enemigos.dibujar(self.pantalla, camara))
+
+        # El HUD no se mueve con la cámara.
+        rects_encima = self.dibujar_hud()
+        rects_encima += self.perfilador.dibujar(self)
+        self.blits_fotograma += len(rects_encima)
+        return None
+
+    def presentar(self, rects=None):
+        """
+        Envía a la ventana lo que se ha dibujado.
+        :param rects: Lista de rectángulos a actualizar, o None para actualizar la ventana entera.
+        """
+        if rects is None:
+            # ¡Importante! Después de dibujar todo, actualizamos la pantalla para que se muestren los cambios.
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def dibujar_menu(self, nombre, lineas):
+        """
+        Dibuja una pantalla de menú completa.
+        La primera vez se compone en una superficie y se guarda; las siguientes veces
+        basta con copiarla a la pantalla.
+        :param nombre: Clave con la que se guarda la pantalla.
+        :param lineas: Lista de tuplas (texto, tamaño, color, x, y).
+        """
+        superficie = self.pantallas_menu.get(nombre)
+        if superficie is None:
+            superficie = pygame.Surface((ANCHO_PANTALLA, ALTO_PANTALLA)).convert()
+            superficie.fill(NEGRO)
+            for texto, tamaño, color, x, y in lineas:
+                superficie_texto = self.textos.render(texto, tamaño, color)
+                superficie.blit(superficie_texto, superficie_texto.get_rect(center=(x, y)))
+            self.pantallas_menu[nombre] = superficie
+
+        self.pantalla.blit(superficie, (0, 0))
         pygame.display.flip()
 
+        # El primer fotograma del juego siempre es un menú: anotamos cuánto ha tardado en verse.
+        if self.tiempo_primer_fotograma is None:
+            self.tiempo_primer_fotograma = time.perf_counter() - INICIO_PROGRAMA
+            self.perfilador.primer_fotograma_ms = self.tiempo_primer_fotograma * 1000
+            if self.perfilador.activo:
+                print(f"Primer fotograma en {self.perfilador.primer_fotograma_ms:.0f} ms")
+
     def mostrar_pantalla_inicio(self):
         """
         Muestra la pantalla de inicio del juego.
@@ -383,22 +647,30 @@ class Juego:
         self.nivel_actual_idx = 0
         self.vidas_jugador = VIDAS_JUGADOR
         
+        # Primero mostramos la pantalla y después iniciamos el sonido, para que al arrancar
+        # el juego la ventana no espere al mezclador.
+        self.dibujar_pantalla_inicio()
+
         # --- Restauración de Música de Fondo ---
         # Si no estamos reproduciendo la música de fondo, la restauramos.
-        if self.musica_actual != MUSICA_FONDO:
+        if self.audio.pista_actual != MUSICA_FONDO:
             self.reproducir_musica_fondo()
         
-        self.pantalla.fill(NEGRO)
-        self.dibujar_texto(TITULO, 48, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 4)
-        self.dibujar_texto("Usa W A S D o las flechas para moverte", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2)
-        self.dibujar_texto("Pulsa ENTER para empezar", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA * 3 / 4)
-        pygame.display.flip()
-        
         # Esperamos a que el jugador pulse una tecla.
         self.esperar_tecla()
         # Cambiamos de estado para empezar a jugar.
         self.estado = 'jugando'
 
+    def dibujar_pantalla_inicio(self):
+        """
+        Dibuja la pantalla de inicio.
+        """
+        self.dibujar_menu('inicio', [
+            (TITULO, 48, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 4),
+            ("Usa W A S D o las flechas para moverte", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2),
+            ("Pulsa ENTER para empezar", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA * 3 / 4),
+        ])
+
     def mostrar_pantalla_game_over(self):
         """
         Muestra la pantalla de Game Over.
@@ -406,11 +678,11 @@ class Juego:
         # --- Reproducción de Música de Game Over ---
         self.reproducir_musica_game_over()
         
-        self.pantalla.fill(NEGRO)
-        self.dibujar_texto("GAME OVER", 48, ROJO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 4)
-        self.dibujar_texto("Te has quedado sin vidas.", 22, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2)
-        self.dibujar_texto("Pulsa ENTER para volver a empezar", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA * 3 / 4)
-        pygame.display.flip()
+        self.dibujar_menu('game_over', [
+            ("GAME OVER", 48, ROJO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 4),
+            ("Te has quedado sin vidas.", 22, BLANCO, ANCHO_PANTALLA/2, ALTO_PANTALLA/2),
+            ("Pulsa ENTER para volver a empezar", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA * 3 / 4),
+        ])
         self.esperar_tecla()
         # Cambiamos el estado para volver a la pantalla de inicio.
         self.estado = 'inicio'
@@ -422,11 +694,11 @@ class Juego:
         # --- Reproducción de Música de Victoria ---
         self.reproducir_musica_victoria()
         
-        self.pantalla.fill(NEGRO)
-        self.dibujar_texto("¡FELICIDADES!", 48, VERDE, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 4)
-        self.dibujar_texto("Has completado todos los niveles.", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2)
-        self.dibujar_texto("Pulsa ENTER para volver al menú.", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA * 3 / 4)
-        pygame.display.flip()
+        self.dibujar_menu('victoria', [
+            ("¡FELICIDADES!", 48, VERDE, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 4),
+            ("Has completado todos los niveles.", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA / 2),
+            ("Pulsa ENTER para volver al menú.", 22, BLANCO, ANCHO_PANTALLA / 2, ALTO_PANTALLA * 3 / 4),
+        ])
         self.esperar_tecla()
         self.estado = 'inicio'
 
@@ -436,11 +708,19 @@ class Juego:
         """
         esperando = True
         while esperando:
-            self.reloj.tick(FPS)
-            for evento in pygame.event.get():
+            if ESPERA_INACTIVA:
+                # La pantalla no cambia, así que dormimos hasta que llegue un evento.
+                eventos = [pygame.event.wait()]
+            else:
+                self.reloj.tick(FPS)
+                eventos = pygame.event.get()
+            for evento in eventos:
                 if evento.type == pygame.QUIT:
                     esperando = False
                     self.salir()
+                if evento.type == pygame.WINDOWEXPOSED:
+                    # La pantalla sigue teniendo el menú dibujado; solo hay que volver a mostrarlo.
+                    pygame.display.flip()
                 if evento.type == pygame.KEYUP:
                     if evento.key == pygame.K_RETURN or evento.key == pygame.K_KP_ENTER:
                         esperando = False
@@ -449,6 +729,13 @@ class Juego:
         """
         Cierra Pygame y termina el programa.
         """
+        # Si el perfilador estaba activo, guardamos sus datos antes de salir.
+        if self.perfilador.activo:
+            self.perfilador.volcar()
+        self.precargador.cerrar()
+        self.audio.cerrar()
+        if self.grabador is not None:
+            self.grabador.guardar()
         pygame.quit()
         sys.exit()
 
@@ -456,7 +743,18 @@ class Juego:
 # --- Punto de entrada del programa ---
 # Este es el código que se ejecuta cuando corremos el archivo directamente.
 if __name__ == "__main__":
+    # Con "--medir-arranque" solo se muestra la pantalla de inicio y se escribe cuánto ha tardado.
+    if '--medir-arranque' in sys.argv:
+        juego = Juego()
+        juego.dibujar_pantalla_inicio()
+        print(f"Primer fotograma en {juego.tiempo_primer_fotograma * 1000:.1f} ms")
+        juego.precargador.cerrar()
+        sys.exit()
+    # Con "--grabar archivo" la partida se graba para poder repetirla con grabacion.py.
+    ruta_grabacion = None
+    if '--grabar' in sys.argv[1:-1]:
+        ruta_grabacion = sys.argv[sys.argv.index('--grabar') + 1]
     # Creamos una instancia de nuestra clase Juego.
-    juego = Juego()
+    juego = Juego(ruta_grabacion)
     # Ejecutamos el bucle principal del juego.
     juego.run() 
\ No newline at end of file
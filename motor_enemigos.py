@@ -0,0 +1,343 @@
+import pygame
+from settings import *
+from assets import cargar_imagen
+from colisiones import tramo_patrulla
+
+# NumPy es opcional: si no está instalado, el juego sigue usando los sprites normales.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- Motor de Enemigos con NumPy ---
+# Cada Enemigo, EnemigoVertical y EnemigoPerseguidor es un sprite con su propio update(),
+# su propio rect y su propia consulta de colisiones. Con cientos de enemigos, esas llamadas
+# de Python se convierten en el cuello de botella.
+# Este motor guarda a todos los enemigos en arrays de NumPy ("estructura de arrays"):
+# posiciones, velocidades y tipo. Así los mueve a todos a la vez con operaciones
+# vectorizadas, rebotando contra un array con las casillas que son pared.
+# Las reglas de movimiento son las mismas que las de las clases de sprites.sprites.
+
+# Valor de los tramos de patrulla por el lado en el que no hay pared.
+SIN_PARED = 2 ** 62
+
+# --- Tipos de Enemigo ---
+HORIZONTAL = 0
+VERTICAL = 1
+PERSEGUIDOR = 2
+
+# Imagen de cada tipo (el perseguidor se escala a un tile, igual que en su sprite).
+IMAGENES_TIPO = {
+    HORIZONTAL: (IMAGEN_ENEMIGO, None),
+    VERTICAL: (IMAGEN_ENEMIGO_VERTICAL, None),
+    PERSEGUIDOR: (IMAGEN_ENEMIGO_PERSEGUIDOR, (TILE_SIZE, TILE_SIZE)),
+}
+
+
+def motor_disponible():
+    """
+    Indica si se puede usar el motor (hace falta tener NumPy instalado).
+    """
+    return np is not None
+
+
+def redondear(valores):
+    """
+    Redondea como lo hace pygame.Rect al asignarle decimales (la mitad se aleja del cero).
+    """
+    return np.trunc(valores + np.copysign(0.5, valores)).astype(np.int64)
+
+
+class MotorEnemigos:
+    def __init__(self, mapa):
+        """
+        Constructor del motor.
+        :param mapa: Lista de líneas de texto del nivel ('#' son paredes).
+        """
+        # --- Casillas Ocupadas por Paredes ---
+        self.alto_mapa = len(mapa)
+        self.ancho_mapa = max((len(linea) for linea in mapa), default=0)
+        self.ocupado = np.zeros((self.alto_mapa, self.ancho_mapa), dtype=bool)
+        for fila, linea in enumerate(mapa):
+            for columna, caracter in enumerate(linea):
+                if caracter == '#':
+                    self.ocupado[fila, columna] = True
+
+        # Mientras se construye el nivel vamos guardando los enemigos en listas.
+        self._nuevos = []
+        self.total = 0
+
+    def agregar(self, tipo, x, y):
+        """
+        Añade un enemigo del tipo dado en la posición (x, y) en píxeles.
+        """
+        imagen = cargar_imagen(*IMAGENES_TIPO[tipo])
+        ancho, alto = imagen.get_size()
+        # Velocidad inicial igual que en los sprites.
+        vx = VELOCIDAD_ENEMIGO if tipo == HORIZONTAL else 0
+        vy = VELOCIDAD_ENEMIGO if tipo == VERTICAL else 0
+        self._nuevos.append((tipo, x, y, vx, vy, ancho, alto))
+
+    def finalizar(self):
+        """
+        Convierte los enemigos añadidos en arrays. Se llama una vez al terminar de construir el nivel.
+        """
+        datos = np.array(self._nuevos, dtype=np.int64).reshape(-1, 7)
+        self._nuevos = []
+        self.total = len(datos)
+        self.tipo = datos[:, 0]
+        self.x = datos[:, 1].copy()
+        self.y = datos[:, 2].copy()
+        self.vx = datos[:, 3].copy()
+        self.vy = datos[:, 4].copy()
+        self.ancho = datos[:, 5].copy()
+        self.alto = datos[:, 6].copy()
+
+        # Índices de cada tipo, para moverlos por grupos.
+        self.horizontales = np.nonzero(self.tipo == HORIZONTAL)[0]
+        self.verticales = np.nonzero(self.tipo == VERTICAL)[0]
+        self.perseguidores = np.nonzero(self.tipo == PERSEGUIDOR)[0]
+        self.velocidad_perseguidor = VELOCIDAD_ENEMIGO * 0.8
+        self.calcular_tramos()
+
+        # Imagen de cada tipo para dibujar.
+        self.imagenes = {tipo: cargar_imagen(*IMAGENES_TIPO[tipo]) for tipo in IMAGENES_TIPO}
+
+        # Copia del campo de flujo convertida a array (se renueva cuando el campo cambia).
+        self._siguiente = None
+        self._siguiente_lista = None
+
+    def calcular_tramos(self):
+        """
+        Calcula entre qué bordes de pared se mueve cada patrullero (ver colisiones.tramo_patrulla).
+        Los patrulleros que empiezan tocando una pared siguen comprobando las colisiones en cada paso.
+        """
+        ocupacion = self.ocupado.tobytes()
+        self.minimo = np.full(self.total, -SIN_PARED, dtype=np.int64)
+        self.maximo = np.full(self.total, SIN_PARED, dtype=np.int64)
+        con_tramo = np.zeros(self.total, dtype=bool)
+        for i in np.concatenate((self.horizontales, self.verticales)).tolist():
+            rect = pygame.Rect(int(self.x[i]), int(self.y[i]), int(self.ancho[i]), int(self.alto[i]))
+            tramo = tramo_patrulla(ocupacion, self.ancho_mapa, self.alto_mapa, rect, self.tipo[i] == HORIZONTAL)
+            if tramo is None:
+                continue
+            con_tramo[i] = True
+            if tramo[0] is not None:
+                self.minimo[i] = tramo[0]
+            if tramo[1] is not None:
+                self.maximo[i] = tramo[1]
+        # Patrulleros que rebotan contra su tramo y los que consultan las paredes.
+        self.horizontales_tramo = self.horizontales[con_tramo[self.horizontales]]
+        self.horizontales_libres = self.horizontales[~con_tramo[self.horizontales]]
+        self.verticales_tramo = self.verticales[con_tramo[self.verticales]]
+        self.verticales_libres = self.verticales[~con_tramo[self.verticales]]
+
+    def rebotar_en_tramo(self, indices, posicion, velocidad, tamaño):
+        """
+        Mueve a los patrulleros indicados en un eje y los hace rebotar en los bordes de su tramo,
+        dejándolos donde los dejaría resolver_x (o resolver_y).
+        :param posicion: self.x o self.y.
+        :param velocidad: self.vx o self.vy.
+        :param tamaño: self.ancho o self.alto.
+        """
+        p = posicion[indices] + velocidad[indices]
+        v = velocidad[indices]
+        maximo = self.maximo[indices]
+        minimo = self.minimo[indices]
+        pasa_maximo = (v > 0) & (p + tamaño[indices] > maximo)
+        pasa_minimo = (v < 0) & (p < minimo)
+        p = np.where(pasa_maximo, maximo - tamaño[indices], p)
+        posicion[indices] = np.where(pasa_minimo, minimo, p)
+        velocidad[indices] = np.where(pasa_maximo | pasa_minimo, -v, v)
+
+    # --- Instantáneas ---
+    def estado(self):
+        """
+        Devuelve una copia de las posiciones y velocidades de todos los enemigos.
+        """
+        if self.total == 0:
+            return None
+        return self.x.copy(), self.y.copy(), self.vx.copy(), self.vy.copy()
+
+    def restaurar(self, estado):
+        """
+        Vuelve a las posiciones y velocidades devueltas por estado(), sin crear arrays nuevos.
+        """
+        if estado is None:
+            return
+        for destino, origen in zip((self.x, self.y, self.vx, self.vy), estado):
+            np.copyto(destino, origen)
+
+    # --- Consultas a la Rejilla de Paredes ---
+    def pared(self, fila, columna):
+        """
+        Devuelve para cada par (fila, columna) si esa casilla es pared.
+        Fuera del mapa no hay paredes (igual que en la rejilla de colisiones).
+        """
+        dentro = (fila >= 0) & (fila < self.alto_mapa) & (columna >= 0) & (columna < self.ancho_mapa)
+        resultado = np.zeros(fila.shape, dtype=bool)
+        resultado[dentro] = self.ocupado[fila[dentro], columna[dentro]]
+        return resultado
+
+    def columnas_con_pared(self, indices):
+        """
+        Para los enemigos indicados, comprueba qué casillas tocan.
+        Devuelve (col0, col1, fila0, fila1, pared_col0, pared_col1, pared_fila0, pared_fila1):
+        las columnas y filas extremas que ocupa cada rectángulo y si en esa columna o fila
+        (dentro del rectángulo) hay alguna pared.
+        Los enemigos miden como mucho un tile, así que nunca tocan más de 2x2 casillas.
+        """
+        x, y = self.x[indices], self.y[indices]
+        col0 = x // TILE_SIZE
+        col1 = (x + self.ancho[indices] - 1) // TILE_SIZE
+        fila0 = y // TILE_SIZE
+        fila1 = (y + self.alto[indices] - 1) // TILE_SIZE
+        arriba_izq = self.pared(fila0, col0)
+        arriba_der = self.pared(fila0, col1)
+        abajo_izq = self.pared(fila1, col0)
+        abajo_der = self.pared(fila1, col1)
+        return (col0, col1, fila0, fila1,
+                arriba_izq | abajo_izq, arriba_der | abajo_der,
+                arriba_izq | arriba_der, abajo_izq | abajo_der)
+
+    def resolver_x(self, indices, hacia_derecha):
+        """
+        Saca de las paredes en el eje X a los enemigos indicados, igual que el código de los sprites:
+        si se movían a la derecha, su borde derecho se alinea con el borde izquierdo de la pared
+        más cercana; si no, su borde izquierdo con el borde derecho.
+        Devuelve qué enemigos han chocado.
+        """
+        col0, col1, _, _, pared0, pared1, _, _ = self.columnas_con_pared(indices)
+        choca = pared0 | pared1
+        # Borde izquierdo más a la izquierda entre las paredes chocadas.
+        borde_izq = np.where(pared0, col0, col1) * TILE_SIZE
+        # Borde derecho más a la derecha entre las paredes chocadas.
+        borde_der = (np.where(pared1, col1, col0) + 1) * TILE_SIZE
+        nueva_x = np.where(hacia_derecha, borde_izq - self.ancho[indices], borde_der)
+        self.x[indices] = np.where(choca, nueva_x, self.x[indices])
+        return choca
+
+    def resolver_y(self, indices, hacia_abajo):
+        """
+        Igual que resolver_x pero en el eje Y.
+        """
+        _, _, fila0, fila1, _, _, pared0, pared1 = self.columnas_con_pared(indices)
+        choca = pared0 | pared1
+        borde_arriba = np.where(pared0, fila0, fila1) * TILE_SIZE
+        borde_abajo = (np.where(pared1, fila1, fila0) + 1) * TILE_SIZE
+        nueva_y = np.where(hacia_abajo, borde_arriba - self.alto[indices], borde_abajo)
+        self.y[indices] = np.where(choca, nueva_y, self.y[indices])
+        return choca
+
+    # --- Movimiento ---
+    def actualizar(self, jugador, campo_flujo=None):
+        """
+        Mueve a todos los enemigos un paso.
+        :param jugador: Sprite del jugador (los perseguidores van hacia él).
+        :param campo_flujo: Campo de flujo del nivel, o None si no hay.
+        """
+        if self.total == 0:
+            return
+
+        # --- Patrulleros Horizontales ---
+        # Los que tienen tramo rebotan con una comparación, sin mirar la rejilla de paredes.
+        if len(self.horizontales_tramo):
+            self.rebotar_en_tramo(self.horizontales_tramo, self.x, self.vx, self.ancho)
+        h = self.horizontales_libres
+        if len(h):
+            self.x[h] += self.vx[h]
+            choca = self.resolver_x(h, self.vx[h] > 0)
+            # Invertimos la velocidad de los que han chocado.
+            self.vx[h] = np.where(choca, -self.vx[h], self.vx[h])
+
+        # --- Patrulleros Verticales ---
+        if len(self.verticales_tramo):
+            self.rebotar_en_tramo(self.verticales_tramo, self.y, self.vy, self.alto)
+        v = self.verticales_libres
+        if len(v):
+            self.y[v] += self.vy[v]
+            choca = self.resolver_y(v, self.vy[v] > 0)
+            self.vy[v] = np.where(choca, -self.vy[v], self.vy[v])
+
+        # --- Perseguidores ---
+        if len(self.perseguidores):
+            self.mover_perseguidores(jugador, campo_flujo)
+
+    def mover_perseguidores(self, jugador, campo_flujo):
+        """
+        Mueve a los perseguidores hacia la siguiente casilla del campo de flujo
+        (o en línea recta hacia el jugador), con las mismas reglas que EnemigoPerseguidor.
+        """
+        p = self.perseguidores
+        centro_x = self.x[p] + self.ancho[p] // 2
+        centro_y = self.y[p] + self.alto[p] // 2
+
+        # --- Elección del Destino ---
+        destino_x = np.full(len(p), jugador.rect.centerx, dtype=np.float64)
+        destino_y = np.full(len(p), jugador.rect.centery, dtype=np.float64)
+        if campo_flujo is not None and campo_flujo.objetivo is not None:
+            # Convertimos el campo a array solo cuando el campo ha cambiado.
+            if self._siguiente_lista is not campo_flujo.siguiente:
+                self._siguiente_lista = campo_flujo.siguiente
+                self._siguiente = np.array(campo_flujo.siguiente, dtype=np.int64)
+            columna = centro_x // TILE_SIZE
+            fila = centro_y // TILE_SIZE
+            dentro = (columna >= 0) & (columna < campo_flujo.ancho) & (fila >= 0) & (fila < campo_flujo.alto)
+            casilla = np.where(dentro, fila * campo_flujo.ancho + columna, 0)
+            destino = np.where(dentro, self._siguiente[casilla], -1)
+            valido = dentro & (destino != -1) & (casilla != campo_flujo.objetivo)
+            destino_x = np.where(valido, (destino % campo_flujo.ancho) * TILE_SIZE + TILE_SIZE // 2, destino_x)
+            destino_y = np.where(valido, (destino // campo_flujo.ancho) * TILE_SIZE + TILE_SIZE // 2, destino_y)
+
+        # --- Dirección Normalizada ---
+        restante_x = destino_x - centro_x
+        restante_y = destino_y - centro_y
+        velocidad = self.velocidad_perseguidor
+        distancia = np.maximum(np.abs(restante_x), np.abs(restante_y))
+        divisor = np.where(distancia > 0, distancia, 1)
+        dx = restante_x / divisor * velocidad
+        dy = restante_y / divisor * velocidad
+        # Si en un eje falta menos que un paso, avanzamos justo lo que falta.
+        dx = np.where(np.abs(restante_x) <= velocidad, restante_x, dx)
+        dy = np.where(np.abs(restante_y) <= velocidad, restante_y, dy)
+        # Avanzamos al menos un píxel en cada eje en el que todavía falte algo.
+        dx = np.where((dx != 0) & (np.abs(dx) < 1), np.sign(dx), dx)
+        dy = np.where((dy != 0) & (np.abs(dy) < 1), np.sign(dy), dy)
+
+        # --- Movimiento y Colisiones por Ejes ---
+        self.x[p] = redondear(self.x[p] + dx)
+        self.resolver_x(p, dx > 0)
+        self.y[p] = redondear(self.y[p] + dy)
+        self.resolver_y(p, dy > 0)
+
+    # --- Colisión con el Jugador ---
+    def colisiona_con(self, rect):
+        """
+        Comprueba en una sola pasada vectorizada si algún enemigo toca el rectángulo.
+        Usa la misma regla que pygame.Rect.colliderect.
+        """
+        if self.total == 0:
+            return False
+        return bool(np.any(
+            (self.x < rect.right) & (self.x + self.ancho > rect.left)
+            & (self.y < rect.bottom) & (self.y + self.alto > rect.top)
+        ))
+
+    # --- Dibujado ---
+    def dibujar(self, superficie, camara=None):
+        """
+        Dibuja a los enemigos y devuelve la lista de rectángulos ocupados.
+        :param camara: Si se indica, solo se dibujan los enemigos visibles, desplazados según la cámara.
+        """
+        if self.total == 0:
+            return []
+        tipo, x, y = self.tipo, self.x, self.y
+        if camara is not None:
+            zona = camara.rect
+            visibles = ((x < zona.right) & (x + self.ancho > zona.left)
+                        & (y < zona.bottom) & (y + self.alto > zona.top))
+            tipo, x, y = tipo[visibles], x[visibles] - zona.x, y[visibles] - zona.y
+        imagenes = self.imagenes
+        return superficie.blits(
+            [(imagenes[t], (px, py)) for t, px, py in zip(tipo.tolist(), x.tolist(), y.tolist())]
+        )
@@ -0,0 +1,231 @@
+from settings import *
+from colisiones import fusionar_paredes
+from array import array
+import os
+import struct
+import tempfile
+import zlib
+
+# --- Niveles Compilados ---
+# Cada vez que el jugador muere o empieza un nivel, el juego tenía que volver a abrir el .txt,
+# recorrerlo carácter a carácter y fusionar sus paredes. Un nivel compilado guarda ese trabajo
+# ya hecho: la ocupación de cada casilla, los bloques de pared fusionados, los enemigos e items
+# en orden de aparición y la posición inicial del jugador.
+#
+# Los niveles compilados se guardan en memoria (reiniciar o volver a un nivel no toca el disco)
+# y en un archivo binario en DIRECTORIO_CACHE_NIVELES. Ese archivo se invalida si el .txt
+# cambia: primero se comparan la fecha de modificación y el tamaño, y si no coinciden,
+# el CRC32 del contenido. El nombre del archivo lleva un CRC32 de la ruta completa del .txt,
+# así que dos niveles con el mismo nombre en carpetas distintas no comparten caché.
+#
+# Varios procesos pueden pedir el mismo nivel a la vez (por ejemplo, los del EntornoVectorizado),
+# así que el archivo se escribe primero con otro nombre y se renombra cuando está completo.
+# Si aun así está dañado (un proceso que murió a medias en una versión anterior, un disco lleno...),
+# se ignora y el nivel se vuelve a compilar desde el .txt.
+#
+# Formato del archivo (enteros en little-endian):
+#   cabecera: 'NIVC', versión, fecha (ns) y tamaño del .txt, CRC32 del .txt, ancho, alto,
+#             columna y fila del jugador (-1 si no hay), número de paredes y de entidades
+#   datos (con zlib): longitud de cada línea, ocupación (1 = pared),
+#                     paredes (columna, fila, ancho, alto) y entidades (carácter, columna, fila)
+
+MAGICO = b'NIVC'
+VERSION = 1
+CABECERA = struct.Struct('<4sHqQIHHhhII')
+# Caracteres del mapa que se convierten en enemigos o items.
+CARACTERES_ENTIDAD = 'EVCG'
+# Para reconstruir las líneas del mapa a partir de la ocupación.
+_TABLA_OCUPACION = bytes.maketrans(b'\x00\x01', b' #')
+
+# Niveles ya compilados, por ruta del .txt.
+_niveles = {}
+
+
+class NivelCompilado:
+    def __init__(self, ancho, alto, longitudes, ocupacion, paredes, entidades, inicio_jugador):
+        """
+        Datos de un nivel ya procesado, listos para construir sus sprites.
+        :param ancho: Ancho del mapa en tiles (la línea más larga).
+        :param alto: Alto del mapa en tiles.
+        :param longitudes: Longitud de cada línea del mapa.
+        :param ocupacion: bytearray de ancho x alto, fila a fila, con 1 en las paredes.
+        :param paredes: Lista de bloques de pared fusionados (columna, fila, ancho, alto) en tiles.
+        :param entidades: Lista de (carácter, columna, fila) de los enemigos e items, en orden del mapa.
+        :param inicio_jugador: (columna, fila) del jugador, o None si el mapa no tiene 'P'.
+        """
+        self.ancho = ancho
+        self.alto = alto
+        self.longitudes = longitudes
+        self.ocupacion = ocupacion
+        self.paredes = paredes
+        self.entidades = entidades
+        self.inicio_jugador = inicio_jugador
+        # Apariciones agrupadas por tipo ('E', 'V', 'C', 'G').
+        self.por_tipo = {caracter: [] for caracter in CARACTERES_ENTIDAD}
+        for caracter, columna, fila in entidades:
+            self.por_tipo[caracter].append((columna, fila))
+        # Líneas del mapa, para el motor de NumPy y el campo de flujo.
+        self.mapa = self.reconstruir_mapa()
+
+    def reconstruir_mapa(self):
+        """
+        Devuelve las líneas del mapa original a partir de los datos compilados.
+        """
+        texto = self.ocupacion.translate(_TABLA_OCUPACION)
+        filas = [bytearray(texto[f * self.ancho:f * self.ancho + longitud])
+                 for f, longitud in enumerate(self.longitudes)]
+        for caracter, columna, fila in self.entidades:
+            filas[fila][columna] = ord(caracter)
+        if self.inicio_jugador is not None:
+            columna, fila = self.inicio_jugador
+            filas[fila][columna] = ord('P')
+        return [fila.decode('ascii') for fila in filas]
+
+
+def compilar_mapa(mapa):
+    """
+    Compila un mapa (lista de líneas) y devuelve un NivelCompilado.
+    """
+    ancho = max((len(linea) for linea in mapa), default=0)
+    alto = len(mapa)
+    ocupacion = bytearray(ancho * alto)
+    entidades = []
+    inicio_jugador = None
+    for fila, linea in enumerate(mapa):
+        for columna, caracter in enumerate(linea):
+            if caracter == '#':
+                ocupacion[fila * ancho + columna] = 1
+            elif caracter in CARACTERES_ENTIDAD:
+                entidades.append((caracter, columna, fila))
+            elif caracter == 'P':
+                inicio_jugador = (columna, fila)
+    return NivelCompilado(ancho, alto, [len(linea) for linea in mapa], ocupacion,
+                          fusionar_paredes(mapa), entidades, inicio_jugador)
+
+
+def guardar(nivel, ruta, fecha, tamaño, crc):
+    """
+    Guarda un nivel compilado en un archivo binario junto con los datos del .txt del que viene.
+    Escribe un archivo temporal en la misma carpeta y lo renombra al terminar, para que nadie
+    pueda leer el archivo a medio escribir.
+    """
+    columna, fila = nivel.inicio_jugador if nivel.inicio_jugador is not None else (-1, -1)
+    datos = array('H', nivel.longitudes).tobytes() + bytes(nivel.ocupacion)
+    datos += array('H', [valor for pared in nivel.paredes for valor in pared]).tobytes()
+    datos += array('H', [valor for caracter, c, f in nivel.entidades for valor in (ord(caracter), c, f)]).tobytes()
+    descriptor, temporal = tempfile.mkstemp(prefix=os.path.basename(ruta) + '.', suffix='.tmp',
+                                            dir=os.path.dirname(ruta))
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(CABECERA.pack(MAGICO, VERSION, fecha, tamaño, crc, nivel.ancho, nivel.alto,
+                                  columna, fila, len(nivel.paredes), len(nivel.entidades)))
+            f.write(zlib.compress(datos))
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+
+def leer_cabecera(ruta):
+    """
+    Devuelve la cabecera de un archivo compilado como tupla, o None si no existe o no es válido.
+    """
+    try:
+        with open(ruta, 'rb') as f:
+            cabecera = CABECERA.unpack(f.read(CABECERA.size))
+    except (OSError, struct.error):
+        return None
+    if cabecera[0] != MAGICO or cabecera[1] != VERSION:
+        return None
+    return cabecera
+
+
+def leer(ruta):
+    """
+    Lee un nivel compilado de un archivo binario.
+    """
+    with open(ruta, 'rb') as f:
+        _, _, _, _, _, ancho, alto, columna, fila, total_paredes, total_entidades = \
+            CABECERA.unpack(f.read(CABECERA.size))
+        datos = zlib.decompress(f.read())
+
+    posicion = 0
+    def siguiente(cantidad):
+        nonlocal posicion
+        valores = array('H')
+        valores.frombytes(datos[posicion:posicion + cantidad * valores.itemsize])
+        posicion += cantidad * valores.itemsize
+        return valores
+
+    longitudes = list(siguiente(alto))
+    ocupacion = bytearray(datos[posicion:posicion + ancho * alto])
+    posicion += ancho * alto
+    valores = siguiente(total_paredes * 4)
+    paredes = [tuple(valores[i:i + 4]) for i in range(0, len(valores), 4)]
+    valores = siguiente(total_entidades * 3)
+    entidades = [(chr(valores[i]), valores[i + 1], valores[i + 2]) for i in range(0, len(valores), 3)]
+    inicio_jugador = (columna, fila) if columna >= 0 else None
+    return NivelCompilado(ancho, alto, longitudes, ocupacion, paredes, entidades, inicio_jugador)
+
+
+def leer_si_es_valido(ruta):
+    """
+    Lee un nivel compilado como leer(), pero devuelve None si el archivo falta o está dañado.
+    """
+    try:
+        return leer(ruta)
+    except (OSError, struct.error, zlib.error, ValueError, IndexError):
+        return None
+
+
+def ruta_cache_nivel(ruta_txt):
+    """
+    Devuelve la ruta del archivo de caché de un .txt: su nombre más un CRC32 de su ruta completa.
+    """
+    clave = zlib.crc32(os.path.abspath(ruta_txt).encode())
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), DIRECTORIO_CACHE_NIVELES,
+                        f"{os.path.basename(ruta_txt)}.{clave:08x}.bin")
+
+
+def obtener(ruta_txt):
+    """
+    Devuelve el nivel compilado de un .txt. Primero lo busca en memoria, después en el
+    archivo de caché (si sigue siendo válido) y, si no, lo compila y guarda el archivo.
+    """
+    if ruta_txt in _niveles:
+        return _niveles[ruta_txt]
+
+    ruta_cache = ruta_cache_nivel(ruta_txt)
+    estado = os.stat(ruta_txt)
+    cabecera = leer_cabecera(ruta_cache)
+    nivel = None
+    if cabecera is not None and cabecera[2:4] == (estado.st_mtime_ns, estado.st_size):
+        nivel = leer_si_es_valido(ruta_cache)
+    if nivel is None:
+        with open(ruta_txt, 'rb') as f:
+            contenido = f.read()
+        crc = zlib.crc32(contenido)
+        # Si solo ha cambiado la fecha (por ejemplo, al clonar el repositorio), el caché sigue valiendo.
+        if cabecera is not None and cabecera[4] == crc:
+            nivel = leer_si_es_valido(ruta_cache)
+        if nivel is None:
+            nivel = compilar_mapa([linea.strip() for linea in contenido.decode().splitlines()])
+        # Guardamos el caché con la fecha nueva. Si no se puede escribir, seguimos sin él.
+        try:
+            os.makedirs(os.path.dirname(ruta_cache), exist_ok=True)
+            guardar(nivel, ruta_cache, estado.st_mtime_ns, estado.st_size, crc)
+        except OSError:
+            pass
+
+    _niveles[ruta_txt] = nivel
+    return nivel
+
+
+def limpiar_cache():
+    """
+    Olvida los niveles compilados guardados en memoria (los archivos de caché se mantienen).
+    """
+    _niveles.clear()
@@ -0,0 +1,162 @@
+from settings import *
+from array import array
+import csv
+import json
+import time
+
+# --- Perfilador de Fotogramas ---
+# Mide cuánto tarda cada fase de un fotograma (eventos, actualizar, dibujar y enviar a la
+# ventana) y cuenta las consultas de colisión y los blits. Guarda los últimos fotogramas en
+# un búfer circular, calcula percentiles (p50, p95, p99), puede mostrarse encima del juego
+# y al salir vuelca todo a CSV y JSON.
+#
+# Cuando está desactivado, el bucle del juego no llama a ninguno de sus métodos
+# (solo comprueba una variable), así que se puede dejar siempre incluido en el juego.
+
+FASES = ('eventos', 'actualizar', 'dibujar', 'flip')
+CONTADORES = ('pasos', 'consultas_colision', 'blits')
+
+
+class Perfilador:
+    def __init__(self, activo=PERFILADOR_ACTIVO, capacidad=PERFILADOR_FOTOGRAMAS):
+        """
+        Constructor del perfilador.
+        :param activo: Si es False, el juego no mide nada.
+        :param capacidad: Número de fotogramas que se guardan en el búfer circular.
+        """
+        self.activo = activo
+        self.capacidad = capacidad
+        # Búfer circular: una fila de tiempos (en segundos) por fase y una por contador.
+        self.tiempos = {fase: array('d', [0.0]) * capacidad for fase in FASES}
+        self.contadores = {nombre: array('l', [0]) * capacidad for nombre in CONTADORES}
+        # Posición en la que se escribirá el próximo fotograma y cuántos hay guardados.
+        self.indice = 0
+        self.guardados = 0
+        # Valores del fotograma en curso.
+        self.actual = dict.fromkeys(FASES, 0.0)
+        self.cuentas = dict.fromkeys(CONTADORES, 0)
+        # El resumen en pantalla se alterna con F3.
+        self.mostrar_resumen = False
+        self._lineas_resumen = []
+        # Milisegundos desde que arrancó el programa hasta el primer fotograma (lo anota el juego).
+        self.primer_fotograma_ms = None
+        # Memoria aproximada de cada nivel construido (ver Simulacion.memoria_nivel).
+        self.memoria_niveles = []
+
+    def medir(self, fase, inicio):
+        """
+        Suma a la fase el tiempo pasado desde 'inicio' (un valor de time.perf_counter()).
+        """
+        self.actual[fase] += time.perf_counter() - inicio
+
+    def contar(self, nombre, cantidad=1):
+        """
+        Suma 'cantidad' al contador indicado del fotograma en curso.
+        """
+        self.cuentas[nombre] += cantidad
+
+    def cerrar_fotograma(self):
+        """
+        Guarda el fotograma en curso en el búfer circular y prepara el siguiente.
+        """
+        i = self.indice
+        for fase in FASES:
+            self.tiempos[fase][i] = self.actual[fase]
+            self.actual[fase] = 0.0
+        for nombre in CONTADORES:
+            self.contadores[nombre][i] = self.cuentas[nombre]
+            self.cuentas[nombre] = 0
+        self.indice = (i + 1) % self.capacidad
+        self.guardados = min(self.guardados + 1, self.capacidad)
+
+        # El texto del resumen solo se recalcula de vez en cuando para no medir nuestro propio coste.
+        if self.mostrar_resumen and self.indice % 30 == 0:
+            self._lineas_resumen = self.lineas_resumen()
+
+    def valores(self, serie):
+        """
+        Devuelve los valores guardados de una serie, del fotograma más antiguo al más reciente.
+        """
+        if self.guardados < self.capacidad:
+            return list(serie[:self.guardados])
+        return list(serie[self.indice:]) + list(serie[:self.indice])
+
+    def percentiles(self, fase):
+        """
+        Devuelve un diccionario con los percentiles 50, 95 y 99 de una fase, en milisegundos.
+        """
+        ordenados = sorted(self.valores(self.tiempos[fase]))
+        if not ordenados:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        resultado = {}
+        for p in (50, 95, 99):
+            posicion = min(len(ordenados) - 1, int(len(ordenados) * p / 100))
+            resultado[f'p{p}'] = ordenados[posicion] * 1000
+        return resultado
+
+    def lineas_resumen(self):
+        """
+        Devuelve las líneas de texto del resumen que se muestra en pantalla.
+        """
+        lineas = []
+        for fase in FASES:
+            p = self.percentiles(fase)
+            lineas.append(f"{fase}: p50 {p['p50']:.2f}  p95 {p['p95']:.2f}  p99 {p['p99']:.2f} ms")
+        for nombre in CONTADORES:
+            valores = self.valores(self.contadores[nombre])
+            media = sum(valores) / len(valores) if valores else 0
+            lineas.append(f"{nombre}: {media:.1f} / fotograma")
+        return lineas
+
+    def dibujar(self, juego):
+        """
+        Dibuja el resumen en la esquina superior izquierda y devuelve los rectángulos ocupados.
+        """
+        if not self.mostrar_resumen:
+            return []
+        if not self._lineas_resumen:
+            self._lineas_resumen = self.lineas_resumen()
+        rects = []
+        for i, linea in enumerate(self._lineas_resumen):
+            superficie = juego.textos.render(linea, 14, VERDE)
+            rects.append(juego.pantalla.blit(superficie, (8, 32 + i * 16)))
+        return rects
+
+    def anotar_memoria(self, nivel, memoria):
+        """
+        Guarda (y muestra en la consola) la memoria que ocupa un nivel recién construido.
+        :param nivel: Índice del nivel.
+        :param memoria: Diccionario devuelto por Simulacion.memoria_nivel.
+        """
+        self.memoria_niveles.append({'nivel': nivel, **memoria})
+        print(f"Nivel {nivel + 1}: {memoria['bytes'] / 1024:.0f} KB "
+              f"({memoria['paredes']} paredes, {memoria['sprites']} sprites)")
+
+    def volcar(self, ruta_base=PERFILADOR_ARCHIVO):
+        """
+        Guarda los fotogramas en '<ruta_base>.csv' y un resumen con percentiles en '<ruta_base>.json'.
+        """
+        if not self.guardados:
+            return
+        columnas = {fase: self.valores(self.tiempos[fase]) for fase in FASES}
+        columnas.update({nombre: self.valores(self.contadores[nombre]) for nombre in CONTADORES})
+
+        with open(ruta_base + '.csv', 'w', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(['fotograma'] + [f'{fase}_ms' for fase in FASES] + list(CONTADORES))
+            for i in range(self.guardados):
+                fila = [i] + [round(columnas[fase][i] * 1000, 4) for fase in FASES]
+                fila += [columnas[nombre][i] for nombre in CONTADORES]
+                escritor.writerow(fila)
+
+        resumen = {
+            'fotogramas': self.guardados,
+            'primer_fotograma_ms': self.primer_fotograma_ms,
+            'memoria_niveles': self.memoria_niveles,
+            'fases_ms': {fase: self.percentiles(fase) for fase in FASES},
+            'contadores_media': {
+                nombre: sum(columnas[nombre]) / self.guardados for nombre in CONTADORES
+            },
+        }
+        with open(ruta_base + '.json', 'w') as f:
+            json.dump(resumen, f, indent=2)
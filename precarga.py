@@ -0,0 +1,85 @@
+from settings import *
+from assets import decodificar_imagen, leer_archivo
+from simulacion import obtener_nivel
+from trozos import ArchivoTroceado
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Precarga de Niveles en Segundo Plano ---
+# Mientras se juega un nivel (o se muestra el mensaje "Nivel N"), un hilo aparte prepara el
+# siguiente: compila su mapa, decodifica las imágenes y lee la música. Así, al recoger el
+# objetivo, el cambio de nivel no tiene que esperar al disco.
+#
+# Pygame solo permite convertir superficies (.convert()) en el hilo principal, así que el hilo
+# de precarga deja las imágenes decodificadas pero sin convertir; la conversión la hace
+# cargar_imagen en el hilo principal la primera vez que un sprite pide la imagen.
+
+# Imágenes que usan los niveles.
+IMAGENES_NIVEL = (
+    IMAGEN_JUGADOR,
+    IMAGEN_PARED,
+    IMAGEN_ENEMIGO,
+    IMAGEN_ENEMIGO_VERTICAL,
+    IMAGEN_ENEMIGO_PERSEGUIDOR,
+    IMAGEN_ITEM,
+)
+
+
+def preparar_nivel(nivel_idx):
+    """
+    Hace todo el trabajo de cargar un nivel que no necesita el hilo principal.
+    Se ejecuta en el hilo de precarga.
+    :return: El nivel listo para Simulacion.construir.
+    """
+    nivel = obtener_nivel(nivel_idx)
+    if isinstance(nivel, ArchivoTroceado):
+        nivel.precargar()
+    for ruta in IMAGENES_NIVEL:
+        decodificar_imagen(ruta)
+    leer_archivo(MUSICA_FONDO)
+    return nivel
+
+
+class Precargador:
+    def __init__(self, hilos=HILOS_PRECARGA):
+        """
+        Constructor del precargador.
+        :param hilos: Número de hilos del grupo (las imágenes se decodifican en paralelo).
+        """
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='precarga')
+        # Niveles pedidos y aún no recogidos: índice -> Future.
+        self.pendientes = {}
+
+    def solicitar(self, nivel_idx):
+        """
+        Empieza a preparar un nivel en segundo plano (si existe y no se había pedido ya).
+        """
+        if nivel_idx < len(LEVEL_MAPS) and nivel_idx not in self.pendientes:
+            self.pendientes[nivel_idx] = self.ejecutor.submit(preparar_nivel, nivel_idx)
+
+    def decodificar_imagenes(self):
+        """
+        Decodifica en paralelo todas las imágenes de los niveles (al arrancar el juego).
+        """
+        for ruta in IMAGENES_NIVEL:
+            self.ejecutor.submit(decodificar_imagen, ruta)
+
+    def obtener(self, nivel_idx):
+        """
+        Devuelve un nivel listo para construir. Si se había pedido, espera a que termine
+        (normalmente ya habrá terminado); si no, lo carga en este hilo.
+        """
+        futuro = self.pendientes.pop(nivel_idx, None)
+        if futuro is not None:
+            try:
+                return futuro.result()
+            except Exception:
+                # Si falló en segundo plano, lo repetimos aquí para que el error se vea normalmente.
+                pass
+        return obtener_nivel(nivel_idx)
+
+    def cerrar(self):
+        """
+        Cancela lo pendiente y termina el hilo de precarga.
+        """
+        self.ejecutor.shutdown(wait=False, cancel_futures=True)
+        self.pendientes.clear()
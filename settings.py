@@ -11,8 +11,49 @@ ALTO_PANTALLA = 448 # 14 tiles * 32 pixeles
 
 # --- Fotogramas Por Segundo (FPS) ---
 # Controla la "velocidad" a la que se actualiza el juego.
+# La lógica siempre avanza en pasos fijos de 1 / FPS segundos de tiempo real.
 FPS = 60
 
+# --- Fotogramas Dibujados por Segundo ---
+# Se puede bajar (por ejemplo a 30) en equipos lentos: el juego irá igual de rápido,
+# solo que se harán varios pasos de lógica por cada fotograma dibujado.
+FPS_RENDER = 60
+
+# --- Máximo de Pasos por Fotograma ---
+# Si el equipo se queda atrás, no intentamos recuperar más de estos pasos de golpe.
+# Así evitamos la "espiral de la muerte" (cada vez más pasos atrasados).
+MAX_PASOS_POR_FOTOGRAMA = 5
+
+# --- Espera en Pantallas Estáticas ---
+# Si es True, en los menús, la pausa y el mensaje "Nivel N" el juego duerme hasta que llega
+# una tecla (o se acaba el mensaje) en lugar de redibujar lo mismo FPS veces por segundo.
+ESPERA_INACTIVA = True
+# Milisegundos que se muestra el mensaje "Nivel N" al empezar un nivel.
+DURACION_MENSAJE_NIVEL = 2000
+
+# --- Modo de Dibujado ---
+# Si es True, las paredes se dibujan una sola vez por nivel en un fondo guardado y en cada
+# fotograma solo se repintan las zonas que cambian (rectángulos sucios).
+# Si es False, se redibuja la pantalla completa en cada fotograma.
+RENDER_RECTANGULOS_SUCIOS = True
+
+# --- Perfilador ---
+# Si es True, se mide cuánto tarda cada fase de cada fotograma. Con F3 se muestra un resumen
+# en pantalla, y al salir se guardan los datos en PERFILADOR_ARCHIVO + '.csv' y '.json'.
+PERFILADOR_ACTIVO = False
+# Número de fotogramas que se guardan (los más antiguos se van descartando).
+PERFILADOR_FOTOGRAMAS = 600
+PERFILADOR_ARCHIVO = "perfil"
+
+# --- Fuente de los Textos ---
+# Buscar la fuente en el sistema es lento, así que la ruta encontrada se guarda en ARCHIVO_CACHE_FUENTE.
+NOMBRE_FUENTE = "arial"
+ARCHIVO_CACHE_FUENTE = ".cache_fuente"
+
+# --- Caché de Textos ---
+# Número máximo de textos ya renderizados que se guardan en memoria.
+MAX_TEXTOS_CACHE = 128
+
 # --- Ajustes del Nivel ---
 TILE_SIZE = 32
 # Creamos una lista con todos los mapas de niveles que vaya teniendo el juego.
@@ -22,12 +63,73 @@ LEVEL_MAPS = [
     "level3.txt"
 ]
 
+# Hilos que preparan niveles y decodifican imágenes en segundo plano (ver precarga.py).
+HILOS_PRECARGA = 4
+# Carpeta donde se guardan los niveles compilados (ver nivel_compilado.py).
+DIRECTORIO_CACHE_NIVELES = ".cache_niveles"
+
+# --- Niveles por Trozos ---
+# Los niveles enormes se pueden guardar troceados (ver trozos.py): solo se cargan los trozos
+# que rodean al jugador y los lejanos se descargan.
+EXTENSION_TROCEADA = ".niv"
+# Lado de cada trozo, en tiles.
+TAMAÑO_TROZO = 16
+# Trozos cargados alrededor del que ocupa el jugador, en cada dirección.
+RADIO_TROZOS = 2
+# Máximo de trozos cargados a la vez (como mínimo caben los de alrededor del jugador).
+MAX_TROZOS_CARGADOS = 36
+
+# --- Entorno de Entrenamiento ---
+# Ajustes del entorno para jugadores automáticos (ver entorno.py).
+# La observación es una ventana de (2 * RADIO_OBSERVACION + 1) tiles de lado centrada en el jugador.
+RADIO_OBSERVACION = 7
+# Recompensa de cada paso según cómo termine (o no) el nivel.
+RECOMPENSA_ITEM = 1.0
+RECOMPENSA_MUERTE = -1.0
+RECOMPENSA_TIEMPO = -1.0
+RECOMPENSA_PASO = 0.0
+
+# --- Generador de Niveles ---
+# Ajustes de generador.py. Los niveles generados tienen el tamaño de la pantalla.
+ANCHO_GENERADO = ANCHO_PANTALLA // TILE_SIZE
+ALTO_GENERADO = ALTO_PANTALLA // TILE_SIZE
+# Número de barras de pared (mínimo, máximo) y su largo en tiles (mínimo, máximo).
+BARRAS_GENERADAS = (6, 14)
+LARGO_BARRAS_GENERADAS = (2, 8)
+# Enemigos de cada tipo (mínimo, máximo).
+ENEMIGOS_GENERADOS = {'E': (1, 4), 'V': (1, 4), 'C': (0, 1)}
+# Los niveles con el objetivo a menos de estos tiles del jugador se descartan por fáciles.
+DISTANCIA_MINIMA_OBJETIVO = 15
+# Los perseguidores se colocan al menos a estos tiles del jugador.
+DISTANCIA_MINIMA_PERSEGUIDOR = 8
+# Fracción del tiempo del nivel que puede usar el mejor camino. El resto es margen
+# para un jugador humano, que no va por el camino perfecto.
+MARGEN_TIEMPO_GENERADO = 0.5
+
 # --- Ajustes del Jugador ---
 VELOCIDAD_JUGADOR = 5
 VIDAS_JUGADOR = 3
 
 # --- Ajustes de Enemigos ---
 VELOCIDAD_ENEMIGO = 3
+# Si es True (y NumPy está instalado), los enemigos se mueven todos a la vez en arrays
+# de NumPy en lugar de ser sprites individuales. Útil en niveles con cientos de enemigos.
+USAR_MOTOR_NUMPY = False
+# Los enemigos que estén fuera de la pantalla (más un margen en píxeles) solo se actualizan
+# una vez cada ACTUALIZAR_FUERA_PANTALLA_CADA pasos, así que allí se mueven más despacio.
+# Con 1 se actualizan siempre (comportamiento normal).
+ACTUALIZAR_FUERA_PANTALLA_CADA = 1
+MARGEN_ZONA_ACTIVA = 4 * 32
+# Lado de las celdas de la rejilla de enemigos e items (en píxeles). Tiene que ser al menos
+# tan grande como el sprite más grande para que cada consulta mire pocas celdas.
+TAMAÑO_CELDA_ENTIDADES = 4 * TILE_SIZE
+# La rejilla de enemigos solo se pone al día cada PASOS_ACTUALIZAR_REJILLA_ENTIDADES pasos;
+# entre tanto, las consultas miran DESPLAZAMIENTO_MAXIMO_ENEMIGO píxeles más lejos por cada paso.
+# Si un enemigo nuevo se mueve más rápido que VELOCIDAD_ENEMIGO, hay que subir este valor.
+PASOS_ACTUALIZAR_REJILLA_ENTIDADES = 16
+DESPLAZAMIENTO_MAXIMO_ENEMIGO = VELOCIDAD_ENEMIGO
+# Máximo de casillas que el campo de flujo de los perseguidores procesa en cada paso.
+NODOS_FLUJO_POR_PASO = 2000
 
 # --- Archivos de Assets ---
 CARPETA_ASSETS = "assets"
@@ -44,6 +146,12 @@ IMAGEN_ITEM = "images/item.png"
 MUSICA_FONDO = "music/musica.mp3"  # Puedes ser .mp3 o .ogg
 MUSICA_GAME_OVER = "music/game_over.mp3"  # Música para cuando pierdes
 MUSICA_VICTORIA = "music/victoria.mp3"  # Música para cuando ganas
+# Pistas cortas que se cargan enteras en memoria (ver audio.py), con los segundos
+# que se saltan al principio de cada una.
+JINGLES = {
+    MUSICA_GAME_OVER: 0.5,
+    MUSICA_VICTORIA: 0,
+}
 
 # --- Colores (en formato RGB) ---
 # Puedes encontrar más colores buscando "RGB color picker" en internet.
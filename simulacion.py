@@ -0,0 +1,515 @@
+import pygame
+from settings import *
+# Importamos las clases de los sprites que forman un nivel.
+from sprites import Jugador, Pared, Enemigo, EnemigoVertical, EnemigoPerseguidor, Item
+# Importamos la rejilla que acelera las colisiones con las paredes.
+from colisiones import RejillaParedes, RejillaEntidades
+from entrada import NINGUNA
+# Importamos el campo de flujo que guía a los enemigos perseguidores.
+from campo_flujo import CampoFlujo
+# Importamos los niveles por trozos, que se cargan poco a poco alrededor del jugador.
+from trozos import ArchivoTroceado, MundoTroceado
+# Importamos los niveles compilados, que evitan volver a leer y procesar los .txt.
+import nivel_compilado
+from nivel_compilado import NivelCompilado
+# Importamos el motor vectorizado de enemigos (opcional, necesita NumPy).
+import motor_enemigos
+import os
+import sys
+import time
+import random
+
+# --- Simulación del Nivel ---
+# Este archivo contiene la lógica de un nivel separada de la ventana:
+# no dibuja nada, no lee el teclado y no espera al reloj.
+# La clase Juego (main.py) la usa para jugar normalmente, pero también se puede
+# ejecutar sin pantalla, tan rápido como permita la CPU, para probar los niveles.
+
+# --- Resultados de un Paso ---
+RESULTADO_ITEM = 'item'      # El jugador ha recogido el objetivo.
+RESULTADO_MUERTE = 'muerte'  # Un enemigo ha tocado al jugador.
+RESULTADO_TIEMPO = 'tiempo'  # Se ha acabado el tiempo del nivel.
+
+
+# Tipo de enemigo del motor de NumPy para cada carácter del mapa.
+TIPOS_MOTOR = {
+    'E': motor_enemigos.HORIZONTAL,
+    'V': motor_enemigos.VERTICAL,
+    'C': motor_enemigos.PERSEGUIDOR,
+}
+
+# Clase del sprite de cada carácter del mapa que es un enemigo o un item.
+CLASES_ENTIDAD = {
+    'E': Enemigo,
+    'V': EnemigoVertical,
+    'C': EnemigoPerseguidor,
+    'G': Item,
+}
+
+
+def cargar_mapa(nivel_idx):
+    """
+    Lee el mapa de la lista LEVEL_MAPS y lo devuelve como una lista de líneas.
+    Si el nivel está troceado, devuelve un ArchivoTroceado (solo se lee su cabecera).
+    """
+    directorio_juego = os.path.dirname(__file__)
+    if LEVEL_MAPS[nivel_idx].endswith(EXTENSION_TROCEADA):
+        return ArchivoTroceado(os.path.join(directorio_juego, LEVEL_MAPS[nivel_idx]))
+    mapa = []
+    with open(os.path.join(directorio_juego, LEVEL_MAPS[nivel_idx]), 'rt') as f:
+        for linea in f:
+            mapa.append(linea.strip())
+    return mapa
+
+
+def obtener_nivel(nivel_idx):
+    """
+    Devuelve el nivel de LEVEL_MAPS listo para Simulacion.construir: un NivelCompilado
+    (guardado en memoria, así que reiniciar el nivel no lee el disco) o un ArchivoTroceado.
+    """
+    ruta = os.path.join(os.path.dirname(__file__), LEVEL_MAPS[nivel_idx])
+    if ruta.endswith(EXTENSION_TROCEADA):
+        return ArchivoTroceado(ruta)
+    return nivel_compilado.obtener(ruta)
+
+
+class Instantanea:
+    def __init__(self, moviles, items, campo_flujo, motor_enemigos, tiempo_restante, pasos, entrada):
+        """
+        Estado guardado de un nivel (ver Simulacion.tomar_instantanea).
+        :param moviles: Lista de (sprite, x, y, vx, vy) del jugador y los enemigos (None si no tiene esa velocidad).
+        :param items: Lista de (item, grupos a los que pertenecía).
+        :param campo_flujo: Estado del campo de flujo, o None si el nivel no tiene.
+        :param motor_enemigos: Estado del motor de NumPy, o None si no se usa.
+        """
+        self.moviles = moviles
+        self.items = items
+        self.campo_flujo = campo_flujo
+        self.motor_enemigos = motor_enemigos
+        self.tiempo_restante = tiempo_restante
+        self.pasos = pasos
+        self.entrada = entrada
+
+
+class Simulacion:
+    def __init__(self, tiempo_nivel=90):
+        """
+        Constructor de la simulación.
+        :param tiempo_nivel: Segundos disponibles para completar cada nivel.
+        """
+        self.tiempo_nivel = tiempo_nivel
+        self.tiempo_restante = tiempo_nivel
+        # Bits de entrada del paso actual (los lee el Jugador en get_teclas_presionadas).
+        self.entrada = NINGUNA
+        # Número de pasos ejecutados en el nivel actual.
+        self.pasos = 0
+        self.mapa = []
+        self.jugador = None
+        # Consultas de colisión contra items y enemigos (las de paredes las cuenta la rejilla).
+        self.consultas_colision = 0
+        # Tamaño del nivel en píxeles.
+        self.ancho_nivel = 0
+        self.alto_nivel = 0
+        # Zona (normalmente lo que se ve en pantalla) fuera de la cual los enemigos se
+        # actualizan con menos frecuencia. None significa que se actualizan todos siempre.
+        self.zona_activa = None
+        # Gestor de trozos si el nivel está troceado (None si se construyó entero).
+        self.mundo = None
+        # Paredes del nivel (un diccionario usado como conjunto ordenado) y el resto de sprites.
+        self.paredes = {}
+        self.todos_los_sprites = pygame.sprite.Group()
+        # --- Reserva de Objetos ---
+        # Al construir un nivel, las paredes, enemigos e items del anterior se guardan aquí
+        # y se reutilizan en lugar de crear objetos nuevos (ver reciclar).
+        self.reserva = {clase: [] for clase in (Pared, *CLASES_ENTIDAD.values())}
+
+    def cargar_nivel(self, nivel_idx):
+        """
+        Carga un nivel de LEVEL_MAPS por su índice y construye todos sus sprites.
+        """
+        self.construir(obtener_nivel(nivel_idx))
+
+    def construir(self, mapa):
+        """
+        Construye los grupos de sprites a partir de un mapa.
+        :param mapa: Lista de líneas del nivel, un NivelCompilado o un ArchivoTroceado
+                     (para los niveles por trozos).
+        """
+        if isinstance(mapa, ArchivoTroceado):
+            self.construir_troceado(mapa)
+            return
+        if not isinstance(mapa, NivelCompilado):
+            mapa = nivel_compilado.compilar_mapa(mapa)
+        nivel = mapa
+
+        self.mapa = nivel.mapa
+        self.ancho_nivel = nivel.ancho * TILE_SIZE
+        self.alto_nivel = nivel.alto * TILE_SIZE
+        self.mundo = None
+        self.crear_grupos()
+        # Si está activado, los enemigos van al motor de NumPy en lugar de ser sprites.
+        self.motor_enemigos = None
+        if USAR_MOTOR_NUMPY and motor_enemigos.motor_disponible():
+            self.motor_enemigos = motor_enemigos.MotorEnemigos(nivel.mapa)
+
+        # --- Creación de las Paredes ---
+        # En lugar de una pared por cada '#', el nivel compilado tiene los tiles adyacentes
+        # fusionados en bloques rectangulares. Así hay muchas menos paredes que comprobar y que dibujar.
+        for x, y, ancho, alto in nivel.paredes:
+            self.crear_pared(x * TILE_SIZE, y * TILE_SIZE, ancho * TILE_SIZE, alto * TILE_SIZE)
+
+        # --- Creación del Resto del Nivel ---
+        # Los enemigos e items están en el mismo orden que en el mapa.
+        for caracter, x, y in nivel.entidades:
+            if caracter in TIPOS_MOTOR and self.motor_enemigos is not None:
+                self.motor_enemigos.agregar(TIPOS_MOTOR[caracter], x * TILE_SIZE, y * TILE_SIZE)
+            else:
+                sprite = self.crear_entidad(caracter, x * TILE_SIZE, y * TILE_SIZE)
+                # Las paredes ya están creadas: los patrulleros calculan entre cuáles se mueven.
+                if caracter in 'EV':
+                    sprite.calcular_tramo(nivel)
+
+        # Creamos al jugador en la posición 'P' y lo añadimos al grupo de todos los sprites.
+        self.jugador = None
+        if nivel.inicio_jugador is not None:
+            x, y = nivel.inicio_jugador
+            self.jugador = Jugador(self)
+            self.jugador.rect.x = x * TILE_SIZE
+            self.jugador.rect.y = y * TILE_SIZE
+        self.todos_los_sprites.add(self.jugador)
+        # Pasamos los enemigos del motor a arrays.
+        if self.motor_enemigos is not None:
+            self.motor_enemigos.finalizar()
+
+        # --- Campo de Flujo ---
+        # Solo lo creamos si el nivel tiene enemigos perseguidores.
+        self.campo_flujo = None
+        if nivel.por_tipo['C']:
+            self.campo_flujo = CampoFlujo(nivel.mapa)
+
+        self.reiniciar_temporizador()
+
+    def construir_troceado(self, archivo):
+        """
+        Prepara un nivel por trozos: solo se crean el jugador y los trozos que lo rodean.
+        El resto se carga (y se descarga) en cada paso según se mueva el jugador.
+        """
+        self.mapa = []
+        self.ancho_nivel = archivo.ancho * TILE_SIZE
+        self.alto_nivel = archivo.alto * TILE_SIZE
+        self.crear_grupos()
+        # El motor de NumPy y el campo de flujo necesitan el mapa entero, así que en los
+        # niveles por trozos no se usan (los perseguidores van directos hacia el jugador).
+        self.motor_enemigos = None
+        self.campo_flujo = None
+
+        columna, fila = archivo.inicio_jugador
+        self.jugador = Jugador(self)
+        self.jugador.rect.x = columna * TILE_SIZE
+        self.jugador.rect.y = fila * TILE_SIZE
+        self.todos_los_sprites.add(self.jugador)
+
+        self.mundo = MundoTroceado(self, archivo)
+        self.mundo.actualizar(*self.jugador.rect.center)
+        self.reiniciar_temporizador()
+
+    def crear_grupos(self):
+        """
+        Crea los grupos de sprites y la rejilla de paredes vacíos.
+        """
+        self.reciclar()
+        # --- Grupos de Sprites ---
+        # Creamos un grupo que contendrá todos los sprites del juego (menos las paredes).
+        self.todos_los_sprites = pygame.sprite.Group()
+        # Las paredes no son sprites: las guardamos en un diccionario (ver sprites.Pared).
+        self.paredes = {}
+        # Creamos un grupo específico para los enemigos.
+        self.enemigos = pygame.sprite.Group()
+        # Creamos un grupo específico para los items.
+        self.items = pygame.sprite.Group()
+        # Creamos la rejilla de paredes para que las colisiones solo miren las celdas cercanas.
+        self.rejilla_paredes = RejillaParedes()
+        # Y la de enemigos e items, para que las colisiones con el jugador no recorran los grupos enteros.
+        self.rejilla_entidades = RejillaEntidades()
+
+    def reciclar(self):
+        """
+        Guarda en la reserva las paredes, enemigos e items del nivel actual para reutilizarlos
+        en el siguiente. Quitar cada sprite de sus grupos rompe las referencias circulares entre
+        sprites y grupos, así que el recolector de basura no tiene que buscarlas después.
+        """
+        self.reserva[Pared].extend(self.paredes)
+        self.paredes = {}
+        for sprite in self.todos_los_sprites.sprites():
+            sprite.kill()
+            reserva = self.reserva.get(type(sprite))
+            if reserva is not None:
+                reserva.append(sprite)
+
+    def crear_pared(self, x, y, ancho, alto):
+        """
+        Crea un bloque de pared (en píxeles), lo añade a las paredes y a la rejilla y lo devuelve.
+        Si hay paredes en la reserva, reutiliza una.
+        """
+        reserva = self.reserva[Pared]
+        if reserva:
+            pared = reserva.pop()
+            pared.colocar(x, y, ancho, alto)
+        else:
+            pared = Pared(x, y, ancho, alto)
+        self.paredes[pared] = None
+        self.rejilla_paredes.agregar(pared)
+        return pared
+
+    def quitar_pared(self, pared):
+        """
+        Quita una pared del nivel y la guarda en la reserva (por ejemplo, al descargar un trozo).
+        """
+        self.rejilla_paredes.quitar(pared)
+        del self.paredes[pared]
+        self.reserva[Pared].append(pared)
+
+    def crear_entidad(self, caracter, x, y):
+        """
+        Crea el enemigo o item que representa un carácter del mapa en la posición (x, y) en píxeles.
+        Si hay uno de la misma clase en la reserva, lo reutiliza.
+        Devuelve el sprite creado, o None si el carácter no es un enemigo ni un item.
+        """
+        clase = CLASES_ENTIDAD.get(caracter)
+        if clase is None:
+            return None
+        reserva = self.reserva[clase]
+        if reserva:
+            sprite = reserva.pop()
+            sprite.colocar(x, y)
+        else:
+            sprite = clase(self, x, y)
+        # El objetivo ('G') va al grupo de items; el resto, al de enemigos.
+        grupo = self.items if caracter == 'G' else self.enemigos
+        self.todos_los_sprites.add(sprite)
+        grupo.add(sprite)
+        self.rejilla_entidades.agregar(sprite)
+        return sprite
+
+    def reiniciar_temporizador(self):
+        """
+        Resetea el tiempo y el contador de pasos para empezar el nivel.
+        """
+        self.tiempo_restante = self.tiempo_nivel
+        self.pasos = 0
+        self.entrada = NINGUNA
+
+    def paso(self, entrada=NINGUNA):
+        """
+        Avanza la lógica del nivel un paso (un fotograma a FPS).
+        :param entrada: Bits de las teclas pulsadas en este paso (ver entrada.py).
+        :return: RESULTADO_TIEMPO, RESULTADO_ITEM, RESULTADO_MUERTE o None si el nivel sigue.
+        """
+        self.entrada = entrada
+        self.pasos += 1
+
+        # Avisamos al campo de flujo de dónde está el jugador (solo se recalcula si cambia de casilla).
+        if self.campo_flujo is not None:
+            self.campo_flujo.actualizar(*self.jugador.rect.center)
+
+        # En los niveles por trozos, cargamos los trozos cercanos al jugador y descargamos los lejanos.
+        if self.mundo is not None:
+            self.mundo.actualizar(*self.jugador.rect.center)
+
+        # Movemos a los enemigos del motor antes que al jugador, igual que hacen los sprites
+        # de los enemigos (que se añaden al grupo antes que él).
+        if self.motor_enemigos is not None:
+            self.motor_enemigos.actualizar(self.jugador, self.campo_flujo)
+
+        # Pygame se encarga de llamar al método update() de cada sprite en el grupo.
+        if (self.zona_activa is None or ACTUALIZAR_FUERA_PANTALLA_CADA <= 1
+                or self.pasos % ACTUALIZAR_FUERA_PANTALLA_CADA == 0):
+            self.todos_los_sprites.update()
+        else:
+            # En este paso solo movemos a los enemigos cercanos a la pantalla (en el mismo
+            # orden que el grupo: primero los enemigos y al final el jugador).
+            zona = self.zona_activa
+            for enemigo in self.enemigos:
+                if zona.colliderect(enemigo.rect):
+                    enemigo.update()
+            self.jugador.update()
+
+        # Cada pocos pasos, ponemos al día la rejilla de enemigos (ver colisiones.RejillaEntidades).
+        if self.pasos % PASOS_ACTUALIZAR_REJILLA_ENTIDADES == 0:
+            self.rejilla_entidades.actualizar(self.enemigos)
+        else:
+            self.rejilla_entidades.holgura += DESPLAZAMIENTO_MAXIMO_ENEMIGO
+
+        # --- Sistema de Temporizador ---
+        # Decrementamos el tiempo restante.
+        if self.tiempo_restante > 0:
+            self.tiempo_restante -= 1 / FPS
+            # Nos aseguramos de que no baje de 0.
+            if self.tiempo_restante < 0:
+                self.tiempo_restante = 0
+
+        # --- Comprobación de Tiempo Agotado ---
+        if self.tiempo_restante == 0:
+            return RESULTADO_TIEMPO
+
+        # --- Comprobación de Colisión Jugador-Item (Victoria de Nivel) ---
+        # Los items recogidos desaparecen de los grupos (la rejilla los ignora desde entonces).
+        self.consultas_colision += 1
+        recogidos = self.rejilla_entidades.colisiones(self.jugador.rect, self.items)
+        if recogidos:
+            for item in recogidos:
+                item.kill()
+            return RESULTADO_ITEM
+
+        # --- Comprobación de Colisión Jugador-Enemigo (Derrota) ---
+        # El False indica que el enemigo no debe desaparecer al chocar.
+        self.consultas_colision += 1
+        if self.rejilla_entidades.colisiones(self.jugador.rect, self.enemigos):
+            return RESULTADO_MUERTE
+        # Con el motor de NumPy, comprobamos todos los enemigos en una sola pasada.
+        if self.motor_enemigos is not None and self.motor_enemigos.colisiona_con(self.jugador.rect):
+            return RESULTADO_MUERTE
+
+        return None
+
+    # --- Instantáneas ---
+    def tomar_instantanea(self):
+        """
+        Guarda el estado de todo lo que se mueve en el nivel: posiciones y velocidades del
+        jugador y los enemigos, qué items siguen sin recoger, el campo de flujo y el temporizador.
+        Las paredes no cambian, así que no se guardan: el coste es proporcional al número
+        de entidades que se mueven, no al tamaño del nivel.
+        Sirve para reaparecer al morir (tomada justo al construir el nivel) y para puntos de control.
+        :return: Un objeto Instantanea, o None en los niveles por trozos (allí los sprites
+                 se crean y destruyen al cargar y descargar trozos, así que hay que reconstruir).
+        """
+        if self.mundo is not None:
+            return None
+        moviles = [(sprite, sprite.rect.x, sprite.rect.y, vars(sprite).get('vx'), vars(sprite).get('vy'))
+                   for sprite in self.enemigos.sprites() + [self.jugador]]
+        # Para cada item guardamos también sus grupos, para devolverlo a ellos si se recoge.
+        items = [(item, item.groups()) for item in self.items]
+        return Instantanea(
+            moviles, items,
+            self.campo_flujo.estado() if self.campo_flujo is not None else None,
+            self.motor_enemigos.estado() if self.motor_enemigos is not None else None,
+            self.tiempo_restante, self.pasos, self.entrada,
+        )
+
+    def restaurar(self, instantanea):
+        """
+        Devuelve el nivel al estado de una instantánea modificando los sprites que ya existen,
+        sin crear sprites ni grupos nuevos.
+        """
+        for sprite, x, y, vx, vy in instantanea.moviles:
+            sprite.rect.x = x
+            sprite.rect.y = y
+            if vx is not None:
+                sprite.vx = vx
+            if vy is not None:
+                sprite.vy = vy
+        for item, grupos in instantanea.items:
+            if not item.alive():
+                item.add(*grupos)
+        # Los enemigos han saltado a otra posición: los pasamos a su celda.
+        self.rejilla_entidades.actualizar(self.enemigos)
+        if instantanea.campo_flujo is not None:
+            self.campo_flujo.restaurar(instantanea.campo_flujo)
+        if instantanea.motor_enemigos is not None:
+            self.motor_enemigos.restaurar(instantanea.motor_enemigos)
+        self.tiempo_restante = instantanea.tiempo_restante
+        self.pasos = instantanea.pasos
+        self.entrada = instantanea.entrada
+
+    def memoria_nivel(self):
+        """
+        Calcula aproximadamente cuánta memoria ocupa el nivel actual: las paredes, los sprites,
+        sus grupos y las rejillas de colisiones (sin las imágenes, que se comparten entre niveles).
+        :return: Diccionario con el número de paredes y de sprites y los bytes estimados.
+        """
+        total = sys.getsizeof(self.paredes)
+        for pared in self.paredes:
+            total += sys.getsizeof(pared) + sys.getsizeof(pared.rect)
+        sprites = self.todos_los_sprites.sprites()
+        for sprite in sprites:
+            total += sys.getsizeof(sprite) + sys.getsizeof(vars(sprite)) + sys.getsizeof(sprite.rect)
+            # Cada sprite guarda también el conjunto de grupos a los que pertenece.
+            total += sys.getsizeof(sprite.groups())
+        for grupo in (self.todos_los_sprites, self.enemigos, self.items):
+            total += sys.getsizeof(grupo.spritedict)
+        for rejilla in (self.rejilla_paredes, self.rejilla_entidades):
+            total += sys.getsizeof(rejilla.celdas) + sys.getsizeof(rejilla.orden)
+            total += sum(sys.getsizeof(celda) for celda in rejilla.celdas.values())
+        return {
+            'paredes': len(self.paredes),
+            'sprites': len(sprites),
+            'bytes': total,
+        }
+
+    def total_consultas(self):
+        """
+        Devuelve el número total de consultas de colisión hechas en el nivel actual.
+        """
+        return self.rejilla_paredes.consultas + self.consultas_colision
+
+    def ejecutar(self, entradas, max_pasos=None):
+        """
+        Ejecuta pasos seguidos, sin dibujar ni esperar, hasta que termine el nivel,
+        se acaben las entradas o se llegue a max_pasos.
+        :param entradas: Iterable con los bits de entrada de cada paso.
+        :return: Diccionario con el resultado, los pasos dados y el tiempo restante.
+        """
+        resultado = None
+        for entrada in entradas:
+            if max_pasos is not None and self.pasos >= max_pasos:
+                break
+            resultado = self.paso(entrada)
+            if resultado is not None:
+                break
+        return {
+            'resultado': resultado,
+            'pasos': self.pasos,
+            'tiempo_restante': self.tiempo_restante,
+        }
+
+
+def entradas_aleatorias(semilla, cambio_cada=15):
+    """
+    Generador infinito de entradas aleatorias que cambian cada cierto número de pasos.
+    Útil para las pruebas de resistencia de los niveles.
+    """
+    generador = random.Random(semilla)
+    entrada = NINGUNA
+    paso = 0
+    while True:
+        if paso % cambio_cada == 0:
+            entrada = generador.getrandbits(4)
+        yield entrada
+        paso += 1
+
+
+# --- Prueba de Resistencia ---
+# Uso: python simulacion.py [nivel] [pasos] [semilla]
+# Juega el nivel con entradas aleatorias sin pantalla, reiniciándolo cada vez que termina,
+# y muestra cuántas veces acabó de cada forma y a qué velocidad se ha simulado.
+if __name__ == "__main__":
+    nivel = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    total_pasos = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    semilla = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    simulacion = Simulacion()
+    simulacion.cargar_nivel(nivel)
+    entradas = entradas_aleatorias(semilla)
+    resultados = {RESULTADO_ITEM: 0, RESULTADO_MUERTE: 0, RESULTADO_TIEMPO: 0}
+
+    inicio = time.perf_counter()
+    for _ in range(total_pasos):
+        resultado = simulacion.paso(next(entradas))
+        if resultado is not None:
+            resultados[resultado] += 1
+            simulacion.cargar_nivel(nivel)
+    duracion = time.perf_counter() - inicio
+
+    print(f"Nivel {nivel + 1}: {total_pasos} pasos en {duracion:.2f} s "
+          f"({total_pasos / duracion:.0f} pasos/s, {total_pasos / duracion / FPS:.0f}x tiempo real)")
+    print(f"Resultados: {resultados}")
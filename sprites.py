@@ -1,13 +1,11 @@
 import pygame
 from settings import *
-import os
-
-# --- Directorio de Assets ---
-# Creamos la ruta completa a la carpeta de assets.
-# os.path.dirname(__file__) obtiene el directorio del archivo actual (sprites.py)
-# y os.path.join() une las partes de la ruta de forma segura.
-directorio_juego = os.path.dirname(__file__)
-directorio_assets = os.path.join(directorio_juego, CARPETA_ASSETS)
+# El gestor de assets carga cada imagen una sola vez y la comparte entre sprites.
+from assets import cargar_imagen, cargar_mosaico
+# Bits de dirección de la entrada del jugador.
+from entrada import ARRIBA, ABAJO, IZQUIERDA, DERECHA
+# Tramo libre entre dos paredes de los patrulleros.
+from colisiones import tramo_patrulla
 
 # --- Clase Jugador ---
 # Heredamos de pygame.sprite.Sprite para poder usar las funciones de sprites de Pygame.
@@ -23,9 +21,9 @@ class Jugador(pygame.sprite.Sprite):
         self.juego = juego
 
         # --- Imagen y Rectángulo ---
-        # Cargamos la imagen del jugador desde la carpeta de assets.
-        # .convert_alpha() optimiza la imagen para un dibujado rápido con transparencias.
-        self.image = pygame.image.load(os.path.join(directorio_assets, IMAGEN_JUGADOR)).convert_alpha()
+        # Obtenemos la imagen del jugador desde el gestor de assets.
+        # Internamente usa .convert_alpha() para un dibujado rápido con transparencias.
+        self.image = cargar_imagen(IMAGEN_JUGADOR)
         
         # Obtenemos el rectángulo de la imagen. Pygame lo hace por nosotros.
         self.rect = self.image.get_rect()
@@ -42,23 +40,25 @@ class Jugador(pygame.sprite.Sprite):
     def get_teclas_presionadas(self):
         """
         Comprueba las teclas que están siendo presionadas y ajusta la velocidad del jugador.
+        Las teclas llegan como bits de entrada (ver entrada.py) a través de self.juego.entrada,
+        así el jugador se puede mover igual con el teclado real o con una entrada simulada.
         """
         # Reseteamos la velocidad en cada fotograma para que el personaje se pare si no se pulsa nada.
         self.vx, self.vy = 0, 0
         
-        # Obtenemos un diccionario con el estado de todas las teclas.
-        teclas = pygame.key.get_pressed()
+        # Obtenemos los bits de las teclas pulsadas en este paso.
+        teclas = self.juego.entrada
 
         # Comprobamos las teclas de movimiento horizontal.
-        if teclas[pygame.K_LEFT] or teclas[pygame.K_a]:
+        if teclas & IZQUIERDA:
             self.vx = -VELOCIDAD_JUGADOR
-        if teclas[pygame.K_RIGHT] or teclas[pygame.K_d]:
+        if teclas & DERECHA:
             self.vx = VELOCIDAD_JUGADOR
 
         # Comprobamos las teclas de movimiento vertical.
-        if teclas[pygame.K_UP] or teclas[pygame.K_w]:
+        if teclas & ARRIBA:
             self.vy = -VELOCIDAD_JUGADOR
-        if teclas[pygame.K_DOWN] or teclas[pygame.K_s]:
+        if teclas & ABAJO:
             self.vy = VELOCIDAD_JUGADOR
             
         # Para evitar que el movimiento diagonal sea más rápido, normalizamos el vector velocidad.
@@ -88,43 +88,48 @@ class Jugador(pygame.sprite.Sprite):
         # Comprobamos si ha habido colisión en el eje Y.
         self.comprobar_colisiones('y')
 
-        # --- Comprobación de Límites de Pantalla (opcional si el nivel es cerrado) ---
+        # --- Comprobación de Límites del Nivel (opcional si el nivel es cerrado) ---
+        # Si el nivel es más pequeño que la pantalla, el límite es la pantalla.
+        ancho_limite = max(ANCHO_PANTALLA, self.juego.ancho_nivel)
+        alto_limite = max(ALTO_PANTALLA, self.juego.alto_nivel)
         if self.rect.left < 0:
             self.rect.left = 0
-        if self.rect.right > ANCHO_PANTALLA:
-            self.rect.right = ANCHO_PANTALLA
+        if self.rect.right > ancho_limite:
+            self.rect.right = ancho_limite
         if self.rect.top < 0:
             self.rect.top = 0
-        if self.rect.bottom > ALTO_PANTALLA:
-            self.rect.bottom = ALTO_PANTALLA
+        if self.rect.bottom > alto_limite:
+            self.rect.bottom = alto_limite
 
     def comprobar_colisiones(self, direccion):
         """
         Comprueba y resuelve las colisiones del jugador con las paredes.
         :param direccion: 'x' o 'y', para saber en qué eje estamos comprobando.
         """
-        # La función spritecollide devuelve una lista con todos los sprites del grupo
-        # con los que hemos chocado. El False indica que el sprite no debe ser destruido.
-        colisiones = pygame.sprite.spritecollide(self, self.juego.paredes, False)
+        # La rejilla de paredes devuelve una lista con todas las paredes con las que hemos chocado,
+        # igual que spritecollide, pero mirando solo las celdas que toca nuestro rectángulo.
+        colisiones = self.juego.rejilla_paredes.colisiones(self.rect)
 
+        # Como las paredes fusionadas pueden tener tamaños distintos, nos alineamos
+        # con el borde más cercano de TODAS las paredes chocadas, no solo con la primera.
         if colisiones:
             if direccion == 'x':
                 # Si nos movemos a la derecha...
                 if self.vx > 0:
                     # ...nuestro borde derecho se alinea con el borde izquierdo del objeto chocado.
-                    self.rect.right = colisiones[0].rect.left
+                    self.rect.right = min(pared.rect.left for pared in colisiones)
                 # Si nos movemos a la izquierda...
                 if self.vx < 0:
                     # ...nuestro borde izquierdo se alinea con el borde derecho del objeto chocado.
-                    self.rect.left = colisiones[0].rect.right
+                    self.rect.left = max(pared.rect.right for pared in colisiones)
             
             if direccion == 'y':
                 # Si nos movemos hacia abajo...
                 if self.vy > 0:
-                    self.rect.bottom = colisiones[0].rect.top
+                    self.rect.bottom = min(pared.rect.top for pared in colisiones)
                 # Si nos movemos hacia arriba...
                 if self.vy < 0:
-                    self.rect.top = colisiones[0].rect.bottom
+                    self.rect.top = max(pared.rect.bottom for pared in colisiones)
 
 
 # --- Clase Enemigo ---
@@ -132,28 +137,60 @@ class Enemigo(pygame.sprite.Sprite):
     def __init__(self, juego, x, y):
         super().__init__()
         self.juego = juego
-        # Cargamos la imagen del enemigo.
-        self.image = pygame.image.load(os.path.join(directorio_assets, IMAGEN_ENEMIGO)).convert_alpha()
+        # Obtenemos la imagen del enemigo (compartida por todos los enemigos).
+        self.image = cargar_imagen(IMAGEN_ENEMIGO)
         self.rect = self.image.get_rect()
+        self.colocar(x, y)
+
+    def colocar(self, x, y):
+        """
+        Pone al enemigo en (x, y) con su estado inicial. La simulación también lo usa para
+        reutilizar un enemigo de un nivel anterior en lugar de crear uno nuevo.
+        """
         self.rect.x = x
         self.rect.y = y
         # Velocidad inicial de patrulla.
         self.vx = VELOCIDAD_ENEMIGO
+        # Bordes de las paredes entre las que patrulla (ver calcular_tramo) y versión de la
+        # rejilla de paredes con la que se calcularon. None si no se conocen.
+        self.tramo = None
+        self.version_tramo = None
+
+    def calcular_tramo(self, nivel):
+        """
+        Calcula de antemano contra qué paredes va a rebotar, para no tener que
+        consultar la rejilla de paredes en cada fotograma.
+        :param nivel: NivelCompilado del que se ha construido el nivel.
+        """
+        self.tramo = tramo_patrulla(nivel.ocupacion, nivel.ancho, nivel.alto, self.rect, True)
+        self.version_tramo = self.juego.rejilla_paredes.version
 
     def update(self):
         # Movemos al enemigo.
         self.rect.x += self.vx
+
+        # Si las paredes no han cambiado desde que calculamos el tramo, rebotamos sin consultar la rejilla.
+        # Colocamos al enemigo en el mismo sitio en que lo dejaría la comprobación de colisiones.
+        if self.tramo is not None and self.version_tramo == self.juego.rejilla_paredes.version:
+            minimo, maximo = self.tramo
+            if self.vx > 0 and maximo is not None and self.rect.right > maximo:
+                self.rect.right = maximo
+                self.vx *= -1
+            elif self.vx < 0 and minimo is not None and self.rect.left < minimo:
+                self.rect.left = minimo
+                self.vx *= -1
+            return
         
         # Comprobamos si choca con una pared.
-        colisiones_pared = pygame.sprite.spritecollide(self, self.juego.paredes, False)
+        colisiones_pared = self.juego.rejilla_paredes.colisiones(self.rect)
         if colisiones_pared:
             # Comprobamos la dirección en la que se movía ANTES de invertirla.
             if self.vx > 0: # Se movía a la derecha
                 # Lo colocamos justo a la izquierda de la pared con la que chocó.
-                self.rect.right = colisiones_pared[0].rect.left
+                self.rect.right = min(pared.rect.left for pared in colisiones_pared)
             elif self.vx < 0: # Se movía a la izquierda
                 # Lo colocamos justo a la derecha de la pared con la que chocó.
-                self.rect.left = colisiones_pared[0].rect.right
+                self.rect.left = max(pared.rect.right for pared in colisiones_pared)
             
             # Ahora sí, invertimos la velocidad para que vaya en la otra dirección en el siguiente fotograma.
             self.vx *= -1
@@ -164,20 +201,44 @@ class EnemigoVertical(pygame.sprite.Sprite):
     def __init__(self, juego, x, y):
         super().__init__()
         self.juego = juego
-        self.image = pygame.image.load(os.path.join(directorio_assets, IMAGEN_ENEMIGO_VERTICAL)).convert_alpha()
+        self.image = cargar_imagen(IMAGEN_ENEMIGO_VERTICAL)
         self.rect = self.image.get_rect()
+        self.colocar(x, y)
+
+    def colocar(self, x, y):
+        """
+        Igual que Enemigo.colocar.
+        """
         self.rect.x = x
         self.rect.y = y
         self.vy = VELOCIDAD_ENEMIGO
+        self.tramo = None
+        self.version_tramo = None
+
+    def calcular_tramo(self, nivel):
+        """
+        Igual que Enemigo.calcular_tramo, pero en el eje Y.
+        """
+        self.tramo = tramo_patrulla(nivel.ocupacion, nivel.ancho, nivel.alto, self.rect, False)
+        self.version_tramo = self.juego.rejilla_paredes.version
 
     def update(self):
         self.rect.y += self.vy
-        colisiones_pared = pygame.sprite.spritecollide(self, self.juego.paredes, False)
+        if self.tramo is not None and self.version_tramo == self.juego.rejilla_paredes.version:
+            minimo, maximo = self.tramo
+            if self.vy > 0 and maximo is not None and self.rect.bottom > maximo:
+                self.rect.bottom = maximo
+                self.vy *= -1
+            elif self.vy < 0 and minimo is not None and self.rect.top < minimo:
+                self.rect.top = minimo
+                self.vy *= -1
+            return
+        colisiones_pared = self.juego.rejilla_paredes.colisiones(self.rect)
         if colisiones_pared:
             if self.vy > 0: # Se movía hacia abajo
-                self.rect.bottom = colisiones_pared[0].rect.top
+                self.rect.bottom = min(pared.rect.top for pared in colisiones_pared)
             elif self.vy < 0: # Se movía hacia arriba
-                self.rect.top = colisiones_pared[0].rect.bottom
+                self.rect.top = max(pared.rect.bottom for pared in colisiones_pared)
             self.vy *= -1
 
 
@@ -186,16 +247,28 @@ class Item(pygame.sprite.Sprite):
     def __init__(self, juego, x, y):
         super().__init__()
         self.juego = juego
-        # Cargamos la imagen del item.
-        self.image = pygame.image.load(os.path.join(directorio_assets, IMAGEN_ITEM)).convert_alpha()
+        # Obtenemos la imagen del item.
+        self.image = cargar_imagen(IMAGEN_ITEM)
         self.rect = self.image.get_rect()
+        self.colocar(x, y)
+
+    def colocar(self, x, y):
+        """
+        Pone el item en (x, y) (ver Enemigo.colocar).
+        """
         self.rect.x = x
         self.rect.y = y
 
 
 # --- Clase Pared ---
 # Un obstáculo estático en el juego.
-class Pared(pygame.sprite.Sprite):
+# No es un sprite de Pygame: cada Sprite tiene su propio __dict__ y un conjunto con sus grupos,
+# y en los niveles grandes hay decenas de miles de paredes. Como las paredes no se mueven ni se
+# actualizan, les basta con una imagen y un rectángulo, guardados en __slots__.
+# La simulación las guarda en su diccionario de paredes y en la rejilla de paredes.
+class Pared:
+    __slots__ = ('image', 'rect')
+
     def __init__(self, x, y, ancho, alto):
         """
         Constructor de la clase Pared.
@@ -204,18 +277,18 @@ class Pared(pygame.sprite.Sprite):
         :param ancho: Ancho del bloque.
         :param alto: Alto del bloque.
         """
-        super().__init__()
-        # Cargamos la imagen base de la pared.
-        # .convert() optimiza la imagen para un dibujado rápido sin transparencias.
-        imagen_pared = pygame.image.load(os.path.join(directorio_assets, IMAGEN_PARED)).convert()
-        
-        # Escalamamos la imagen al tamaño especificado (ancho, alto).
-        self.image = pygame.transform.scale(imagen_pared, (ancho, alto))
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.colocar(x, y, ancho, alto)
 
-        # Obtenemos su rectángulo y lo posicionamos.
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y 
+    def colocar(self, x, y, ancho, alto):
+        """
+        Pone el bloque en su sitio con su tamaño (también al reutilizar una pared de otro nivel).
+        """
+        # Un bloque puede ser una pared fusionada de varios tiles, así que repetimos
+        # la imagen de la pared como baldosas en lugar de estirarla.
+        # El mosaico se guarda en el caché, así que cada tamaño se construye una sola vez.
+        self.image = cargar_mosaico(IMAGEN_PARED, (ancho, alto))
+        self.rect.update(x, y, ancho, alto)
 
 class EnemigoPerseguidor(pygame.sprite.Sprite):
     """
@@ -223,20 +296,25 @@ class EnemigoPerseguidor(pygame.sprite.Sprite):
     """
     def __init__(self, juego, x, y):
         super().__init__()
-        # Cargamos la imagen del enemigo perseguidor (usamos la misma que el enemigo normal por ahora).
-        self.image = pygame.image.load(os.path.join(directorio_assets, IMAGEN_ENEMIGO)).convert_alpha()
-        # Redimensionamos la imagen.
-        self.image = pygame.transform.scale(self.image, (TILE_SIZE, TILE_SIZE))
+        # Obtenemos la imagen del enemigo perseguidor ya redimensionada
+        # (usamos la misma que el enemigo normal por ahora).
+        self.image = cargar_imagen(IMAGEN_ENEMIGO_PERSEGUIDOR, (TILE_SIZE, TILE_SIZE))
         # Creamos el rectángulo de colisión.
         self.rect = self.image.get_rect()
         # Posicionamos el enemigo.
-        self.rect.x = x
-        self.rect.y = y
+        self.colocar(x, y)
         # Velocidad del enemigo perseguidor (un poco más lento que el jugador).
         self.velocidad = VELOCIDAD_ENEMIGO * 0.8
         # Referencia al juego.
         self.juego = juego
 
+    def colocar(self, x, y):
+        """
+        Pone al enemigo en (x, y) (ver Enemigo.colocar).
+        """
+        self.rect.x = x
+        self.rect.y = y
+
     def update(self):
         """
         Actualiza la posición del enemigo persiguiendo al jugador.
@@ -245,35 +323,60 @@ class EnemigoPerseguidor(pygame.sprite.Sprite):
         if not hasattr(self.juego, "jugador") or self.juego.jugador is None:
             return
         jugador = self.juego.jugador
+
+        # --- Elección del Destino ---
+        # Si el nivel tiene campo de flujo, vamos hacia la siguiente casilla del camino
+        # más corto hasta el jugador. Si no hay camino conocido (o ya estamos en su casilla),
+        # vamos en línea recta hacia él.
+        destino_x, destino_y = jugador.rect.center
+        campo = getattr(self.juego, "campo_flujo", None)
+        if campo is not None:
+            casilla = campo.siguiente_casilla(self.rect.centerx, self.rect.centery)
+            if casilla is not None:
+                destino_x = casilla[0] * TILE_SIZE + TILE_SIZE // 2
+                destino_y = casilla[1] * TILE_SIZE + TILE_SIZE // 2
         
-        # Calculamos la dirección hacia el jugador.
-        dx = jugador.rect.centerx - self.rect.centerx
-        dy = jugador.rect.centery - self.rect.centery
+        # Calculamos la dirección hacia el destino.
+        dx = destino_x - self.rect.centerx
+        dy = destino_y - self.rect.centery
         
         # Normalizamos la dirección para movimiento uniforme.
         distancia = max(abs(dx), abs(dy))
         if distancia > 0:
+            restante_x, restante_y = dx, dy
             dx = (dx / distancia) * self.velocidad
             dy = (dy / distancia) * self.velocidad
+            # Si en un eje nos falta menos que un paso, avanzamos justo lo que falta.
+            # Así el enemigo termina de alinearse con el pasillo y no se queda enganchado en las esquinas.
+            if abs(restante_x) <= self.velocidad:
+                dx = restante_x
+            if abs(restante_y) <= self.velocidad:
+                dy = restante_y
+            # Al mover el rectángulo los decimales se redondean, así que nos aseguramos
+            # de avanzar al menos un píxel en cada eje en el que todavía falte algo.
+            if 0 < abs(dx) < 1:
+                dx = 1 if dx > 0 else -1
+            if 0 < abs(dy) < 1:
+                dy = 1 if dy > 0 else -1
         
         # Aplicamos el movimiento horizontal.
         self.rect.x += dx
         # Comprobamos colisiones horizontales.
-        colisiones_h = pygame.sprite.spritecollide(self, self.juego.paredes, False)
+        colisiones_h = self.juego.rejilla_paredes.colisiones(self.rect)
         if colisiones_h:
             # Si hay colisión, revertimos el movimiento.
             if dx > 0:
-                self.rect.right = colisiones_h[0].rect.left
+                self.rect.right = min(pared.rect.left for pared in colisiones_h)
             else:
-                self.rect.left = colisiones_h[0].rect.right
+                self.rect.left = max(pared.rect.right for pared in colisiones_h)
         
         # Aplicamos el movimiento vertical.
         self.rect.y += dy
         # Comprobamos colisiones verticales.
-        colisiones_v = pygame.sprite.spritecollide(self, self.juego.paredes, False)
+        colisiones_v = self.juego.rejilla_paredes.colisiones(self.rect)
         if colisiones_v:
             # Si hay colisión, revertimos el movimiento.
             if dy > 0:
-                self.rect.bottom = colisiones_v[0].rect.top
+                self.rect.bottom = min(pared.rect.top for pared in colisiones_v)
             else:
-                self.rect.top = colisiones_v[0].rect.bottom 
\ No newline at end of file
+                self.rect.top = max(pared.rect.bottom for pared in colisiones_v) 
\ No newline at end of file
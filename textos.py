@@ -0,0 +1,88 @@
+import pygame
+from collections import OrderedDict
+from settings import *
+import os
+
+# --- Caché de Textos ---
+# Crear un pygame.font.Font carga el archivo de la fuente, y render() rasteriza el texto.
+# Hacerlo varias veces por fotograma es un desperdicio, así que guardamos:
+#   - una fuente por tamaño,
+#   - cada texto ya renderizado, usando como clave (texto, tamaño, color).
+# Los textos se guardan con una política LRU: cuando el caché se llena,
+# se descarta el texto que lleva más tiempo sin usarse.
+
+def buscar_fuente(nombre=NOMBRE_FUENTE, archivo_cache=ARCHIVO_CACHE_FUENTE):
+    """
+    Devuelve la ruta de la fuente del sistema con ese nombre (o None para la de Pygame).
+    pygame.font.match_font recorre todas las fuentes instaladas, y en Linux puede tardar
+    cientos de milisegundos, así que la ruta encontrada se guarda en un archivo y las
+    siguientes veces solo se comprueba que siga existiendo.
+    """
+    archivo_cache = os.path.join(os.path.dirname(os.path.abspath(__file__)), archivo_cache)
+    try:
+        with open(archivo_cache, 'rt') as f:
+            nombre_guardado, _, ruta = f.read().partition('\n')
+        # Una ruta vacía significa que el sistema no tenía la fuente.
+        if nombre_guardado == nombre and (ruta == '' or os.path.exists(ruta)):
+            return ruta or None
+    except OSError:
+        pass
+
+    ruta = pygame.font.match_font(nombre)
+    try:
+        with open(archivo_cache, 'wt') as f:
+            f.write(f"{nombre}\n{ruta or ''}")
+    except OSError:
+        pass
+    return ruta
+
+
+class CacheTextos:
+    def __init__(self, nombre_fuente, max_textos=MAX_TEXTOS_CACHE):
+        """
+        Constructor del caché.
+        :param nombre_fuente: Ruta de la fuente (o None para la fuente por defecto de Pygame).
+        :param max_textos: Número máximo de textos renderizados que se guardan.
+        """
+        self.nombre_fuente = nombre_fuente
+        self.max_textos = max_textos
+        # Diccionario tamaño -> pygame.font.Font
+        self.fuentes = {}
+        # Diccionario ordenado (texto, tamaño, color) -> superficie del texto.
+        self.textos = OrderedDict()
+
+    def fuente(self, tamaño):
+        """
+        Devuelve la fuente del tamaño pedido, creándola solo la primera vez.
+        """
+        fuente = self.fuentes.get(tamaño)
+        if fuente is None:
+            fuente = pygame.font.Font(self.nombre_fuente, tamaño)
+            self.fuentes[tamaño] = fuente
+        return fuente
+
+    def render(self, texto, tamaño, color):
+        """
+        Devuelve la superficie del texto, rasterizándolo solo si no estaba en el caché.
+        """
+        clave = (texto, tamaño, tuple(color))
+        superficie = self.textos.get(clave)
+        if superficie is not None:
+            # Lo marcamos como usado recientemente.
+            self.textos.move_to_end(clave)
+            return superficie
+
+        # El True es para el antialiasing.
+        superficie = self.fuente(tamaño).render(texto, True, color)
+        self.textos[clave] = superficie
+        # Si nos pasamos del máximo, quitamos el texto usado hace más tiempo.
+        if len(self.textos) > self.max_textos:
+            self.textos.popitem(last=False)
+        return superficie
+
+    def limpiar(self):
+        """
+        Vacía las fuentes y los textos guardados.
+        """
+        self.fuentes.clear()
+        self.textos.clear()
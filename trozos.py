@@ -0,0 +1,273 @@
+import pygame
+from settings import *
+from assets import hay_pantalla
+from colisiones import fusionar_paredes
+from collections import OrderedDict
+import os
+import struct
+import sys
+import zlib
+
+# --- Niveles por Trozos ---
+# Un nivel .txt se lee entero y se convierte entero en sprites. Para mundos enormes eso
+# supone esperas largas al cargar y una memoria proporcional al tamaño del mundo.
+# En el formato troceado el mapa se divide en trozos de TAMAÑO_TROZO x TAMAÑO_TROZO tiles,
+# comprimidos por separado y precedidos de un índice con la posición de cada uno en el archivo.
+# Así se puede leer un trozo cualquiera sin leer el resto.
+#
+# Formato del archivo (enteros en little-endian):
+#   cabecera: 'NIVT', versión, ancho, alto (en tiles), tamaño del trozo,
+#             columna y fila del jugador, número de trozos
+#   índice:   (desplazamiento, longitud) de cada trozo, fila a fila
+#   datos:    cada trozo con zlib; sus tamaño x tamaño caracteres, fila a fila
+#             (relleno con espacios en los bordes del mapa)
+#
+# Conversión desde un .txt:
+#   python trozos.py levels/level1.txt [salida.niv]
+
+MAGICO = b'NIVT'
+VERSION = 1
+CABECERA = struct.Struct('<4sHHHHHHI')
+ENTRADA_INDICE = struct.Struct('<II')
+
+
+def convertir_mapa(mapa, ruta_salida, tamaño_trozo=TAMAÑO_TROZO):
+    """
+    Guarda un mapa (lista de líneas) en el formato troceado.
+    :param mapa: Lista de líneas del nivel en el formato de los .txt.
+    :param ruta_salida: Ruta del archivo a crear.
+    :param tamaño_trozo: Lado de cada trozo en tiles.
+    """
+    ancho = max((len(linea) for linea in mapa), default=0)
+    alto = len(mapa)
+    trozos_ancho = -(-ancho // tamaño_trozo)
+    trozos_alto = -(-alto // tamaño_trozo)
+
+    # El jugador se guarda en la cabecera y se quita de los trozos.
+    inicio = (0, 0)
+    filas = []
+    for fila, linea in enumerate(mapa):
+        columna = linea.find('P')
+        if columna != -1:
+            inicio = (columna, fila)
+            linea = linea.replace('P', ' ')
+        filas.append(linea.ljust(trozos_ancho * tamaño_trozo))
+    filas += [' ' * (trozos_ancho * tamaño_trozo)] * (trozos_alto * tamaño_trozo - alto)
+
+    datos = []
+    for trozo_fila in range(trozos_alto):
+        for trozo_columna in range(trozos_ancho):
+            x = trozo_columna * tamaño_trozo
+            lineas = filas[trozo_fila * tamaño_trozo:(trozo_fila + 1) * tamaño_trozo]
+            contenido = ''.join(linea[x:x + tamaño_trozo] for linea in lineas)
+            datos.append(zlib.compress(contenido.encode('ascii')))
+
+    desplazamiento = CABECERA.size + ENTRADA_INDICE.size * len(datos)
+    with open(ruta_salida, 'wb') as f:
+        f.write(CABECERA.pack(MAGICO, VERSION, ancho, alto, tamaño_trozo, inicio[0], inicio[1], len(datos)))
+        for comprimido in datos:
+            f.write(ENTRADA_INDICE.pack(desplazamiento, len(comprimido)))
+            desplazamiento += len(comprimido)
+        for comprimido in datos:
+            f.write(comprimido)
+
+
+def convertir_txt(ruta_txt, ruta_salida=None, tamaño_trozo=TAMAÑO_TROZO):
+    """
+    Convierte un nivel .txt al formato troceado. Por defecto, el archivo nuevo se guarda
+    junto al original con la extensión EXTENSION_TROCEADA.
+    :return: Ruta del archivo creado.
+    """
+    if ruta_salida is None:
+        ruta_salida = os.path.splitext(ruta_txt)[0] + EXTENSION_TROCEADA
+    with open(ruta_txt, 'rt') as f:
+        mapa = [linea.strip() for linea in f]
+    convertir_mapa(mapa, ruta_salida, tamaño_trozo)
+    return ruta_salida
+
+
+class ArchivoTroceado:
+    def __init__(self, ruta):
+        """
+        Abre un nivel troceado. Solo se leen la cabecera y el índice; los trozos se leen al pedirlos.
+        :param ruta: Ruta del archivo .niv.
+        """
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            magico, version, self.ancho, self.alto, self.tamaño_trozo, columna, fila, total = \
+                CABECERA.unpack(f.read(CABECERA.size))
+            if magico != MAGICO or version != VERSION:
+                raise ValueError(f"{ruta} no es un nivel troceado válido")
+            self.inicio_jugador = (columna, fila)
+            self.indice = [ENTRADA_INDICE.unpack(f.read(ENTRADA_INDICE.size)) for _ in range(total)]
+        self.trozos_ancho = -(-self.ancho // self.tamaño_trozo)
+        self.trozos_alto = -(-self.alto // self.tamaño_trozo)
+        # Trozos ya leídos de antemano (ver precargar), por (columna, fila).
+        self._leidos = {}
+
+    def precargar(self, radio=RADIO_TROZOS):
+        """
+        Lee de antemano los trozos que rodean la posición inicial del jugador.
+        Se puede llamar desde otro hilo (lo usa el precargador de niveles).
+        """
+        columna, fila = self.inicio_jugador
+        columna //= self.tamaño_trozo
+        fila //= self.tamaño_trozo
+        for f in range(max(0, fila - radio), min(self.trozos_alto, fila + radio + 1)):
+            for c in range(max(0, columna - radio), min(self.trozos_ancho, columna + radio + 1)):
+                self._leidos[(c, f)] = self.leer_trozo(c, f)
+
+    def leer_trozo(self, columna, fila):
+        """
+        Lee un trozo del disco y lo devuelve como una lista de líneas (igual que un mapa .txt).
+        """
+        lineas = self._leidos.pop((columna, fila), None)
+        if lineas is not None:
+            return lineas
+        desplazamiento, longitud = self.indice[fila * self.trozos_ancho + columna]
+        with open(self.ruta, 'rb') as f:
+            f.seek(desplazamiento)
+            contenido = zlib.decompress(f.read(longitud)).decode('ascii')
+        t = self.tamaño_trozo
+        return [contenido[i:i + t] for i in range(0, t * t, t)]
+
+
+# --- Trozo Cargado ---
+class Trozo:
+    def __init__(self, columna, fila, tamaño_trozo):
+        """
+        Lo que se ha creado al cargar un trozo: sus paredes, sus enemigos e items y,
+        cuando se dibuja por primera vez, una superficie con sus paredes ya dibujadas.
+        """
+        self.columna = columna
+        self.fila = fila
+        lado = tamaño_trozo * TILE_SIZE
+        self.rect = pygame.Rect(columna * lado, fila * lado, lado, lado)
+        self.paredes = []
+        self.entidades = []
+        self.superficie = None
+
+
+# --- Gestor de Trozos ---
+class MundoTroceado:
+    def __init__(self, simulacion, archivo, radio=RADIO_TROZOS, max_trozos=MAX_TROZOS_CARGADOS):
+        """
+        Constructor del gestor de trozos.
+        :param simulacion: Simulación en cuyos grupos se crean los sprites de los trozos.
+        :param archivo: ArchivoTroceado del nivel.
+        :param radio: Trozos cargados alrededor del trozo del jugador, en cada dirección.
+        :param max_trozos: Máximo de trozos cargados; los que llevan más tiempo sin usarse se descargan.
+        """
+        self.simulacion = simulacion
+        self.archivo = archivo
+        self.radio = radio
+        # Siempre tienen que caber los trozos que rodean al jugador.
+        self.max_trozos = max(max_trozos, (2 * radio + 1) ** 2)
+        # Trozos cargados, del usado hace más tiempo al más reciente (LRU).
+        self.cargados = OrderedDict()
+        self.trozo_jugador = None
+        self.lado = archivo.tamaño_trozo * TILE_SIZE
+        # Estadísticas para el perfilador y los benchmarks.
+        self.cargas = 0
+        self.descargas = 0
+
+    def trozo_en(self, x, y):
+        """
+        Devuelve (columna, fila) del trozo que contiene el punto (x, y) en píxeles.
+        """
+        return x // self.lado, y // self.lado
+
+    def actualizar(self, x, y):
+        """
+        Carga los trozos alrededor del punto (x, y), normalmente el centro del jugador,
+        descarga los que sobran y quita a los enemigos que se han salido de la zona cargada.
+        """
+        trozo = self.trozo_en(x, y)
+        if trozo != self.trozo_jugador:
+            self.trozo_jugador = trozo
+            columna, fila = trozo
+            for f in range(max(0, fila - self.radio), min(self.archivo.trozos_alto, fila + self.radio + 1)):
+                for c in range(max(0, columna - self.radio), min(self.archivo.trozos_ancho, columna + self.radio + 1)):
+                    if (c, f) in self.cargados:
+                        self.cargados.move_to_end((c, f))
+                    else:
+                        self.cargados[(c, f)] = self.cargar(c, f)
+            # Los trozos de alrededor son los más recientes, así que nunca se descargan aquí.
+            while len(self.cargados) > self.max_trozos:
+                _, viejo = self.cargados.popitem(last=False)
+                self.descargar(viejo)
+
+        # Un enemigo que entra en un trozo sin cargar no tendría paredes contra las que chocar.
+        # Lo quitamos; volverá a aparecer en su sitio cuando se vuelva a cargar su trozo.
+        for enemigo in self.simulacion.enemigos.sprites():
+            if self.trozo_en(*enemigo.rect.center) not in self.cargados:
+                enemigo.kill()
+                self.simulacion.rejilla_entidades.quitar(enemigo)
+
+    def cargar(self, columna, fila):
+        """
+        Lee un trozo del archivo y crea sus paredes, enemigos e items.
+        """
+        simulacion = self.simulacion
+        trozo = Trozo(columna, fila, self.archivo.tamaño_trozo)
+        lineas = self.archivo.leer_trozo(columna, fila)
+        base_x, base_y = trozo.rect.topleft
+        for x, y, ancho, alto in fusionar_paredes(lineas):
+            trozo.paredes.append(simulacion.crear_pared(
+                base_x + x * TILE_SIZE, base_y + y * TILE_SIZE, ancho * TILE_SIZE, alto * TILE_SIZE))
+        for y, linea in enumerate(lineas):
+            for x, caracter in enumerate(linea):
+                if caracter in 'EVCG':
+                    trozo.entidades.append(simulacion.crear_entidad(
+                        caracter, base_x + x * TILE_SIZE, base_y + y * TILE_SIZE))
+
+        # El jugador tiene que seguir siendo el último del grupo para que se mueva
+        # después de los enemigos, como en los niveles normales.
+        if trozo.entidades and simulacion.jugador is not None:
+            simulacion.todos_los_sprites.remove(simulacion.jugador)
+            simulacion.todos_los_sprites.add(simulacion.jugador)
+        self.cargas += 1
+        return trozo
+
+    def descargar(self, trozo):
+        """
+        Quita de la simulación todo lo que creó un trozo.
+        """
+        for pared in trozo.paredes:
+            self.simulacion.quitar_pared(pared)
+        # Los enemigos e items vuelven a la reserva de la simulación para reutilizarlos.
+        for entidad in trozo.entidades:
+            entidad.kill()
+            self.simulacion.rejilla_entidades.quitar(entidad)
+            self.simulacion.reserva[type(entidad)].append(entidad)
+        self.descargas += 1
+
+    def dibujar(self, superficie, camara):
+        """
+        Dibuja las paredes de los trozos visibles. Cada trozo se dibuja una sola vez en su
+        propia superficie la primera vez que se ve, y después solo se copia esa superficie.
+        :return: Número de blits hechos.
+        """
+        blits = []
+        for trozo in self.cargados.values():
+            if not camara.visible(trozo.rect):
+                continue
+            if trozo.superficie is None:
+                trozo.superficie = pygame.Surface(trozo.rect.size)
+                if hay_pantalla():
+                    trozo.superficie = trozo.superficie.convert()
+                trozo.superficie.fill(NEGRO)
+                for pared in trozo.paredes:
+                    trozo.superficie.blit(pared.image, pared.rect.move(-trozo.rect.x, -trozo.rect.y))
+            blits.append((trozo.superficie, camara.aplicar(trozo.rect)))
+        superficie.blits(blits, doreturn=False)
+        return len(blits)
+
+
+if __name__ == "__main__":
+    # Convierte los niveles .txt indicados al formato troceado.
+    if len(sys.argv) < 2:
+        print("Uso: python trozos.py nivel.txt [salida.niv]")
+        sys.exit(1)
+    ruta = convertir_txt(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Nivel troceado guardado en {ruta}")